@@ -0,0 +1,666 @@
+from abc import ABC, abstractmethod
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+from noisereduce import reduce_noise
+from numpy.lib.stride_tricks import sliding_window_view
+
+from app.helpers.config_models.aec import EngineEnum
+
+_N_FFT = 128  # Quality, ~8 ms frames at 16 kHz
+_HOP = _N_FFT // 2  # Half overlap, required by the vectorized overlap-add
+_N_STD_THRESH = 1.5  # Same as noisereduce stationary default
+_PROP_DECREASE = 0.75  # Reduce noise by 75%
+_DB_EPS = np.finfo(np.float32).eps
+_SILENCE_DB = 20 * np.log10(_DB_EPS)  # dB amplitude of a zero signal
+_WINDOW = (  # Periodic Hann window, used for both analysis and synthesis
+    0.5 - 0.5 * np.cos(2 * np.pi * np.arange(_N_FFT) / _N_FFT)
+).astype(np.float32)
+
+
+def _to_db(spec: np.ndarray, out: np.ndarray | None = None) -> np.ndarray:
+    """
+    Convert a complex spectrum to dB amplitude.
+    """
+    mag = np.abs(spec, out=out)
+    np.add(mag, _DB_EPS, out=mag)
+    np.log10(mag, out=mag)
+    np.multiply(mag, 20, out=mag)
+    return mag
+
+
+class IAecEngine(ABC):
+    """
+    Echo cancellation engine, processing one packet at a time.
+
+    Input and output formats are in PCM 16-bit, 1 channel. Implementations are stateful and not thread-safe, one instance per call.
+    """
+
+    @abstractmethod
+    def process(
+        self,
+        input_pcm: bytes,
+        reference_pcm: bytes | None,
+    ) -> tuple[bytes, float]:
+        """
+        Process one input packet, using the reference packet played at the same time, if any.
+
+        Returns a tuple with the echo-cancelled PCM audio and its RMS (acoustic pressure), in range 0-1.
+        """
+
+
+class NoisereduceAecEngine(IAecEngine):
+    """
+    Spectral gating with noisereduce, computing the reference STFT again for each packet.
+    """
+
+    _bot_voice_buffer: np.ndarray
+    _empty_packet: bytes
+    _sample_rate: int
+
+    def __init__(
+        self,
+        chunk_size: int,
+        max_delay_samples: int,
+        sample_rate: int,
+    ):
+        self._bot_voice_buffer = np.zeros(max_delay_samples, dtype=np.float32)
+        self._empty_packet = b"\x00" * chunk_size * 2
+        self._sample_rate = sample_rate
+
+    def _pcm_to_float(self, pcm: bytes) -> np.ndarray:
+        """
+        Convert PCM 16-bit to float (-1.0 to 1.0).
+        """
+        return (
+            np.frombuffer(
+                buffer=pcm,
+                dtype=np.int16,
+            ).astype(np.float32)
+            / 32768.0
+        )
+
+    def _float_to_pcm(self, floats: np.ndarray) -> bytes:
+        """
+        Convert float (-1.0 to 1.0) to PCM 16-bit.
+        """
+        pcm = (floats * 32767).clip(-32768, 32767).astype(np.int16)
+        return pcm.tobytes()
+
+    def _update_input_buffer(self, voice: np.ndarray) -> None:
+        """
+        Update the rolling buffer for the input voice.
+        """
+        buffer_length = len(self._bot_voice_buffer)
+        reference_length = len(voice)
+
+        if reference_length >= buffer_length:
+            # If the reference is longer than the buffer, keep the most recent samples
+            self._bot_voice_buffer = voice[-buffer_length:]
+        else:
+            # Append new samples and keep the buffer size fixed
+            self._bot_voice_buffer = np.roll(self._bot_voice_buffer, -reference_length)
+            self._bot_voice_buffer[-reference_length:] = voice
+
+    def process(
+        self,
+        input_pcm: bytes,
+        reference_pcm: bytes | None,
+    ) -> tuple[bytes, float]:
+        # Convert PCM to float for processing
+        input_signal = self._pcm_to_float(input_pcm)
+        reference_signal = self._pcm_to_float(reference_pcm or self._empty_packet)
+
+        # Update the input buffer with the reference signal
+        self._update_input_buffer(reference_signal)
+
+        # Reference signal is empty, skip noise reduction
+        if np.all(reference_signal == 0):
+            return input_pcm, float(np.sqrt(np.mean(input_signal**2)))
+
+        # Apply noise reduction
+        reduced_signal = reduce_noise(
+            # Input signal
+            sr=self._sample_rate,
+            y=input_signal,
+            # Quality
+            n_fft=_N_FFT,
+            # Since the reference signal is already noise-reduced, we can assume it's stationary
+            clip_noise_stationary=False,  # Noise is longer than the signal
+            stationary=True,
+            y_noise=self._bot_voice_buffer,
+            # Output quality
+            prop_decrease=_PROP_DECREASE,
+        )
+
+        return (
+            self._float_to_pcm(reduced_signal),
+            float(np.sqrt(np.mean(reduced_signal**2))),
+        )
+
+
+class RingAecEngine(IAecEngine):
+    """
+    Spectral gating with a precomputed noise profile of the reference.
+
+    Reference audio is converted to dB spectra once, when it is received, and stored in a fixed-size circular buffer indexed by a write pointer. The per-frequency mean and standard deviation of the buffer (the noise profile) are updated incrementally with running sums. Processing a packet is then a single STFT of the input, a gate against the profile, and an inverse STFT, with all intermediate arrays allocated once.
+
+    Same gating rule as the noisereduce stationary mode, without the mask smoothing.
+    """
+
+    _chunk_size: int
+    _empty_packet: bytes
+    _frames: np.ndarray
+    _ring_capacity: int
+    _ring_db: np.ndarray
+    _ring_pointer: int = 0
+    _ring_writes: int = 0
+    _ref_pending: np.ndarray
+    _ref_pending_size: int = 0
+    _spec: np.ndarray
+    _sum: np.ndarray
+    _sumsq: np.ndarray
+    _threshold: np.ndarray
+    _threshold_stale: bool = True
+
+    def __init__(
+        self,
+        chunk_size: int,
+        max_delay_samples: int,
+        sample_rate: int,  # noqa: ARG002
+    ):
+        self._chunk_size = chunk_size
+        self._empty_packet = b"\x00" * chunk_size * 2
+        n_bins = _N_FFT // 2 + 1
+
+        # Input framing, reflect padded as the "center" mode of librosa, right padded to a whole number of hops
+        self._pad = _N_FFT // 2
+        padded_size = chunk_size + 2 * self._pad
+        padded_size += -(padded_size - _N_FFT) % _HOP
+        self._padded = np.zeros(padded_size, dtype=np.float32)
+        self._frames_view = sliding_window_view(self._padded, _N_FFT)[::_HOP]
+        frames_count = len(self._frames_view)
+
+        # Input scratch buffers
+        self._frames = np.empty((frames_count, _N_FFT), dtype=np.float32)
+        self._spec = np.empty((frames_count, n_bins), dtype=np.complex64)
+        self._mag_db = np.empty((frames_count, n_bins), dtype=np.float32)
+        self._gain = np.empty((frames_count, n_bins), dtype=np.float32)
+        self._mask = np.empty((frames_count, n_bins), dtype=np.bool_)
+        self._ola = np.empty(padded_size, dtype=np.float32)
+        self._ola_blocks = self._ola.reshape(-1, _HOP)
+        self._out = np.empty(chunk_size, dtype=np.float32)
+        self._out_pcm = np.empty(chunk_size, dtype=np.int16)
+
+        # Inverse of the squared window overlap, for the output samples only
+        norm = np.zeros(padded_size, dtype=np.float32)
+        norm_blocks = norm.reshape(-1, _HOP)
+        norm_blocks[:-1] += _WINDOW[:_HOP] ** 2
+        norm_blocks[1:] += _WINDOW[_HOP:] ** 2
+        self._inv_norm = 1 / norm[self._pad : self._pad + chunk_size]
+
+        # Reference pending samples, not yet converted to a full frame, start with silence
+        self._ref_pending = np.zeros(_N_FFT + chunk_size, dtype=np.float32)
+        self._ref_pending_size = _N_FFT - _HOP
+
+        # Reference spectra ring, initialized as silence
+        self._ring_capacity = max(1, -(-max_delay_samples // _HOP))
+        self._silence_db = np.full(n_bins, _SILENCE_DB, dtype=np.float32)
+        self._ring_db = np.tile(self._silence_db, (self._ring_capacity, 1))
+        self._threshold = np.empty(n_bins, dtype=np.float32)
+        self._sum = np.empty(n_bins, dtype=np.float64)
+        self._sumsq = np.empty(n_bins, dtype=np.float64)
+        self._resync_profile()
+
+    def _resync_profile(self) -> None:
+        """
+        Compute the running sums again from the ring, to avoid floating point drift.
+        """
+        ring = self._ring_db.astype(np.float64)
+        self._sum[:] = ring.sum(axis=0)
+        self._sumsq[:] = (ring**2).sum(axis=0)
+        self._threshold_stale = True
+
+    def _push_ref_db(self, rows: np.ndarray) -> None:
+        """
+        Write reference dB spectra in the ring, and update the running sums.
+        """
+        count = len(rows)
+        if count == 0:
+            return
+        if count > self._ring_capacity:
+            rows = rows[-self._ring_capacity :]
+            count = self._ring_capacity
+
+        indexes = (self._ring_pointer + np.arange(count)) % self._ring_capacity
+        old = self._ring_db[indexes].astype(np.float64)
+        new = rows.astype(np.float64)
+        self._sum += new.sum(axis=0) - old.sum(axis=0)
+        self._sumsq += (new**2).sum(axis=0) - (old**2).sum(axis=0)
+        self._ring_db[indexes] = rows
+        self._ring_pointer = (self._ring_pointer + count) % self._ring_capacity
+        self._threshold_stale = True
+
+        # Periodically resync sums
+        self._ring_writes += count
+        if self._ring_writes >= self._ring_capacity * 8:
+            self._ring_writes = 0
+            self._resync_profile()
+
+    def _push_reference(self, reference: np.ndarray | None) -> None:
+        """
+        Append reference samples, and convert each full frame to a dB spectrum.
+
+        A missing reference is silence, its spectrum is known in advance.
+        """
+        size = self._chunk_size if reference is None else len(reference)
+        end = self._ref_pending_size + size
+        if reference is None:
+            self._ref_pending[self._ref_pending_size : end] = 0
+        else:
+            np.multiply(
+                reference,
+                1 / 32768,
+                out=self._ref_pending[self._ref_pending_size : end],
+                casting="unsafe",
+            )
+
+        frames_count = max(0, (end - _N_FFT) // _HOP + 1)
+        if frames_count:
+            if reference is None:
+                self._push_ref_db(
+                    np.broadcast_to(
+                        self._silence_db, (frames_count, len(self._silence_db))
+                    )
+                )
+            else:
+                frames = sliding_window_view(self._ref_pending[:end], _N_FFT)[::_HOP][
+                    :frames_count
+                ]
+                self._push_ref_db(_to_db(np.fft.rfft(frames * _WINDOW, axis=1)))
+
+        # Keep the samples not yet consumed by a full frame
+        consumed = frames_count * _HOP
+        remaining = end - consumed
+        self._ref_pending[:remaining] = self._ref_pending[consumed:end]
+        self._ref_pending_size = remaining
+
+    def _noise_threshold(self) -> np.ndarray:
+        """
+        Get the per-frequency noise threshold, as mean + n * std of the reference dB spectra.
+        """
+        if self._threshold_stale:
+            mean = self._sum / self._ring_capacity
+            var = np.maximum(self._sumsq / self._ring_capacity - mean**2, 0)
+            self._threshold[:] = mean + _N_STD_THRESH * np.sqrt(var)
+            self._threshold_stale = False
+        return self._threshold
+
+    def process(
+        self,
+        input_pcm: bytes,
+        reference_pcm: bytes | None,
+    ) -> tuple[bytes, float]:
+        input_int = np.frombuffer(input_pcm, dtype=np.int16)
+
+        # Reference signal is empty, skip noise reduction
+        if reference_pcm is None or reference_pcm == self._empty_packet:
+            self._push_reference(None)
+            np.multiply(input_int, 1 / 32768, out=self._out, casting="unsafe")
+            return input_pcm, float(
+                np.sqrt(np.dot(self._out, self._out) / self._chunk_size)
+            )
+
+        # Update the noise profile with the reference signal
+        self._push_reference(np.frombuffer(reference_pcm, dtype=np.int16))
+
+        # Frame the input, reflect padded
+        pad = self._pad
+        chunk_end = pad + self._chunk_size
+        np.multiply(
+            input_int,
+            1 / 32768,
+            out=self._padded[pad:chunk_end],
+            casting="unsafe",
+        )
+        self._padded[:pad] = self._padded[pad + 1 : 2 * pad + 1][::-1]
+        right = len(self._padded) - chunk_end
+        self._padded[chunk_end:] = self._padded[chunk_end - right - 1 : chunk_end - 1][
+            ::-1
+        ]
+        np.multiply(self._frames_view, _WINDOW, out=self._frames)
+
+        # Gate the spectrum against the noise profile
+        np.fft.rfft(self._frames, axis=1, out=self._spec)
+        _to_db(self._spec, out=self._mag_db)
+        np.greater(self._mag_db, self._noise_threshold(), out=self._mask)
+        np.multiply(self._mask, _PROP_DECREASE, out=self._gain)
+        np.add(self._gain, 1 - _PROP_DECREASE, out=self._gain)
+        np.multiply(self._spec, self._gain, out=self._spec)
+
+        # Inverse STFT, with half overlap-add
+        np.fft.irfft(self._spec, n=_N_FFT, axis=1, out=self._frames)
+        np.multiply(self._frames, _WINDOW, out=self._frames)
+        self._ola.fill(0)
+        self._ola_blocks[:-1] += self._frames[:, :_HOP]
+        self._ola_blocks[1:] += self._frames[:, _HOP:]
+        np.multiply(self._ola[pad:chunk_end], self._inv_norm, out=self._out)
+
+        # Convert processed float signal back to PCM
+        rms = float(np.sqrt(np.dot(self._out, self._out) / self._chunk_size))
+        np.multiply(self._out, 32767, out=self._out)
+        np.clip(self._out, -32768, 32767, out=self._out)
+        self._out_pcm[:] = self._out
+        return self._out_pcm.tobytes(), rms
+
+
+class BatchRingAecEngine:
+    """
+    Same processing as `RingAecEngine`, for many calls at once.
+
+    Each call is a slot in arrays indexed by slot. A batch contains at most one packet per slot, and is processed with one vectorized kernel, amortizing the Python and NumPy dispatch overhead across calls.
+
+    Packet size must be a multiple of the STFT hop.
+    """
+
+    _capacity: int
+    _chunk_size: int
+    _free_slots: list[int]
+    _inv_norm: np.ndarray
+    _ring_capacity: int
+    _ring_db: np.ndarray
+    _ring_pointer: np.ndarray
+    _ring_writes: np.ndarray
+    _ref_tail: np.ndarray
+    _sum: np.ndarray
+    _sumsq: np.ndarray
+
+    def __init__(
+        self,
+        chunk_size: int,
+        max_delay_samples: int,
+        capacity: int = 64,
+    ):
+        if chunk_size % _HOP:
+            raise ValueError(
+                f"Packet size {chunk_size} must be a multiple of {_HOP} samples."
+            )
+        self._chunk_size = chunk_size
+        self._capacity = 0
+        self._free_slots = []
+        self._ring_capacity = max(1, -(-max_delay_samples // _HOP))
+
+        # Inverse of the squared window overlap, for the output samples only
+        norm = np.zeros(chunk_size + _N_FFT, dtype=np.float32)
+        norm_blocks = norm.reshape(-1, _HOP)
+        norm_blocks[:-1] += _WINDOW[:_HOP] ** 2
+        norm_blocks[1:] += _WINDOW[_HOP:] ** 2
+        self._inv_norm = 1 / norm[_HOP : _HOP + chunk_size]
+
+        n_bins = _N_FFT // 2 + 1
+        self._ring_db = np.empty((0, self._ring_capacity, n_bins), dtype=np.float32)
+        self._ring_pointer = np.empty(0, dtype=np.intp)
+        self._ring_writes = np.empty(0, dtype=np.intp)
+        self._ref_tail = np.empty((0, _N_FFT - _HOP), dtype=np.float32)
+        self._sum = np.empty((0, n_bins), dtype=np.float64)
+        self._sumsq = np.empty((0, n_bins), dtype=np.float64)
+        self._grow(capacity)
+
+    def _grow(self, capacity: int) -> None:
+        """
+        Extend the slot arrays, new slots are free.
+        """
+        added = capacity - self._capacity
+        self._ring_db = np.concatenate(
+            [
+                self._ring_db,
+                np.full(
+                    (added, *self._ring_db.shape[1:]),
+                    _SILENCE_DB,
+                    dtype=np.float32,
+                ),
+            ]
+        )
+        self._ring_pointer = np.concatenate(
+            [self._ring_pointer, np.zeros(added, dtype=np.intp)]
+        )
+        self._ring_writes = np.concatenate(
+            [self._ring_writes, np.zeros(added, dtype=np.intp)]
+        )
+        self._ref_tail = np.concatenate(
+            [self._ref_tail, np.zeros((added, self._ref_tail.shape[1]), np.float32)]
+        )
+        self._sum = np.concatenate([self._sum, np.zeros((added, self._sum.shape[1]))])
+        self._sumsq = np.concatenate(
+            [self._sumsq, np.zeros((added, self._sumsq.shape[1]))]
+        )
+        self._free_slots.extend(range(capacity - 1, self._capacity - 1, -1))
+        self._capacity = capacity
+
+    def _reset(self, slots: np.ndarray) -> None:
+        """
+        Reset the state of slots, as silence.
+        """
+        self._ring_db[slots] = _SILENCE_DB
+        self._ring_pointer[slots] = 0
+        self._ring_writes[slots] = 0
+        self._ref_tail[slots] = 0
+        self._sum[slots] = _SILENCE_DB * self._ring_capacity
+        self._sumsq[slots] = _SILENCE_DB**2 * self._ring_capacity
+
+    def open_slot(self) -> int:
+        """
+        Reserve a slot for a new call.
+        """
+        if not self._free_slots:
+            self._grow(self._capacity * 2)
+        slot = self._free_slots.pop()
+        self._reset(np.array([slot]))
+        return slot
+
+    def close_slot(self, slot: int) -> None:
+        """
+        Release the slot of a call.
+        """
+        self._free_slots.append(slot)
+
+    def _push_reference(
+        self,
+        slots: np.ndarray,
+        references: np.ndarray,
+        has_reference: np.ndarray,
+    ) -> None:
+        """
+        Convert reference packets to dB spectra, write them in the rings, and update the running sums.
+        """
+        # Frame the reference, continuing the previous packet
+        signal = np.concatenate(
+            [self._ref_tail[slots], references.astype(np.float32) / 32768],
+            axis=1,
+        )
+        signal[~has_reference, self._ref_tail.shape[1] :] = 0
+        self._ref_tail[slots] = signal[:, -self._ref_tail.shape[1] :]
+        frames = sliding_window_view(signal, _N_FFT, axis=1)[:, ::_HOP]
+        new_db = np.full((*frames.shape[:2], _N_FFT // 2 + 1), _SILENCE_DB, np.float32)
+        if has_reference.any():
+            new_db[has_reference] = _to_db(
+                np.fft.rfft(frames[has_reference] * _WINDOW, axis=-1)
+            )
+
+        # Write in the rings
+        count = min(new_db.shape[1], self._ring_capacity)
+        new_db = new_db[:, -count:]
+        indexes = (
+            self._ring_pointer[slots][:, None] + np.arange(count)
+        ) % self._ring_capacity
+        old = self._ring_db[slots[:, None], indexes].astype(np.float64)
+        new = new_db.astype(np.float64)
+        self._sum[slots] += new.sum(axis=1) - old.sum(axis=1)
+        self._sumsq[slots] += (new**2).sum(axis=1) - (old**2).sum(axis=1)
+        self._ring_db[slots[:, None], indexes] = new_db
+        self._ring_pointer[slots] = (
+            self._ring_pointer[slots] + count
+        ) % self._ring_capacity
+
+        # Periodically resync sums, to avoid floating point drift
+        self._ring_writes[slots] += count
+        resync = slots[self._ring_writes[slots] >= self._ring_capacity * 8]
+        if len(resync):
+            ring = self._ring_db[resync].astype(np.float64)
+            self._sum[resync] = ring.sum(axis=1)
+            self._sumsq[resync] = (ring**2).sum(axis=1)
+            self._ring_writes[resync] = 0
+
+    def process(
+        self,
+        slots: np.ndarray,
+        inputs: np.ndarray,
+        references: np.ndarray,
+        has_reference: np.ndarray,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Process one packet for each slot.
+
+        Parameters:
+        - `slots`: Slot of each packet, unique.
+        - `inputs`: Input packets, PCM 16-bit, one row per packet.
+        - `references`: Reference packets, PCM 16-bit, one row per packet. Ignored when `has_reference` is False.
+        - `has_reference`: If a reference is available, for each packet.
+
+        Returns a tuple with the echo-cancelled packets, PCM 16-bit, and their RMS.
+        """
+        self._push_reference(
+            has_reference=has_reference,
+            references=references,
+            slots=slots,
+        )
+        signal = inputs.astype(np.float32) / 32768
+
+        # Without reference, skip noise reduction
+        out = signal.copy()
+        gated = np.flatnonzero(has_reference)
+        if len(gated):
+            # Noise threshold, as mean + n * std of the reference dB spectra
+            mean = self._sum[slots[gated]] / self._ring_capacity
+            var = np.maximum(
+                self._sumsq[slots[gated]] / self._ring_capacity - mean**2, 0
+            )
+            threshold = (mean + _N_STD_THRESH * np.sqrt(var)).astype(np.float32)
+
+            # Frame the input, reflect padded
+            padded = np.pad(signal[gated], ((0, 0), (_HOP, _HOP)), mode="reflect")
+            frames = sliding_window_view(padded, _N_FFT, axis=1)[:, ::_HOP] * _WINDOW
+
+            # Gate the spectrum against the noise profile
+            spec = np.fft.rfft(frames, axis=-1)
+            mask = _to_db(spec) > threshold[:, None, :]
+            spec *= mask * np.float32(_PROP_DECREASE) + np.float32(1 - _PROP_DECREASE)
+
+            # Inverse STFT, with half overlap-add
+            frames = np.fft.irfft(spec, n=_N_FFT, axis=-1) * _WINDOW
+            ola = np.zeros((len(gated), frames.shape[1] + 1, _HOP), dtype=np.float32)
+            ola[:, :-1] += frames[:, :, :_HOP]
+            ola[:, 1:] += frames[:, :, _HOP:]
+            out[gated] = (
+                ola.reshape(len(gated), -1)[:, _HOP : _HOP + self._chunk_size]
+                * self._inv_norm
+            )
+
+        # Convert processed float signal back to PCM
+        rms = np.sqrt(np.einsum("ij,ij->i", out, out) / self._chunk_size)
+        pcm = (out * 32767).clip(-32768, 32767).astype(np.int16)
+        pcm[~has_reference] = inputs[~has_reference]  # Keep raw input untouched
+        return pcm, rms
+
+
+def new_engine(
+    chunk_size: int,
+    engine: EngineEnum,
+    max_delay_samples: int,
+    sample_rate: int,
+) -> IAecEngine:
+    """
+    Create a new echo cancellation engine, one per call.
+    """
+    if engine == EngineEnum.RING:
+        return RingAecEngine(
+            chunk_size=chunk_size,
+            max_delay_samples=max_delay_samples,
+            sample_rate=sample_rate,
+        )
+    return NoisereduceAecEngine(
+        chunk_size=chunk_size,
+        max_delay_samples=max_delay_samples,
+        sample_rate=sample_rate,
+    )
+
+
+# Sessions opened in this process, when used as a worker of a process pool
+_worker_sessions: dict[str, tuple[IAecEngine, SharedMemory, int, int]] = {}
+
+
+def worker_open(  # noqa: PLR0913
+    *,
+    batch_size: int,
+    chunk_size: int,
+    engine: EngineEnum,
+    max_delay_samples: int,
+    sample_rate: int,
+    session_id: str,
+    shm_name: str,
+) -> None:
+    """
+    Open a session in the worker process.
+
+    The shared memory is created by the caller and holds, in order, `batch_size` input packets, `batch_size` reference packets, and `batch_size` output packets.
+    """
+    _worker_sessions[session_id] = (
+        new_engine(
+            chunk_size=chunk_size,
+            engine=engine,
+            max_delay_samples=max_delay_samples,
+            sample_rate=sample_rate,
+        ),
+        SharedMemory(
+            name=shm_name,
+            track=False,  # Owned by the caller
+        ),
+        batch_size,
+        chunk_size * 2,  # Each sample is 2 bytes (PCM 16-bit)
+    )
+
+
+def worker_process(
+    references: tuple[bool, ...],
+    session_id: str,
+) -> list[float]:
+    """
+    Process a batch of packets from the shared memory, in the worker process.
+
+    Each item of `references` tells if a reference packet is available for the input packet of the same index. Outputs are written in the shared memory. Returns the RMS of each output packet.
+    """
+    engine, shm, batch_size, packet_size = _worker_sessions[session_id]
+    buf = shm.buf
+    rms_list = []
+    for i, has_reference in enumerate(references):
+        input_start = i * packet_size
+        reference_start = (batch_size + i) * packet_size
+        output_start = (2 * batch_size + i) * packet_size
+        output_pcm, rms = engine.process(
+            input_pcm=bytes(buf[input_start : input_start + packet_size]),
+            reference_pcm=bytes(buf[reference_start : reference_start + packet_size])
+            if has_reference
+            else None,
+        )
+        buf[output_start : output_start + packet_size] = output_pcm
+        rms_list.append(rms)
+    return rms_list
+
+
+def worker_close(session_id: str) -> None:
+    """
+    Close a session in the worker process.
+    """
+    session = _worker_sessions.pop(session_id, None)
+    if session:
+        session[1].close()
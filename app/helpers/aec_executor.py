@@ -0,0 +1,461 @@
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import suppress
+from functools import partial
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+from uuid import uuid4
+
+import numpy as np
+
+from app.helpers.aec import (
+    BatchRingAecEngine,
+    IAecEngine,
+    new_engine,
+    worker_close,
+    worker_open,
+    worker_process,
+)
+from app.helpers.config import CONFIG
+from app.helpers.config_models.aec import ExecutorEnum
+from app.helpers.logging import logger
+from app.helpers.monitoring import call_aec_latency, call_aec_pending, gauge_set
+
+# Process pool, shared by all calls of this application worker
+_pool: list[ProcessPoolExecutor] = []
+_pool_sessions: list[int] = []
+_pending_frames = 0
+
+# Hubs, shared by all calls of this application worker, by audio format
+_hubs: dict[tuple[int, int, int], "AecHub"] = {}
+
+
+class IAecSession(ABC):
+    """
+    Echo cancellation session, one per call.
+    """
+
+    @abstractmethod
+    async def process(
+        self,
+        frames: list[bytes],
+        references: list[bytes | None],
+    ) -> list[tuple[bytes, float]]:
+        """
+        Process a batch of input packets, with the reference packet of each one, if any.
+
+        Returns a list of tuples with the echo-cancelled PCM audio and its RMS, in the same order.
+        """
+
+    @abstractmethod
+    async def close(self) -> None:
+        pass
+
+
+class InlineAecSession(IAecSession):
+    """
+    Process frames in the event loop.
+    """
+
+    _engine: IAecEngine
+
+    def __init__(self, engine: IAecEngine):
+        self._engine = engine
+
+    async def process(
+        self,
+        frames: list[bytes],
+        references: list[bytes | None],
+    ) -> list[tuple[bytes, float]]:
+        return [
+            self._engine.process(
+                input_pcm=input_pcm,
+                reference_pcm=reference_pcm,
+            )
+            for input_pcm, reference_pcm in zip(frames, references, strict=True)
+        ]
+
+    async def close(self) -> None:
+        pass
+
+
+class ProcessAecSession(IAecSession):
+    """
+    Process frames in a worker process, shared with other calls.
+
+    Engine state stays in the worker, so a session is pinned to one worker for its lifetime. Packets are exchanged with a shared memory block, only the session ID and the reference flags are serialized.
+    """
+
+    _batch_size: int
+    _packet_size: int
+    _session_id: str
+    _shm: SharedMemory
+    _worker_index: int
+
+    def __init__(
+        self,
+        batch_size: int,
+        chunk_size: int,
+    ):
+        self._batch_size = batch_size
+        self._packet_size = chunk_size * 2  # Each sample is 2 bytes (PCM 16-bit)
+        self._session_id = str(uuid4())
+        self._shm = SharedMemory(
+            create=True,
+            size=3 * batch_size * self._packet_size,  # Input, reference, output
+        )
+
+        # Pin to the least used worker
+        self._worker_index = _pool_sessions.index(min(_pool_sessions))
+        _pool_sessions[self._worker_index] += 1
+
+    async def open(
+        self,
+        engine_kwargs: dict,
+    ) -> None:
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                _pool[self._worker_index],
+                partial(
+                    worker_open,
+                    batch_size=self._batch_size,
+                    session_id=self._session_id,
+                    shm_name=self._shm.name,
+                    **engine_kwargs,
+                ),
+            )
+        # Release resources, the session is not usable
+        except BaseException:
+            self._release()
+            raise
+
+    async def process(
+        self,
+        frames: list[bytes],
+        references: list[bytes | None],
+    ) -> list[tuple[bytes, float]]:
+        global _pending_frames  # noqa: PLW0603
+
+        if len(frames) > self._batch_size:
+            raise ValueError(
+                f"Batch of {len(frames)} frames exceeds the limit of {self._batch_size}."
+            )
+
+        # Write packets to the shared memory
+        buf = self._shm.buf
+        size = self._packet_size
+        for i, (input_pcm, reference_pcm) in enumerate(
+            zip(frames, references, strict=True)
+        ):
+            buf[i * size : (i + 1) * size] = input_pcm
+            if reference_pcm:
+                start = (self._batch_size + i) * size
+                buf[start : start + size] = reference_pcm
+
+        # Process in the worker
+        _pending_frames += len(frames)
+        gauge_set(
+            metric=call_aec_pending,
+            value=_pending_frames,
+        )
+        start = time.monotonic()
+        try:
+            rms_list = await asyncio.get_running_loop().run_in_executor(
+                _pool[self._worker_index],
+                partial(
+                    worker_process,
+                    references=tuple(bool(reference) for reference in references),
+                    session_id=self._session_id,
+                ),
+            )
+        finally:
+            _pending_frames -= len(frames)
+            gauge_set(
+                metric=call_aec_pending,
+                value=_pending_frames,
+            )
+        gauge_set(
+            metric=call_aec_latency,
+            value=time.monotonic() - start,
+        )
+
+        # Read packets from the shared memory
+        output_start = 2 * self._batch_size * size
+        return [
+            (
+                bytes(buf[output_start + i * size : output_start + (i + 1) * size]),
+                rms,
+            )
+            for i, rms in enumerate(rms_list)
+        ]
+
+    async def close(self) -> None:
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                _pool[self._worker_index],
+                partial(
+                    worker_close,
+                    session_id=self._session_id,
+                ),
+            )
+        finally:
+            self._release()
+
+    def _release(self) -> None:
+        """
+        Unpin from the worker and free the shared memory.
+        """
+        if self._worker_index < len(_pool_sessions):  # Pool may be already stopped
+            _pool_sessions[self._worker_index] -= 1
+        self._shm.close()
+        self._shm.unlink()
+
+
+class AecHub:
+    """
+    Collect frames of all calls of this application worker, and process them together once per packet duration.
+
+    Frames are stacked in 2-D arrays and processed with one vectorized kernel. When a call sent many frames since the last tick, they are processed in successive rounds, to keep the order.
+    """
+
+    _empty_packet: bytes
+    _engine: BatchRingAecEngine
+    _packet_size: int
+    _queues: dict[int, deque[tuple[bytes, bytes | None, asyncio.Future]]]
+    _task: asyncio.Task | None = None
+    _tick_sec: float
+
+    def __init__(
+        self,
+        chunk_size: int,
+        max_delay_samples: int,
+        sample_rate: int,
+    ):
+        self._engine = BatchRingAecEngine(
+            chunk_size=chunk_size,
+            max_delay_samples=max_delay_samples,
+        )
+        self._packet_size = chunk_size * 2  # Each sample is 2 bytes (PCM 16-bit)
+        self._empty_packet = b"\x00" * self._packet_size
+        self._queues = {}
+        self._tick_sec = chunk_size / sample_rate
+
+    def open(self) -> int:
+        """
+        Register a call, and start the hub if needed.
+
+        Returns the slot of the call.
+        """
+        slot = self._engine.open_slot()
+        self._queues[slot] = deque()
+        if not self._task or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return slot
+
+    def close(self, slot: int) -> None:
+        """
+        Unregister a call, pending frames are cancelled. No-op if already closed, like by `stop`.
+        """
+        queue = self._queues.pop(slot, None)
+        if queue is None:
+            return
+        for _, _, future in queue:
+            future.cancel()
+        self._engine.close_slot(slot)
+
+    async def stop(self) -> None:
+        """
+        Stop the hub, pending frames of all calls are cancelled.
+        """
+        for slot in list(self._queues):
+            self.close(slot)
+        if self._task:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+
+    def submit(
+        self,
+        input_pcm: bytes,
+        reference_pcm: bytes | None,
+        slot: int,
+    ) -> asyncio.Future[tuple[bytes, float]]:
+        """
+        Queue a frame for the next tick.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._queues[slot].append((input_pcm, reference_pcm, future))
+        return future
+
+    async def _run(self) -> None:
+        """
+        Process frames on each tick, until no call is registered.
+        """
+        while self._queues:
+            await asyncio.sleep(self._tick_sec)
+            gauge_set(
+                metric=call_aec_pending,
+                value=sum(len(queue) for queue in self._queues.values()),
+            )
+            start = time.monotonic()
+            while self._flush_round():
+                pass
+            gauge_set(
+                metric=call_aec_latency,
+                value=time.monotonic() - start,
+            )
+
+    def _flush_round(self) -> bool:
+        """
+        Process the oldest frame of each call.
+
+        Returns True if frames were processed.
+        """
+        slots = [slot for slot, queue in self._queues.items() if queue]
+        if not slots:
+            return False
+        items = [self._queues[slot].popleft() for slot in slots]
+
+        try:
+            # Stack frames
+            inputs = np.frombuffer(
+                b"".join(input_pcm for input_pcm, _, _ in items),
+                dtype=np.int16,
+            ).reshape(len(items), -1)
+            references = np.frombuffer(
+                b"".join(
+                    reference_pcm or self._empty_packet for _, reference_pcm, _ in items
+                ),
+                dtype=np.int16,
+            ).reshape(len(items), -1)
+            # Silent reference is no reference, like in RingAecEngine
+            has_reference = np.array(
+                [
+                    reference_pcm is not None and reference_pcm != self._empty_packet
+                    for _, reference_pcm, _ in items
+                ]
+            )
+
+            # Process all calls at once
+            outputs, rms_list = self._engine.process(
+                has_reference=has_reference,
+                inputs=inputs,
+                references=references,
+                slots=np.array(slots),
+            )
+
+        # Fail the frames of this round, next rounds can still succeed
+        except Exception as e:
+            for _, _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+            return True
+
+        # Scatter results
+        for (_, _, future), output, rms in zip(items, outputs, rms_list, strict=True):
+            if not future.done():
+                future.set_result((output.tobytes(), float(rms)))
+        return True
+
+
+class HubAecSession(IAecSession):
+    """
+    Process frames in the hub of this application worker, with frames of other calls.
+    """
+
+    _hub: AecHub
+    _slot: int
+
+    def __init__(self, hub: AecHub):
+        self._hub = hub
+        self._slot = hub.open()
+
+    async def process(
+        self,
+        frames: list[bytes],
+        references: list[bytes | None],
+    ) -> list[tuple[bytes, float]]:
+        return list(
+            await asyncio.gather(
+                *[
+                    self._hub.submit(
+                        input_pcm=input_pcm,
+                        reference_pcm=reference_pcm,
+                        slot=self._slot,
+                    )
+                    for input_pcm, reference_pcm in zip(frames, references, strict=True)
+                ]
+            )
+        )
+
+    async def close(self) -> None:
+        self._hub.close(self._slot)
+
+
+async def new_session(
+    chunk_size: int,
+    max_delay_samples: int,
+    sample_rate: int,
+) -> IAecSession:
+    """
+    Create a new echo cancellation session, with the configured engine and executor.
+    """
+    engine_kwargs = {
+        "chunk_size": chunk_size,
+        "engine": CONFIG.aec.engine,
+        "max_delay_samples": max_delay_samples,
+        "sample_rate": sample_rate,
+    }
+
+    # Process in the event loop
+    if CONFIG.aec.executor == ExecutorEnum.INLINE:
+        return InlineAecSession(new_engine(**engine_kwargs))
+
+    # Process in the hub, with other calls
+    if CONFIG.aec.executor == ExecutorEnum.HUB:
+        hub_key = (chunk_size, max_delay_samples, sample_rate)
+        if hub_key not in _hubs:
+            _hubs[hub_key] = AecHub(
+                chunk_size=chunk_size,
+                max_delay_samples=max_delay_samples,
+                sample_rate=sample_rate,
+            )
+        return HubAecSession(_hubs[hub_key])
+
+    # Process in the pool, start it if needed
+    if not _pool:
+        logger.info("Starting AEC process pool with %i workers", CONFIG.aec.workers)
+        for _ in range(CONFIG.aec.workers):
+            _pool.append(
+                ProcessPoolExecutor(
+                    max_workers=1,
+                    # Forking a process with running threads and event loop is unsafe
+                    mp_context=get_context("spawn"),
+                )
+            )
+            _pool_sessions.append(0)
+    session = ProcessAecSession(
+        batch_size=CONFIG.aec.batch_size,
+        chunk_size=chunk_size,
+    )
+    await session.open(engine_kwargs)
+    return session
+
+
+async def shutdown() -> None:
+    """
+    Stop the process pool and the hubs, if started.
+    """
+    for executor in _pool:
+        executor.shutdown(
+            cancel_futures=True,
+            wait=False,
+        )
+    _pool.clear()
+    _pool_sessions.clear()
+    for hub in _hubs.values():
+        await hub.stop()
+    _hubs.clear()
@@ -1,11 +1,13 @@
 import asyncio
 from collections import OrderedDict
-from collections.abc import AsyncGenerator, Awaitable
+from collections.abc import AsyncGenerator, Awaitable, Callable, Hashable
 from contextlib import asynccontextmanager
 from functools import wraps
 
 from aiojobs import Scheduler
 
+_flights: dict[tuple[int, Hashable], asyncio.Future] = {}
+
 
 @asynccontextmanager
 async def get_scheduler() -> AsyncGenerator[Scheduler]:
@@ -20,11 +22,39 @@ async def get_scheduler() -> AsyncGenerator[Scheduler]:
         yield scheduler
 
 
-def lru_acache(maxsize: int = 128):
+async def single_flight[T](key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+    """
+    Run a coroutine once for all the concurrent callers with the same key.
+
+    The first caller starts it, the others wait for its result, or its exception. Cancelling a caller does not cancel the run, others may still wait for it. Once done, the next call starts a new run.
+
+    Returns the result of the run, shared by all the callers.
+    """
+    flight_key = (id(asyncio.get_running_loop()), key)
+    flight = _flights.get(flight_key)
+
+    # Start a new run
+    if not flight:
+        flight = asyncio.ensure_future(func())
+        _flights[flight_key] = flight
+
+        def _land(_: asyncio.Future) -> None:
+            if _flights.get(flight_key) is flight:
+                del _flights[flight_key]
+
+        flight.add_done_callback(_land)
+
+    return await asyncio.shield(flight)
+
+
+def lru_acache(
+    maxsize: int = 128,
+    key_func: Callable[..., Hashable] | None = None,
+):
     """
     Caches an async function's return value each time it is called.
 
-    If the maxsize is reached, the least recently used value is removed.
+    If the maxsize is reached, the least recently used value is removed. If `key_func` is provided, it is called with the function arguments to build the cache key, instead of the arguments themselves. Concurrent first calls with the same key run the function once, see `single_flight`.
     """
 
     def decorator(func):
@@ -35,8 +65,8 @@ def lru_acache(maxsize: int = 128):
             # Create a cache key from event loop, args and kwargs, using frozenset for kwargs to ensure hashability
             key = (
                 id(asyncio.get_event_loop()),
-                args,
-                frozenset(kwargs.items()),
+                key_func(*args, **kwargs) if key_func else args,
+                frozenset() if key_func else frozenset(kwargs.items()),
             )
 
             if key in cache:
@@ -44,8 +74,11 @@ def lru_acache(maxsize: int = 128):
                 cache.move_to_end(key)
                 return cache[key]
 
-            # Compute the value since it's not cached
-            value = await func(*args, **kwargs)
+            # Compute the value since it's not cached, once for concurrent calls
+            value = await single_flight(
+                key=(func, key),
+                func=lambda: func(*args, **kwargs),
+            )
             cache[key] = value
             cache.move_to_end(key)
 
@@ -234,7 +234,7 @@ async def on_automation_recognize_error(
     logger.info(
         "Timeout, retrying language selection (%s/%s)",
         call.recognition_retry,
-        await recognition_retry_max(),
+        recognition_retry_max(),
     )
     await _handle_ivr_language(
         call=call,
@@ -320,7 +320,7 @@ async def _pre_recognize_error(
     Returns True if the call should continue, False if it should end.
     """
     # Voice retries are exhausted, end call
-    if call.recognition_retry >= await recognition_retry_max():
+    if call.recognition_retry >= recognition_retry_max():
         logger.info("Timeout, ending call")
         return False
 
@@ -573,6 +573,8 @@ async def hangup_now(
                     persona=MessagePersonaEnum.HUMAN,
                 )
             )
+        # Persist now, the call will not be updated anymore
+        await _db.call_flush(call)
 
     await asyncio.gather(
         handle_hangup(client=client, call=call),
@@ -801,7 +803,7 @@ async def _handle_recording(
 
     Feature activation is checked before starting the recording.
     """
-    if not await recording_enabled():
+    if not recording_enabled():
         return
 
     assert CONFIG.communication_services.recording_container_url
@@ -1,10 +1,12 @@
 import asyncio
 import time
-from collections.abc import Awaitable, Callable
+from collections.abc import AsyncGenerator, Awaitable, Callable
+from contextlib import AbstractAsyncContextManager, nullcontext
 from datetime import UTC, datetime, timedelta
 from functools import wraps
 
 from aiojobs import Scheduler
+from azure.ai.inference.models import StreamingChatResponseMessageUpdate
 from azure.cognitiveservices.speech import (
     SpeechSynthesizer,
 )
@@ -15,6 +17,7 @@ from app.helpers.call_utils import (
     SttClient,
     handle_media,
     handle_realtime_tts,
+    recognition_distance,
     tts_sentence_split,
     use_tts_client,
 )
@@ -23,6 +26,9 @@ from app.helpers.features import (
     answer_hard_timeout_sec,
     answer_soft_timeout_sec,
     phone_silence_timeout_sec,
+    speculative_answer_enabled,
+    speculative_answer_max_distance,
+    speculative_answer_min_silence_ms,
     vad_cutoff_timeout_ms,
     vad_silence_timeout_ms,
 )
@@ -35,7 +41,12 @@ from app.helpers.llm_worker import (
 from app.helpers.logging import logger
 from app.helpers.monitoring import (
     SpanAttributeEnum,
+    call_chat_reaction_latency,
     call_cutoff_latency,
+    call_speculative_hit,
+    call_speculative_miss,
+    call_speculative_waste,
+    counter_add,
     gauge_set,
     start_as_current_span,
 )
@@ -47,14 +58,95 @@ from app.models.message import (
     StyleEnum as MessageStyleEnum,
     ToolModel as MessageToolModel,
     extract_message_style,
+    translate_messages,
 )
 
 _db = CONFIG.database.instance
 
 
+class _SpeculativeAnswer:
+    """
+    LLM completion started on the partial recognition, while the silence is not yet confirmed.
+
+    Deltas are buffered, nothing is played nor stored until the answer is committed.
+    """
+
+    history_size: int
+    text: str
+    _deltas: list[StreamingChatResponseMessageUpdate]
+    _done: bool = False
+    _error: Exception | None = None
+    _task: asyncio.Task
+    _updated: asyncio.Event
+
+    def __init__(
+        self,
+        history_size: int,
+        stream: AsyncGenerator[StreamingChatResponseMessageUpdate],
+        text: str,
+    ):
+        """
+        Start the completion.
+
+        Parameters:
+        - `history_size`: Number of messages in the call when the completion started.
+        - `stream`: Completion stream, built with the partial recognition as last message.
+        - `text`: Partial recognition.
+        """
+        self.history_size = history_size
+        self.text = text
+        self._deltas = []
+        self._updated = asyncio.Event()
+        self._task = asyncio.create_task(self._consume(stream))
+
+    async def _consume(
+        self,
+        stream: AsyncGenerator[StreamingChatResponseMessageUpdate],
+    ) -> None:
+        """
+        Buffer the completion stream.
+        """
+        try:
+            async for delta in stream:
+                self._deltas.append(delta)
+                self._updated.set()
+        # Raise it when replayed
+        except Exception as e:
+            self._error = e
+        finally:
+            self._done = True
+            self._updated.set()
+
+    async def replay(self) -> AsyncGenerator[StreamingChatResponseMessageUpdate]:
+        """
+        Stream the buffered deltas, then the next ones until the completion ends.
+        """
+        index = 0
+        try:
+            while True:
+                while index < len(self._deltas):
+                    yield self._deltas[index]
+                    index += 1
+                if self._done:
+                    break
+                self._updated.clear()
+                await self._updated.wait()
+        # Stop the completion if the chat is interrupted
+        finally:
+            self.cancel()
+        if self._error:
+            raise self._error
+
+    def cancel(self) -> None:
+        """
+        Stop the completion, no-op if already ended.
+        """
+        self._task.cancel()
+
+
 # TODO: Refacto, this function is too long
 @start_as_current_span("call_load_llm_chat")
-async def load_llm_chat(  # noqa: PLR0913
+async def load_llm_chat(  # noqa: PLR0913, PLR0915
     audio_in: asyncio.Queue[bytes],
     audio_out: asyncio.Queue[bytes | bool],
     audio_sample_rate: int,
@@ -137,6 +229,7 @@ async def load_llm_chat(  # noqa: PLR0913
 
         async def _commit_answer(
             wait: bool,
+            speculation: _SpeculativeAnswer | None = None,
             tool_blacklist: set[str] = set(),
         ) -> None:
             """
@@ -152,6 +245,7 @@ async def load_llm_chat(  # noqa: PLR0913
                     client=automation_client,
                     post_callback=post_callback,
                     scheduler=scheduler,
+                    speculation=speculation,
                     tool_blacklist=tool_blacklist,
                     training_callback=training_callback,
                     tts_client=tts_client,
@@ -162,12 +256,88 @@ async def load_llm_chat(  # noqa: PLR0913
             if wait:
                 await last_chat
 
+        # Speculative answer, started before the silence is confirmed
+        speculation: _SpeculativeAnswer | None = None
+
+        def _discard_speculation() -> None:
+            """
+            Cancel the speculative answer, if any, before it was compared to the complete recognition.
+            """
+            nonlocal speculation
+            if not speculation:
+                return
+            speculation.cancel()
+            counter_add(
+                metric=call_speculative_waste,
+                value=1,
+            )
+            speculation = None
+
+        async def _speculate_callback() -> None:
+            """
+            Triggered when the user may have ended speaking.
+
+            Start the answer on the partial recognition, once it is stable for a minimum silence, and if it changed since the last one. Cancelled if the user speaks again.
+            """
+            nonlocal speculation
+
+            # Skip if disabled
+            if not speculative_answer_enabled():
+                return
+
+            # Skip if nothing new was recognized
+            text = stt_client.partial_recognition()
+            if not text or (speculation and speculation.text == text):
+                return
+
+            # Skip if the recognition changed during the minimum silence, the user may only be taking a breath
+            await asyncio.sleep(speculative_answer_min_silence_ms() / 1000)
+            if stt_client.partial_recognition() != text:
+                return
+
+            # Replace the previous speculation
+            _discard_speculation()
+            logger.debug("Starting speculative answer for: %s", text)
+            # Copy the messages, translations of the speculation must not be stored in the call
+            speculative_call = call.model_copy(
+                update={
+                    "messages": [
+                        *(message.model_copy() for message in call.messages),
+                        MessageModel(
+                            content=text,
+                            lang_short_code=call.lang.short_code,
+                            persona=MessagePersonaEnum.HUMAN,
+                        ),
+                    ]
+                }
+            )
+            speculation = _SpeculativeAnswer(
+                history_size=len(call.messages),
+                stream=_completion_stream(
+                    call=speculative_call,
+                    plugins=DefaultPlugin(
+                        call=speculative_call,
+                        client=automation_client,
+                        post_callback=post_callback,
+                        scheduler=scheduler,
+                        tts_callback=_speculative_tts_callback,
+                        tts_client=tts_client,
+                    ),
+                    scheduler=None,  # Never persisted
+                    tool_blacklist=set(),
+                    use_tools=True,
+                ),
+                text=text,
+            )
+
         async def _response_callback(_retry: bool = False) -> None:
             """
             Triggered when the audio buffer needs to be processed.
 
             If the recognition is empty, retry the recognition once. Otherwise, process the response.
             """
+            nonlocal speculation
+
             # Report the answer latency
             aec.answer_start()
 
@@ -183,6 +353,32 @@ async def load_llm_chat(  # noqa: PLR0913
                 await asyncio.sleep(0.2)
                 return await _response_callback(_retry=True)
 
+            # Keep the speculative answer if the user said what was expected, with the same history
+            kept_speculation = None
+            if speculation:
+                if (
+                    speculation.history_size == len(call.messages)
+                    and recognition_distance(
+                        complete=stt_text,
+                        partial=speculation.text,
+                    )
+                    <= speculative_answer_max_distance()
+                ):
+                    logger.info("Speculative answer kept")
+                    counter_add(
+                        metric=call_speculative_hit,
+                        value=1,
+                    )
+                    kept_speculation = speculation
+                else:
+                    logger.info("Speculative answer diverged, restarting")
+                    speculation.cancel()
+                    counter_add(
+                        metric=call_speculative_miss,
+                        value=1,
+                    )
+                speculation = None
+
             # Stop any previous response, but keep the metrics
             await _stop_callback()
 
@@ -202,7 +398,10 @@ async def load_llm_chat(  # noqa: PLR0913
                 )
 
             # Process the response and wait for it to be able to kill the task if needed
-            await _commit_answer(wait=True)
+            await _commit_answer(
+                speculation=kept_speculation,
+                wait=True,
+            )
 
         # First call
         if len(call.messages) <= 1:
@@ -222,25 +421,32 @@ async def load_llm_chat(  # noqa: PLR0913
             )
 
         # Detect VAD
-        await _process_audio_for_vad(
-            call=call,
-            in_callback=aec.pull_audio,
-            out_callback=stt_client.push_audio,
-            response_callback=_response_callback,
-            stop_callback=_stop_callback,
-            timeout_callback=_timeout_callback,
-        )
+        try:
+            await _process_audio_for_vad(
+                call=call,
+                in_callback=aec.pull_audio,
+                out_callback=stt_client.push_audio,
+                response_callback=_response_callback,
+                resume_callback=_discard_speculation,
+                speculate_callback=_speculate_callback,
+                stop_callback=_stop_callback,
+                timeout_callback=_timeout_callback,
+            )
+        # Call ended, the speculative answer will never be used
+        finally:
+            _discard_speculation()
 
 
 # TODO: Refacto, this function is too long (and remove PLR0912/PLR0915 ignore)
 @start_as_current_span("call_continue_chat")
-async def _continue_chat(  # noqa: PLR0915, PLR0913
+async def _continue_chat(  # noqa: PLR0912, PLR0915, PLR0913
     call: CallStateModel,
     client: CallAutomationClient,
     post_callback: Callable[[CallStateModel], Awaitable[None]],
     scheduler: Scheduler,
     training_callback: Callable[[CallStateModel], Awaitable[None]],
     tts_client: SpeechSynthesizer,
+    speculation: _SpeculativeAnswer | None = None,
     tool_blacklist: set[str] = set(),
     _iterations_remaining: int = 3,
 ) -> CallStateModel:
@@ -249,6 +455,8 @@ async def _continue_chat(  # noqa: PLR0915, PLR0913
 
     Play the loading sound while waiting for the intelligence to be processed. If the intelligence is not processed after few secs, play the timeout sound. If the intelligence is not processed after more secs, stop the intelligence processing and play the error sound.
 
+    If `speculation` is provided, its completion is continued instead of starting a new one.
+
     Returns the updated call model.
     """
     # Add span attributes
@@ -289,6 +497,7 @@ async def _continue_chat(  # noqa: PLR0915, PLR0913
             client=client,
             post_callback=post_callback,
             scheduler=scheduler,
+            speculation=speculation,
             tool_blacklist=tool_blacklist,
             tts_callback=_tts_callback,
             tts_client=tts_client,
@@ -296,6 +505,15 @@ async def _continue_chat(  # noqa: PLR0915, PLR0913
         )
     )
 
+    # Report when the chat ended, to measure the reaction latency
+    chat_done_at: float | None = None
+
+    def _chat_done(_: asyncio.Task) -> None:
+        nonlocal chat_done_at
+        chat_done_at = time.monotonic()
+
+    chat_task.add_done_callback(_chat_done)
+
     # Loading
     def _loading_task() -> asyncio.Task:
         return asyncio.create_task(asyncio.sleep(loading_timer))
@@ -305,12 +523,8 @@ async def _continue_chat(  # noqa: PLR0915, PLR0913
 
     # Timeouts
     soft_timeout_triggered = False
-    soft_timeout_task = asyncio.create_task(
-        asyncio.sleep(await answer_soft_timeout_sec())
-    )
-    hard_timeout_task = asyncio.create_task(
-        asyncio.sleep(await answer_hard_timeout_sec())
-    )
+    soft_timeout_task = asyncio.create_task(asyncio.sleep(answer_soft_timeout_sec()))
+    hard_timeout_task = asyncio.create_task(asyncio.sleep(answer_hard_timeout_sec()))
 
     def _clear_tasks() -> None:
         chat_task.cancel()
@@ -322,10 +536,22 @@ async def _continue_chat(  # noqa: PLR0915, PLR0913
     continue_chat = True
     try:
         while True:
-            # logger.debug("Chat task status: %s", chat_task.done())
+            # Wait for the chat, a timeout, or a loading tick, whichever comes first
+            waiting: set[asyncio.Task] = {chat_task, hard_timeout_task}
+            if play_loading_sound:
+                waiting.add(loading_task)
+                if not soft_timeout_triggered:
+                    waiting.add(soft_timeout_task)
+            await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
 
             # Break when chat coroutine is done
             if chat_task.done():
+                # Report the reaction latency
+                if chat_done_at:
+                    gauge_set(
+                        metric=call_chat_reaction_latency,
+                        value=time.monotonic() - chat_done_at,
+                    )
                 # Clean up
                 _clear_tasks()
                 # Get result
@@ -339,7 +565,7 @@ async def _continue_chat(  # noqa: PLR0915, PLR0913
             if hard_timeout_task.done():
                 logger.warning(
                     "Hard timeout of %ss reached",
-                    await answer_hard_timeout_sec(),
+                    answer_hard_timeout_sec(),
                 )
                 # Clean up
                 _clear_tasks()
@@ -351,7 +577,7 @@ async def _continue_chat(  # noqa: PLR0915, PLR0913
                 if soft_timeout_task.done() and not soft_timeout_triggered:
                     logger.warning(
                         "Soft timeout of %ss reached",
-                        await answer_soft_timeout_sec(),
+                        answer_soft_timeout_sec(),
                     )
                     soft_timeout_triggered = True
                     # Never store the error message in the call history, it has caused hallucinations in the LLM
@@ -374,9 +600,6 @@ async def _continue_chat(  # noqa: PLR0915, PLR0913
                         )
                     )
 
-            # Wait to not block the event loop for other requests
-            await asyncio.sleep(1)
-
     except Exception:
         # TODO: Remove last message
         logger.exception("Error loading intelligence")
@@ -436,6 +659,7 @@ async def _generate_chat_completion(  # noqa: PLR0913, PLR0912, PLR0915
     tts_callback: Callable[[str, MessageStyleEnum], Awaitable[None]],
     tts_client: SpeechSynthesizer,
     use_tools: bool,
+    speculation: _SpeculativeAnswer | None = None,
 ) -> tuple[bool, bool, CallStateModel]:
     """
     Perform the chat with the LLM model.
@@ -464,17 +688,6 @@ async def _generate_chat_completion(  # noqa: PLR0913, PLR0912, PLR0915
         style, local_content = extract_message_style(buffer)
         await tts_callback(local_content, style)
 
-    # Build RAG
-    trainings = await call.trainings()
-    logger.info("Enhancing LLM chat with %s trainings", len(trainings))
-    # logger.debug("Trainings: %s", trainings)
-
-    # System prompts
-    system = CONFIG.prompts.llm.chat_system(
-        call=call,
-        trainings=trainings,
-    )
-
     # Build plugins
     plugins = DefaultPlugin(
         call=call,
@@ -485,33 +698,25 @@ async def _generate_chat_completion(  # noqa: PLR0913, PLR0912, PLR0915
         tts_client=tts_client,
     )
 
-    tools = []
-    if not use_tools:
-        logger.warning("Tools disabled for this chat")
-    else:
-        tools = await plugins.to_openai(frozenset(tool_blacklist))
-        # logger.debug("Tools: %s", tools)
-
-    # Translate messages to avoid LLM hallucinations
-    # See: https://github.com/microsoft/call-center-ai/issues/260
-    translated_messages = await asyncio.gather(
-        *[message.translate(call.lang.short_code) for message in call.messages]
-    )
-    # logger.debug("Translated messages: %s", translated_messages)
-
-    # Execute LLM inference
+    # Execute LLM inference, continue the speculative answer if any
     content_buffer_pointer = 0
     last_buffered_tool_id = None
     maximum_tokens_reached = False
     tool_calls_buffer: dict[str, MessageToolModel] = {}
+    stream = (
+        speculation.replay()
+        if speculation
+        else _completion_stream(
+            call=call,
+            plugins=plugins,
+            scheduler=scheduler,
+            tool_blacklist=tool_blacklist,
+            use_tools=use_tools,
+        )
+    )
     try:
         # Consume the completion stream
-        async for delta in completion_stream(
-            max_tokens=160,  # Lowest possible value for 90% of the cases, if not sufficient, retry will be triggered, 100 tokens ~= 75 words, 20 words ~= 1 sentence, 6 sentences ~= 160 tokens
-            messages=translated_messages,
-            system=system,
-            tools=tools,
-        ):
+        async for delta in stream:
             # Complete tools
             if delta.tool_calls:
                 for piece in delta.tool_calls:
@@ -628,12 +833,78 @@ async def _generate_chat_completion(  # noqa: PLR0913, PLR0912, PLR0915
     return False, False, call
 
 
+async def _speculative_tts_callback(_: str) -> None:
+    """
+    Ignore the TTS of plugins, they are never executed for a speculative answer.
+    """
+
+
+async def _completion_stream(
+    call: CallStateModel,
+    plugins: DefaultPlugin,
+    scheduler: Scheduler | None,
+    tool_blacklist: set[str],
+    use_tools: bool,
+) -> AsyncGenerator[StreamingChatResponseMessageUpdate]:
+    """
+    Build the LLM request from the call and stream its completion.
+
+    New translations of the messages are persisted with the `scheduler`. If `None`, they are only kept in the call, like for a speculative answer.
+    """
+    # Build RAG
+    trainings = await call.trainings()
+    logger.info("Enhancing LLM chat with %s trainings", len(trainings))
+    # logger.debug("Trainings: %s", trainings)
+
+    # System prompts, the context is placed after the messages as it changes at each turn
+    system = CONFIG.prompts.llm.chat_system(call)
+    context = CONFIG.prompts.llm.chat_context(
+        call=call,
+        trainings=trainings,
+    )
+
+    tools = []
+    if not use_tools:
+        logger.warning("Tools disabled for this chat")
+    else:
+        tools = await plugins.to_openai(frozenset(tool_blacklist))
+        # logger.debug("Tools: %s", tools)
+
+    # Translate messages to avoid LLM hallucinations, translations are stored in the messages
+    # See: https://github.com/microsoft/call-center-ai/issues/260
+    transac: AbstractAsyncContextManager = (
+        _db.call_transac(
+            call=call,
+            scheduler=scheduler,
+        )
+        if scheduler
+        else nullcontext()
+    )
+    async with transac:
+        translated_messages = await translate_messages(
+            messages=call.messages,
+            target_short_code=call.lang.short_code,
+        )
+    # logger.debug("Translated messages: %s", translated_messages)
+
+    async for delta in completion_stream(
+        context=context,
+        max_tokens=160,  # Lowest possible value for 90% of the cases, if not sufficient, retry will be triggered, 100 tokens ~= 75 words, 20 words ~= 1 sentence, 6 sentences ~= 160 tokens
+        messages=translated_messages,
+        system=system,
+        tools=tools,
+    ):
+        yield delta
+
+
 # TODO: Refacto and simplify
-async def _process_audio_for_vad(  # noqa: PLR0913
+async def _process_audio_for_vad(  # noqa: PLR0913, PLR0915
     call: CallStateModel,
     in_callback: Callable[[], Awaitable[tuple[bytes, bool]]],
     out_callback: Callable[[bytes], None],
     response_callback: Callable[[], Awaitable[None]],
+    resume_callback: Callable[[], None],
+    speculate_callback: Callable[[], Awaitable[None]],
     stop_callback: Callable[[], Awaitable[None]],
     timeout_callback: Callable[[], Awaitable[None]],
 ) -> None:
@@ -643,6 +914,7 @@ async def _process_audio_for_vad(  # noqa: PLR0913
     Follows the following steps:
 
     - Detect voice activity and clear the TTS to let the user speak
+    - Notify the start of a silence, to speculate the answer, and its end if the user speaks again
     - Wait for silence and trigger the chat
     - Wait for longer silence and trigger the timeout
     """
@@ -655,10 +927,16 @@ async def _process_audio_for_vad(  # noqa: PLR0913
 
         If the silence is too long, run the timeout.
         """
-        # Wait before flushing
+        # Start the answer while the silence is not yet confirmed, without delaying the flush
         nonlocal stop_task
-        timeout_ms = await vad_silence_timeout_ms()
-        await asyncio.sleep(timeout_ms / 1000)
+        speculate_task = asyncio.create_task(speculate_callback())
+
+        # Wait before flushing
+        timeout_ms = vad_silence_timeout_ms()
+        try:
+            await asyncio.sleep(timeout_ms / 1000)
+        finally:
+            speculate_task.cancel()
 
         # Cancel the clear TTS task
         if stop_task:
@@ -670,7 +948,7 @@ async def _process_audio_for_vad(  # noqa: PLR0913
         await response_callback()
 
         # Wait for silence and trigger timeout
-        timeout_sec = await phone_silence_timeout_sec()
+        timeout_sec = phone_silence_timeout_sec()
         while True:
             # Stop this time if the call played a message
             timeout_start = datetime.now(UTC)
@@ -699,7 +977,7 @@ async def _process_audio_for_vad(  # noqa: PLR0913
         """
         Stop the TTS if user speaks for too long.
         """
-        timeout_ms = await vad_cutoff_timeout_ms()
+        timeout_ms = vad_cutoff_timeout_ms()
 
         # Wait before clearing the TTS queue
         await asyncio.sleep(timeout_ms / 1000)
@@ -708,29 +986,38 @@ async def _process_audio_for_vad(  # noqa: PLR0913
         logger.info("Stoping TTS after %i ms", timeout_ms)
         await stop_callback()
 
-    while True:
-        # Wait for the next audio packet
-        out_chunck, is_speech = await in_callback()
+    try:
+        while True:
+            # Wait for the next audio packet
+            out_chunck, is_speech = await in_callback()
+
+            # Add audio to the buffer
+            out_callback(out_chunck)
+
+            # If no speech, init the silence task
+            if not is_speech:
+                # Start timeout if not already started
+                if not silence_task:
+                    silence_task = asyncio.create_task(_wait_for_silence())
+                # Continue to the next audio packet
+                continue
 
-        # Add audio to the buffer
-        out_callback(out_chunck)
+            # Voice detected, cancel the timeout task and the speculative answer
+            if silence_task:
+                silence_task.cancel()
+                silence_task = None
+                resume_callback()
 
-        # If no speech, init the silence task
-        if not is_speech:
-            # Start timeout if not already started
-            if not silence_task:
-                silence_task = asyncio.create_task(_wait_for_silence())
-            # Continue to the next audio packet
-            continue
+            # Start the TTS clear task
+            if not stop_task:
+                stop_task = asyncio.create_task(_wait_for_stop())
 
-        # Voice detected, cancel the timeout task
+    # Call ended, timers must not outlive it
+    finally:
         if silence_task:
             silence_task.cancel()
-            silence_task = None
-
-        # Start the TTS clear task
-        if not stop_task:
-            stop_task = asyncio.create_task(_wait_for_stop())
+        if stop_task:
+            stop_task.cancel()
 
 
 def _tts_callback(
@@ -7,7 +7,6 @@ from contextlib import asynccontextmanager, contextmanager
 from enum import Enum
 from typing import Any
 
-import numpy as np
 from aiojobs import Job, Scheduler
 from azure.cognitiveservices.speech import (
     AudioConfig,
@@ -38,8 +37,8 @@ from azure.communication.callautomation.aio import (
     CallConnectionClient,
 )
 from azure.core.exceptions import HttpResponseError, ResourceNotFoundError
-from noisereduce import reduce_noise
 
+from app.helpers.aec_executor import IAecSession, new_session as new_aec_session
 from app.helpers.cache import lru_acache
 from app.helpers.config import CONFIG
 from app.helpers.features import (
@@ -48,6 +47,11 @@ from app.helpers.features import (
 )
 from app.helpers.identity import token
 from app.helpers.logging import logger
+from app.helpers.media_codec import (
+    PACKET_DURATION_MS,
+    SAMPLE_WIDTH,
+    PacketCoalescer,
+)
 from app.helpers.monitoring import (
     call_aec_droped,
     call_aec_missed,
@@ -150,6 +154,37 @@ def tts_sentence_split(text: str, include_last: bool) -> Generator[tuple[str, in
             )
 
 
+def recognition_distance(partial: str, complete: str) -> int:
+    """
+    Compute the edit distance in characters between two recognitions.
+
+    Case and punctuation are ignored, as the complete recognition adds them.
+
+    Example:
+    - Input: "i want to declare a claim", "I want to declare a claim."
+    - Output: 0
+
+    Returns the Levenshtein distance.
+    """
+    partial, complete = (
+        " ".join(re.sub(r"[^\w\s]", "", text.lower()).split())
+        for text in (partial, complete)
+    )
+    previous = list(range(len(complete) + 1))
+    for i, partial_char in enumerate(partial, start=1):
+        current = [i]
+        for j, complete_char in enumerate(complete, start=1):
+            current.append(
+                min(
+                    previous[j] + 1,  # Deletion
+                    current[j - 1] + 1,  # Insertion
+                    previous[j - 1] + (partial_char != complete_char),  # Substitution
+                )
+            )
+        previous = current
+    return previous[-1]
+
+
 async def handle_media(
     client: CallAutomationClient,
     call: CallStateModel,
@@ -573,6 +608,10 @@ async def use_tts_client(
         audio_config=AudioOutputConfig(stream=PushAudioOutputStream(TtsCallback(out))),
     )
 
+    # Mark the end of each speech with an empty chunk, for the last packet to be padded
+    client.synthesis_completed.connect(lambda _: out.put_nowait(b""))
+    client.synthesis_canceled.connect(lambda _: out.put_nowait(b""))
+
     # Return
     yield client
 
@@ -588,8 +627,8 @@ class SttClient:
     _client: SpeechRecognizer | None = None
     _scheduler: Scheduler
     _stream: PushAudioInputStream
-    _stt_buffer: list[str] = []
-    _stt_complete_gate: asyncio.Event = asyncio.Event()
+    _stt_buffer: list[str]
+    _stt_complete_gate: asyncio.Event
 
     def __init__(
         self,
@@ -599,6 +638,8 @@ class SttClient:
     ):
         self._call = call
         self._scheduler = scheduler
+        self._stt_buffer = []
+        self._stt_complete_gate = asyncio.Event()
 
         self._stream = PushAudioInputStream(
             stream_format=AudioStreamFormat(
@@ -729,7 +770,7 @@ class SttClient:
         try:
             await asyncio.wait_for(
                 self._stt_complete_gate.wait(),
-                timeout=await recognition_stt_complete_timeout_ms() / 1000,
+                timeout=recognition_stt_complete_timeout_ms() / 1000,
             )
         except TimeoutError:
             logger.debug("Complete recognition timeout, using partial recognition")
@@ -743,6 +784,12 @@ class SttClient:
         # Return the text
         return text
 
+    def partial_recognition(self) -> str:
+        """
+        Get the recognition so far, without waiting for its completion nor resetting the buffer.
+        """
+        return " ".join(self._stt_buffer).strip()
+
 
 class AECStream:
     """
@@ -751,14 +798,17 @@ class AECStream:
     Input and output formats are in PCM 16-bit, 16 kHz, 1 channel.
     """
 
-    _aec_in_queue: asyncio.Queue[bytes] = asyncio.Queue()
-    _aec_out_queue: asyncio.Queue[tuple[bytes, bool]] = asyncio.Queue()
-    _aec_reference_queue: asyncio.Queue[bytes] = asyncio.Queue()
+    _aec_in_queue: asyncio.Queue[bytes]
+    _aec_out_queue: asyncio.Queue[tuple[bytes, bool]]
+    _aec_reference_queue: asyncio.Queue[bytes]
+    _aec_session: IAecSession
     _answer_start: float | None = None
     _chunk_size: int
     _empty_packet: bytes
     _in_raw_queue: asyncio.Queue[bytes]
-    _in_reference_queue: asyncio.Queue[bytes] = asyncio.Queue()
+    _in_reference_queue: asyncio.Queue[bytes]
+    _max_delay_samples: int
+    _out_coalescer: PacketCoalescer
     _out_queue: asyncio.Queue[bytes]
     _packet_duration_ms: int
     _packet_size: int
@@ -774,14 +824,14 @@ class AECStream:
         sample_rate: int,
         scheduler: Scheduler,
         max_delay_ms: int = 200,
-        packet_duration_ms: int = 20,
+        packet_duration_ms: int = PACKET_DURATION_MS,
     ):
         """
         Initialize the audio stream.
 
         Parameters:
         - `in_raw_queue`: Queue for the raw audio input (user speaking).
-        - `in_reference_queue`: Queue for the reference audio input (bot speaking).
+        - `in_reference_queue`: Queue for the reference audio input (bot speaking), an empty chunk marks the end of a speech.
         - `max_delay_ms`: Maximum delay to consider between the raw and reference audio.
         - `out_queue`: Queue for the processed audio output (echo-cancelled user speaking).
         - `packet_duration_ms`: Duration of each audio packet in milliseconds.
@@ -791,18 +841,26 @@ class AECStream:
         self._in_raw_queue = in_raw_queue
         self._in_reference_queue = in_reference_queue
         self._out_queue = out_queue
+        self._aec_in_queue = asyncio.Queue()
+        self._aec_out_queue = asyncio.Queue()
+        self._aec_reference_queue = asyncio.Queue()
         self._packet_duration_ms = packet_duration_ms
         self._sample_rate = sample_rate
         self._scheduler = scheduler
 
-        max_delay_samples = int(max_delay_ms / 1000 * self._sample_rate)
-        self._bot_voice_buffer = np.zeros(max_delay_samples, dtype=np.float32)
-
         self._chunk_size = int(self._sample_rate * self._packet_duration_ms / 1000)
-        self._packet_size = self._chunk_size * 2  # Each sample is 2 bytes (PCM 16-bit)
+        self._packet_size = self._chunk_size * SAMPLE_WIDTH
         self._empty_packet: bytes = b"\x00" * self._packet_size
+        self._out_coalescer = PacketCoalescer(self._packet_size)
+
+        self._max_delay_samples = int(max_delay_ms / 1000 * self._sample_rate)
 
     async def __aenter__(self):
+        self._aec_session = await new_aec_session(
+            chunk_size=self._chunk_size,
+            max_delay_samples=self._max_delay_samples,
+            sample_rate=self._sample_rate,
+        )
         self._run_task = asyncio.gather(
             self._forward_in(),
             self._forward_out(),
@@ -812,116 +870,52 @@ class AECStream:
 
     async def __aexit__(self, *args, **kwargs):
         self._run_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await self._run_task
+        await self._aec_session.close()
 
-    def _pcm_to_float(self, pcm: bytes) -> np.ndarray:
-        """
-        Convert PCM 16-bit to float (-1.0 to 1.0).
-        """
-        return (
-            np.frombuffer(
-                buffer=pcm,
-                dtype=np.int16,
-            ).astype(np.float32)
-            / 32768.0
-        )
-
-    def _float_to_pcm(self, floats: np.ndarray) -> bytes:
-        """
-        Convert float (-1.0 to 1.0) to PCM 16-bit.
-        """
-        pcm = (floats * 32767).clip(-32768, 32767).astype(np.int16)
-        return pcm.tobytes()
-
-    def _update_input_buffer(self, voice: np.ndarray) -> None:
-        """
-        Update the rolling buffer for the input voice.
-        """
-        buffer_length = len(self._bot_voice_buffer)
-        reference_length = len(voice)
-
-        if reference_length >= buffer_length:
-            # If the reference is longer than the buffer, keep the most recent samples
-            self._bot_voice_buffer = voice[-buffer_length:]
-        else:
-            # Append new samples and keep the buffer size fixed
-            self._bot_voice_buffer = np.roll(self._bot_voice_buffer, -reference_length)
-            self._bot_voice_buffer[-reference_length:] = voice
-
-    async def _rms_speech_detection(self, voice: np.ndarray) -> bool:
+    def _rms_speech_detection(self, rms: float) -> bool:
         """
         Simple speech detection based on RMS (acoustic pressure).
 
         Returns True if speech is detected, False otherwise.
         """
-        # Calculate Root Mean Square (RMS)
-        rms = np.sqrt(np.mean(voice**2))
         # Get VAD threshold, divide by 10 to more usability from user side, as RMS is in range 0-1 and a detection of 0.1 is a good maximum threshold
-        threshold = await vad_threshold() / 10
+        threshold = vad_threshold() / 10
         return rms >= threshold
 
-    async def _process_one(self, input_pcm: bytes) -> None:
+    def _pull_reference(self) -> bytes | None:
         """
-        Process one audio chunk.
+        Pull the reference packet played at the same time as the input, if any.
         """
         # Push raw input if reference is empty
         if self._aec_reference_queue.empty():
-            reference_pcm = self._empty_packet
+            return None
 
         # Reference signal is available
-        else:
-            reference_pcm = await self._aec_reference_queue.get()
-            self._aec_reference_queue.task_done()
-
-        # Convert PCM to float for processing
-        input_signal = self._pcm_to_float(input_pcm)
-        reference_signal = self._pcm_to_float(reference_pcm)
-
-        # Update the input buffer with the reference signal
-        self._update_input_buffer(reference_signal)
-
-        # Reference signal is empty, skip noise reduction
-        if np.all(reference_signal == 0):
-            # Perform VAD test
-            input_speaking = await self._rms_speech_detection(input_signal)
-
-            # Add processed PCM and metadata to the output queue
-            await self._aec_out_queue.put((input_pcm, input_speaking))
-            return
+        reference_pcm = self._aec_reference_queue.get_nowait()
+        self._aec_reference_queue.task_done()
+        return reference_pcm
 
-        # Apply noise reduction
-        reduced_signal = reduce_noise(
-            # Input signal
-            sr=self._sample_rate,
-            y=input_signal,
-            # Quality
-            n_fft=128,
-            # Since the reference signal is already noise-reduced, we can assume it's stationary
-            clip_noise_stationary=False,  # Noise is longer than the signal
-            stationary=True,
-            y_noise=self._bot_voice_buffer,
-            # Output quality
-            prop_decrease=0.75,  # Reduce noise by 75%
-        )
-
-        # Perform VAD test
-        input_speaking = await self._rms_speech_detection(reduced_signal)
-
-        # Convert processed float signal back to PCM
-        processed_pcm = self._float_to_pcm(reduced_signal)
-
-        # Add processed PCM and metadata to the output queue
-        await self._aec_out_queue.put((processed_pcm, input_speaking))
-
-    async def _ensure_run_slo(self, input_pcm: bytes) -> None:
+    async def _ensure_run_slo(self, frames: list[bytes]) -> None:
         """
         Ensure the audio stream is processed within the SLO.
 
         If the processing is delayed, the original input will be returned.
         """
+        # Queue the processing
+        references = [self._pull_reference() for _ in frames]
+        task = asyncio.ensure_future(
+            self._aec_session.process(
+                frames=frames,
+                references=references,
+            )
+        )
+
         # Process the audio
         try:
-            await asyncio.wait_for(
-                self._process_one(input_pcm),
+            results = await asyncio.wait_for(
+                asyncio.shield(task),
                 timeout=self._packet_duration_ms
                 / 1000
                 * 4,  # Allow temporary medium latency
@@ -932,24 +926,45 @@ class AECStream:
             # Enrich span
             counter_add(
                 metric=call_aec_missed,
-                value=1,
+                value=len(frames),
             )
-            await self._aec_out_queue.put((input_pcm, False))
+            for input_pcm in frames:
+                await self._aec_out_queue.put((input_pcm, False))
+            # Wait for the processing to end, buffers of the session are reused
+            with suppress(Exception):
+                await task
+            return
+
+        # If the processing failed, return the original input
+        except Exception:
+            logger.exception("Echo cancellation failed, using raw input")
+            for input_pcm in frames:
+                await self._aec_out_queue.put((input_pcm, False))
+            return
+
+        for processed_pcm, rms in results:
+            # Perform VAD test
+            input_speaking = self._rms_speech_detection(rms)
+
+            # Add processed PCM and metadata to the output queue
+            await self._aec_out_queue.put((processed_pcm, input_speaking))
 
     async def _run(self) -> None:
         """
         Process the audio stream in real-time.
+
+        When the processing is late, frames waiting are sent together, up to the batch size.
         """
-        async with Scheduler(
-            limit=5,  # Allow 5 concurrent tasks
-        ) as scheduler:
-            while True:
-                # Fetch input audio
-                input_pcm = await self._aec_in_queue.get()
+        batch_size = CONFIG.aec.batch_size
+        while True:
+            # Fetch input audio
+            frames = [await self._aec_in_queue.get()]
+            self._aec_in_queue.task_done()
+            while len(frames) < batch_size and not self._aec_in_queue.empty():
+                frames.append(self._aec_in_queue.get_nowait())
                 self._aec_in_queue.task_done()
 
-                # Queue the processing
-                await scheduler.spawn(self._ensure_run_slo(input_pcm))
+            await self._ensure_run_slo(frames)
 
     async def pull_audio(self) -> tuple[bytes, bool]:
         """
@@ -1003,26 +1018,28 @@ class AECStream:
             audio_data = await self._in_reference_queue.get()
             self._in_reference_queue.task_done()
 
-            # Report the answer latency and reset the timer
-            if self._answer_start:
-                # Enrich span
-                gauge_set(
-                    metric=call_answer_latency,
-                    value=time.monotonic() - self._answer_start,
-                )
-            self._answer_start = None
-
-            # Send to clean output
-            await self._out_queue.put(audio_data)
-
-            # Send a copy as reference, extract packets and pad them if necessary
-            buffer_pointer = 0
-            while buffer_pointer < len(audio_data):
-                chunk = audio_data[: self._packet_size].ljust(
-                    self._packet_size, b"\x00"
-                )
-                await self._aec_reference_queue.put(chunk)
-                buffer_pointer += self._packet_size
+            # End of speech, pad the last packet
+            if not audio_data:
+                last_packet = self._out_coalescer.flush()
+                packets = [last_packet] if last_packet else []
+            else:
+                # Report the answer latency and reset the timer
+                if self._answer_start:
+                    # Enrich span
+                    gauge_set(
+                        metric=call_answer_latency,
+                        value=time.monotonic() - self._answer_start,
+                    )
+                self._answer_start = None
+
+                # Split in packets, the incomplete one waits for the next chunk of the speech
+                packets = self._out_coalescer.push(audio_data)
+
+            for packet in packets:
+                # Send to clean output
+                await self._out_queue.put(packet)
+                # Send a copy as reference
+                await self._aec_reference_queue.put(packet)
 
     def answer_start(self):
         """
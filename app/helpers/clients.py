@@ -0,0 +1,22 @@
+from contextlib import AbstractAsyncContextManager, AsyncExitStack
+
+from app.helpers.logging import logger
+
+_clients = AsyncExitStack()
+
+
+async def open_client[T: AbstractAsyncContextManager](client: T) -> T:
+    """
+    Open a SDK client for the lifespan of the application.
+
+    Use it from a cached factory, so connections, authentication and service metadata are kept across requests. Clients are closed with `close_clients`, at the application shutdown.
+    """
+    return await _clients.enter_async_context(client)
+
+
+async def close_clients() -> None:
+    """
+    Close all the SDK clients opened with `open_client`.
+    """
+    logger.debug("Closing SDK clients")
+    await _clients.aclose()
@@ -0,0 +1,40 @@
+from enum import Enum
+
+from pydantic import BaseModel, Field, ValidationInfo, field_validator
+
+
+class EngineEnum(str, Enum):
+    NOISEREDUCE = "noisereduce"
+    """Spectral gating with a fresh STFT of the reference for each frame, using noisereduce."""
+    RING = "ring"
+    """Spectral gating with a ring buffer and an incrementally updated noise profile."""
+
+
+class ExecutorEnum(str, Enum):
+    HUB = "hub"
+    """Process frames of all calls together, in one vectorized batch per packet duration."""
+    INLINE = "inline"
+    """Process frames in the event loop."""
+    PROCESS = "process"
+    """Process frames in a pool of processes shared across calls, with shared memory buffers."""
+
+
+class AecModel(BaseModel):
+    batch_size: int = Field(default=5, ge=1)  # Max frames sent at once, when late
+    engine: EngineEnum = EngineEnum.NOISEREDUCE
+    executor: ExecutorEnum = ExecutorEnum.INLINE
+    workers: int = Field(default=2, ge=1)  # Processes per application worker
+
+    @field_validator("executor")
+    @classmethod
+    def _validate_executor(
+        cls,
+        executor: ExecutorEnum,
+        info: ValidationInfo,
+    ) -> ExecutorEnum:
+        if (
+            executor == ExecutorEnum.HUB
+            and info.data.get("engine", None) != EngineEnum.RING
+        ):
+            raise ValueError("Hub executor requires the ring engine")
+        return executor
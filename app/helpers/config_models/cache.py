@@ -11,9 +11,14 @@ class ModeEnum(str, Enum):
     """Use memory cache."""
     REDIS = "redis"
     """Use Redis cache."""
+    TIERED = "tiered"
+    """Use memory cache in front of Redis cache."""
 
 
 class MemoryModel(BaseModel, frozen=True):
+    max_bytes: int = Field(
+        default=64 * 1024 * 1024, ge=1024
+    )  # 64 MiB, size of the keys and values
     max_size: int = Field(default=128, ge=10)
 
     @cached_property
@@ -26,6 +31,9 @@ class MemoryModel(BaseModel, frozen=True):
 
 
 class RedisModel(BaseModel, frozen=True):
+    coalesce_misses: bool = (
+        True  # Lock the cache misses, so only one worker loads the value
+    )
     database: int = Field(default=0, ge=0)
     host: str
     password: SecretStr | None = None
@@ -41,10 +49,17 @@ class RedisModel(BaseModel, frozen=True):
         return RedisCache(self)
 
 
+class TieredModel(BaseModel, frozen=True):
+    l1_ttl_sec: int = Field(
+        default=60, ge=1
+    )  # Maximum time a value is served from memory, bounds the staleness if an invalidation is missed
+
+
 class CacheModel(BaseModel):
     memory: MemoryModel | None = MemoryModel()  # Object is fully defined by default
     mode: ModeEnum = ModeEnum.MEMORY
     redis: RedisModel | None = None
+    tiered: TieredModel = TieredModel()  # Object is fully defined by default
 
     @field_validator("redis")
     @classmethod
@@ -53,7 +68,10 @@ class CacheModel(BaseModel):
         redis: RedisModel | None,
         info: ValidationInfo,
     ) -> RedisModel | None:
-        if not redis and info.data.get("mode", None) == ModeEnum.REDIS:
+        if not redis and info.data.get("mode", None) in (
+            ModeEnum.REDIS,
+            ModeEnum.TIERED,
+        ):
             raise ValueError("Redis config required")
         return redis
 
@@ -74,5 +92,22 @@ class CacheModel(BaseModel):
             assert self.memory
             return self.memory.instance
 
+        if self.mode == ModeEnum.TIERED:
+            assert self.memory and self.redis
+            from app.persistence.redis import (
+                RedisCache,
+            )
+            from app.persistence.tiered import (
+                TieredCache,
+            )
+
+            l2 = self.redis.instance
+            assert isinstance(l2, RedisCache)
+            return TieredCache(
+                config=self.tiered,
+                l1=self.memory.instance,
+                l2=l2,
+            )
+
         assert self.redis
         return self.redis.instance
@@ -1,6 +1,6 @@
 from functools import cached_property
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from app.persistence.istore import IStore
 
@@ -9,6 +9,9 @@ class CosmosDbModel(BaseModel, frozen=True):
     container: str
     database: str
     endpoint: str
+    write_behind_ms: int = Field(
+        default=250, ge=0
+    )  # Debounce window to merge the transactions of a call in one patch
 
     @cached_property
     def instance(self) -> IStore:
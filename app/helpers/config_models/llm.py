@@ -1,5 +1,5 @@
 from azure.ai.inference.aio import ChatCompletionsClient
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from app.helpers.cache import lru_acache
 from app.helpers.http import azure_transport
@@ -13,6 +13,9 @@ class DeploymentModel(BaseModel, frozen=True):
     model: str
     seed: int = 42  # Reproducible results
     temperature: float = 0.0  # Most focused and deterministic
+    weight: int = Field(
+        default=1, ge=1
+    )  # Share of the traffic in the pool, relative to the other deployments
 
     @lru_acache()
     async def client(self) -> tuple[ChatCompletionsClient, "DeploymentModel"]:
@@ -32,9 +35,45 @@ class DeploymentModel(BaseModel, frozen=True):
         ), self
 
 
+class HedgingModel(BaseModel):
+    enabled: bool = False  # Start the completion on the other deployment if the first token is late, costs a second request
+    max_delay_ms: int = Field(
+        default=2000, ge=0
+    )  # Maximum wait for the first token, also used until the latency is known
+    min_delay_ms: int = Field(
+        default=300, ge=0
+    )  # Minimum wait for the first token, to not hedge on small variations
+
+
+class CircuitBreakerModel(BaseModel):
+    failures: int = Field(
+        default=3, ge=1
+    )  # Consecutive failures before the deployment is skipped
+    open_sec: int = Field(
+        default=30, ge=1
+    )  # Time the deployment is skipped, unless the rate limit tells otherwise
+
+
 class LlmModel(BaseModel):
+    circuit_breaker: CircuitBreakerModel = CircuitBreakerModel()
     fast: DeploymentModel
+    fast_pool: list[
+        DeploymentModel
+    ] = []  # Additional deployments of the fast model, load balanced with it
+    hedging: HedgingModel = HedgingModel()
     slow: DeploymentModel
+    slow_pool: list[
+        DeploymentModel
+    ] = []  # Additional deployments of the slow model, load balanced with it
 
     def selected(self, is_fast: bool) -> DeploymentModel:
         return self.fast if is_fast else self.slow
+
+    def pool(self, is_fast: bool) -> list[DeploymentModel]:
+        """
+        Returns all the deployments of a model, the selected one first.
+        """
+        return [
+            self.selected(is_fast),
+            *(self.fast_pool if is_fast else self.slow_pool),
+        ]
@@ -1,3 +1,4 @@
+import asyncio
 import json
 import random
 from datetime import datetime
@@ -8,8 +9,9 @@ from textwrap import dedent
 
 from azure.ai.inference.models import SystemMessage
 from azure.core.exceptions import HttpResponseError
-from pydantic import BaseModel, TypeAdapter
+from pydantic import BaseModel, PrivateAttr, TypeAdapter
 
+from app.helpers.config_models.conversation import WorkflowInitiateModel
 from app.models.call import CallStateModel
 from app.models.message import MessageModel
 from app.models.next import NextModel
@@ -44,16 +46,15 @@ class LlmModel(BaseModel):
         # Context
         - The call center number is {bot_phone_number}
         - The customer is calling from {phone_number}
-        - Today is {date}
+    """
+    date_system_tpl: str = """
+        # Date
+        Today is {date}
     """
     chat_system_tpl: str = """
-        # Objective
-        {task}
-
         # Rules
         - After an action, explain clearly the next step
         - Always continue the conversation to solve the conversation objective
-        - Answers in {default_lang}, but can be updated with the help of a tool
         - Ask 2 questions maximum at a time
         - Be concise
         - Enumerations are allowed to be used for 3 items maximum (e.g., "First, I will ask you for your name. Second, I will ask you for your email address.")
@@ -66,7 +67,6 @@ class LlmModel(BaseModel):
         - Use short sentences and simple words
         - Use tools as often as possible and describe the actions you take
         - When the customer says a word and then spells out letters, this means that the word is written in the way the customer spelled it (e.g., "I live in Paris PARIS" -> "Paris", "My name is John JOHN" -> "John", "My email is Clemence CLEMENCE at gmail dot com" -> "clemence@gmail.com")
-        - Work for {bot_company}, not someone else
         - Write acronyms and initials in full letters (e.g., "The appointment is scheduled for eleven o'clock in the morning", "We are available 24 hours a day, 7 days a week")
 
         # Definitions
@@ -81,14 +81,6 @@ class LlmModel(BaseModel):
         ## Styles
         In output, you can use the following styles to add emotions to the conversation: {styles}
 
-        # Context
-
-        ## Claim
-        A file that contains all the information about the customer and the situation: {claim}
-
-        ## Reminders
-        A list of reminders to help remember to do something: {reminders}
-
         # How to handle the conversation
 
         ## New conversation
@@ -173,6 +165,24 @@ class LlmModel(BaseModel):
         User: action=talk Is my card covered for theft?
         Assistant: style=none I understand, it should be stressful. You can follow his procedure: First, open your mobile app and go to the card section. Second, click on the card you want to block. Third, click on the "Block card" button. Fourth, confirm the blocking. Fifth, call the customer service to report the theft. style=cheerful It'll take you less than 5 minutes. style=none Do you need help with something else?
     """
+    chat_context_tpl: str = """
+        # Objective
+        {task}
+
+        # Rules
+        - Answers in {default_lang}, but can be updated with the help of a tool
+        - Work for {bot_company}, not someone else
+
+        # Context
+        - The conversation language is {default_lang}
+        - Today is {date}
+
+        ## Claim
+        A file that contains all the information about the customer and the situation: {claim}
+
+        ## Reminders
+        A list of reminders to help remember to do something: {reminders}
+    """
     sms_summary_system_tpl: str = """
         # Objective
         Summarize the call with the customer in a single SMS. The customer cannot reply to this SMS.
@@ -320,37 +330,77 @@ class LlmModel(BaseModel):
                 bot_company=call.initiate.bot_company,
                 bot_name=call.initiate.bot_name,
                 bot_phone_number=CONFIG.communication_services.phone_number,
-                date=datetime.now(call.tz()).strftime(
-                    "%a %d %b %Y, %H:%M (%Z)"
-                ),  # Don't include secs to enhance cache during unit tests. Example: "Mon 15 Jul 2024, 12:43 (CEST)"
+                date=self._date(
+                    call
+                ),  # Not in the default template, kept for the customized ones
                 phone_number=call.initiate.phone_number,
             )
         )
 
-    def chat_system(
+    def chat_system(self, call: CallStateModel) -> list[SystemMessage]:
+        """
+        Return the formatted prompt placed before the conversation, from the most static to the most dynamic part.
+
+        Instructions are the same for all the calls, then comes the call initiation, the same for all the turns of the call. This keeps the prompt prefix identical across the turns, for the LLM provider to serve it from its cache. Parts changing during the call are in `chat_context`.
+
+        See: https://learn.microsoft.com/en-us/azure/ai-services/openai/how-to/prompt-caching
+        """
+        messages = [
+            # Same for all the calls
+            SystemMessage(
+                content=self._format(self.chat_system_tpl, **self._chat_kwargs(call)),
+            ),
+            # Same for all the turns of the call
+            SystemMessage(
+                content=self.default_system(call),
+            ),
+        ]
+        # self.logger.debug("Messages: %s", messages)
+        return messages
+
+    def chat_context(
         self, call: CallStateModel, trainings: list[TrainingModel]
     ) -> list[SystemMessage]:
+        """
+        Return the formatted prompt placed after the conversation.
+
+        Objective, language, date, claim, reminders and trainings change during the call. Placed last, they do not break the cached prefix made of the instructions and the conversation.
+        """
+        messages = [
+            SystemMessage(
+                content=self._format(
+                    self.chat_context_tpl,
+                    trainings=trainings,
+                    **self._chat_kwargs(call),
+                ),
+            ),
+        ]
+        # self.logger.debug("Messages: %s", messages)
+        return messages
+
+    def _chat_kwargs(self, call: CallStateModel) -> dict[str, str]:
+        """
+        Return the values of the chat templates.
+
+        All values are available to all templates, for the customized ones.
+        """
         from app.models.message import (
             ActionEnum as MessageActionEnum,
             StyleEnum as MessageStyleEnum,
         )
 
-        return self._messages(
-            self._format(
-                self.chat_system_tpl,
-                actions=", ".join([action.value for action in MessageActionEnum]),
-                bot_company=call.initiate.bot_company,
-                claim=json.dumps(call.claim),
-                default_lang=call.lang.human_name,
-                reminders=TypeAdapter(list[ReminderModel])
-                .dump_json(call.reminders, exclude_none=True)
-                .decode(),
-                styles=", ".join([style.value for style in MessageStyleEnum]),
-                task=call.initiate.task,
-                trainings=trainings,
-            ),
-            call=call,
-        )
+        return {
+            "actions": ", ".join([action.value for action in MessageActionEnum]),
+            "bot_company": call.initiate.bot_company,
+            "claim": json.dumps(call.claim),
+            "date": self._date(call),
+            "default_lang": call.lang.human_name,
+            "reminders": TypeAdapter(list[ReminderModel])
+            .dump_json(call.reminders, exclude_none=True)
+            .decode(),
+            "styles": ", ".join([style.value for style in MessageStyleEnum]),
+            "task": call.initiate.task,
+        }
 
     def sms_summary_system(self, call: CallStateModel) -> list[SystemMessage]:
         return self._messages(
@@ -361,7 +411,11 @@ class LlmModel(BaseModel):
                 claim=json.dumps(call.claim),
                 default_lang=call.lang.human_name,
                 messages=TypeAdapter(list[MessageModel])
-                .dump_json(call.messages, exclude_none=True)
+                .dump_json(
+                    call.messages,
+                    exclude={"__all__": MessageModel.excluded_fields_for_llm()},
+                    exclude_none=True,
+                )
                 .decode(),
                 reminders=TypeAdapter(list[ReminderModel])
                 .dump_json(call.reminders, exclude_none=True)
@@ -378,7 +432,11 @@ class LlmModel(BaseModel):
                 claim=json.dumps(call.claim),
                 format=json.dumps(SynthesisModel.model_json_schema()),
                 messages=TypeAdapter(list[MessageModel])
-                .dump_json(call.messages, exclude_none=True)
+                .dump_json(
+                    call.messages,
+                    exclude={"__all__": MessageModel.excluded_fields_for_llm()},
+                    exclude_none=True,
+                )
                 .decode(),
                 reminders=TypeAdapter(list[ReminderModel])
                 .dump_json(call.reminders, exclude_none=True)
@@ -413,7 +471,11 @@ class LlmModel(BaseModel):
                 claim=json.dumps(call.claim),
                 format=json.dumps(NextModel.model_json_schema()),
                 messages=TypeAdapter(list[MessageModel])
-                .dump_json(call.messages, exclude_none=True)
+                .dump_json(
+                    call.messages,
+                    exclude={"__all__": MessageModel.excluded_fields_for_llm()},
+                    exclude_none=True,
+                )
                 .decode(),
                 reminders=TypeAdapter(list[ReminderModel])
                 .dump_json(call.reminders, exclude_none=True)
@@ -461,10 +523,21 @@ class LlmModel(BaseModel):
             SystemMessage(
                 content=system,
             ),
+            SystemMessage(
+                content=self._format(self.date_system_tpl, date=self._date(call)),
+            ),
         ]
         # self.logger.debug("Messages: %s", messages)
         return messages
 
+    def _date(self, call: CallStateModel) -> str:
+        """
+        Return the current date, in the call timezone.
+
+        Seconds are not included, to enhance cache during unit tests. Example: "Mon 15 Jul 2024, 12:43 (CEST)".
+        """
+        return datetime.now(call.tz()).strftime("%a %d %b %Y, %H:%M (%Z)")
+
     @cached_property
     def logger(self) -> Logger:
         from app.helpers.logging import logger
@@ -543,6 +616,9 @@ class TtsModel(BaseModel):
         "Press {index} for {label}.",
         "To select {label}, press {index}.",
     ]
+    # Private fields
+    _bank: dict[tuple[str, str], str] = PrivateAttr(default_factory=dict)
+    """Translated prompts, per rendered prompt and language, see `warmup`."""
 
     async def calltransfer_failure(self, call: CallStateModel) -> str:
         return await self._translate(self.calltransfer_failure_tpl, call)
@@ -578,17 +654,96 @@ class TtsModel(BaseModel):
         return await self._translate(self.timeout_loading_tpl, call)
 
     async def ivr_language(self, call: CallStateModel) -> str:
-        res = ""
-        for i, lang in enumerate(call.initiate.lang.availables):
-            res += (
+        # Translate each choice apart, so they are found in the bank, misses are translated in a single request
+        choices = await self._translate_many(
+            [
                 self._return(
                     self.ivr_language_tpl,
                     index=i + 1,
                     label=lang.human_name,
                 )
-                + " "
+                for i, lang in enumerate(call.initiate.lang.availables)
+            ],
+            call,
+        )
+        return " ".join(choices)
+
+    async def warmup(self, initiate: WorkflowInitiateModel) -> None:
+        """
+        Render all the prompts for a call initiation, translate them to all its languages, and keep them in memory.
+
+        Prompts of the calls with the same bot, company and languages are then served without waiting for the Translator. Others are translated at the moment of use. Call again after a configuration change to refresh the bank, it is replaced at once. A language failing to translate is skipped.
+
+        Errors are logged, never raised, as it runs in background.
+        """
+        from app.helpers.translation import (
+            translate_texts,
+        )
+
+        langs = [lang.short_code for lang in initiate.lang.availables]
+        try:
+            texts = self._texts(initiate)
+            # Translate all the prompts, one batch per language
+            results = await asyncio.gather(
+                *[
+                    translate_texts(
+                        source_lang=self.tts_lang,
+                        target_lang=lang,
+                        texts=texts,
+                    )
+                    for lang in langs
+                ],
+                return_exceptions=True,
+            )
+        # Keep the previous bank, prompts are translated at the moment of use
+        except Exception:
+            self.logger.exception("Failed to warm up TTS prompts")
+            return
+
+        bank: dict[tuple[str, str], str] = {}
+        for lang, translations in zip(langs, results, strict=True):
+            if isinstance(translations, BaseException):
+                self.logger.warning(
+                    "Failed to translate TTS prompts to %s: %s", lang, translations
+                )
+                continue
+            bank.update(
+                {
+                    (text, lang): translation
+                    for text, translation in zip(texts, translations, strict=True)
+                    if translation
+                }
+            )
+        self._bank = bank
+        self.logger.info("TTS prompts warmed up, %s translations", len(bank))
+
+    def _texts(self, initiate: WorkflowInitiateModel) -> list[str]:
+        """
+        Render all the prompt templates, with the values of a call initiation.
+        """
+        kwargs = {
+            "bot_company": initiate.bot_company,
+            "bot_name": initiate.bot_name,
+        }
+        texts = [
+            self._render(prompt_tpl, **kwargs)
+            for prompt_tpl in (
+                *self.calltransfer_failure_tpl,
+                *self.connect_agent_tpl,
+                *self.end_call_to_connect_agent_tpl,
+                *self.error_tpl,
+                *self.goodbye_tpl,
+                *self.hello_tpl,
+                *self.timeout_loading_tpl,
+                *self.timeout_silence_tpl,
             )
-        return await self._translate([res], call)
+        ]
+        texts += [
+            self._render(prompt_tpl, index=i + 1, label=lang.human_name)
+            for i, lang in enumerate(initiate.lang.availables)
+            for prompt_tpl in self.ivr_language_tpl
+        ]
+        return list(dict.fromkeys(texts))  # Deduplicate
 
     def _return(self, prompt_tpls: list[str], **kwargs) -> str:
         """
@@ -597,6 +752,12 @@ class TtsModel(BaseModel):
         # Select a random prompt template
         prompt_tpl = random.choice(prompt_tpls)
         # Format it
+        return self._render(prompt_tpl, **kwargs)
+
+    def _render(self, prompt_tpl: str, **kwargs) -> str:
+        """
+        Format a prompt template, and remove its indentation.
+        """
         return dedent(prompt_tpl.format(**kwargs)).strip()
 
     async def _translate(
@@ -605,22 +766,55 @@ class TtsModel(BaseModel):
         """
         Format the prompt and translate it to the TTS language.
 
-        If the translation fails, the initial prompt is returned.
+        Translation is read from memory if warmed up, see `warmup`. If the translation fails, the initial prompt is returned.
+        """
+        initial = self._return(prompt_tpls, **kwargs)
+        return (await self._translate_many([initial], call))[0]
+
+    async def _translate_many(
+        self, initials: list[str], call: CallStateModel
+    ) -> list[str]:
+        """
+        Translate formatted prompts to the TTS language.
+
+        Translations are read from memory if warmed up, see `warmup`. Others are translated in a single request. If the translation fails, the initial prompts are returned.
         """
         from app.helpers.translation import (
-            translate_text,
+            translate_texts,
         )
 
-        initial = self._return(prompt_tpls, **kwargs)
-        translation = None
-        try:
-            translation = await translate_text(
-                initial, self.tts_lang, call.lang.short_code
-            )
-        except HttpResponseError as e:
-            self.logger.warning("Failed to translate TTS prompt: %s", e)
-            pass
-        return translation or initial
+        lang = call.lang.short_code
+
+        # Try memory
+        translations = [self._bank.get((initial, lang)) for initial in initials]
+        misses = [
+            initial
+            for initial, translation in zip(initials, translations, strict=True)
+            if not translation
+        ]
+
+        # Try live, in one batch
+        live: dict[str, str | None] = {}
+        if misses:
+            try:
+                live = dict(
+                    zip(
+                        misses,
+                        await translate_texts(
+                            source_lang=self.tts_lang,
+                            target_lang=lang,
+                            texts=misses,
+                        ),
+                        strict=True,
+                    )
+                )
+            except HttpResponseError as e:
+                self.logger.warning("Failed to translate TTS prompts: %s", e)
+
+        return [
+            translation or live.get(initial) or initial
+            for initial, translation in zip(initials, translations, strict=True)
+        ]
 
     @cached_property
     def logger(self) -> Logger:
@@ -5,6 +5,7 @@ from pydantic_settings import (
     SettingsConfigDict,
 )
 
+from app.helpers.config_models.aec import AecModel
 from app.helpers.config_models.ai_search import AiSearchModel
 from app.helpers.config_models.ai_translation import AiTranslationModel
 from app.helpers.config_models.app_configuration import AppConfigurationModel
@@ -33,6 +34,7 @@ class RootModel(BaseSettings):
     public_domain: str = Field(frozen=True)
     version: str = Field(default="0.0.0-unknown", frozen=True)
     # Editable fields
+    aec: AecModel = AecModel()  # Object is fully defined by default
     ai_search: AiSearchModel
     ai_translation: AiTranslationModel
     cache: CacheModel = CacheModel()  # Object is fully defined by default
@@ -1,182 +1,247 @@
+import asyncio
+from dataclasses import dataclass, fields
 from typing import TypeVar, cast
 
 from azure.appconfiguration.aio import AzureAppConfigurationClient
-from azure.core.exceptions import ResourceNotFoundError
+from azure.core.exceptions import HttpResponseError, ServiceRequestError
 
 from app.helpers.cache import lru_acache
+from app.helpers.clients import open_client
 from app.helpers.config import CONFIG
-from app.helpers.config_models.cache import MemoryModel
 from app.helpers.http import azure_transport
 from app.helpers.identity import credential
 from app.helpers.logging import logger
-from app.persistence.memory import MemoryCache
 
-_cache = MemoryCache(MemoryModel())
 T = TypeVar("T", bool, int, float, str)
 
 
-async def answer_hard_timeout_sec() -> int:
+@dataclass(frozen=True, slots=True)
+class _Snapshot:
+    """
+    Values of all the features, at a point in time.
+
+    Attributes are the App Configuration keys, defaults are used for the missing keys. Snapshot is immutable, it is replaced as a whole on refresh.
+    """
+
+    answer_hard_timeout_sec: int = 15
+    answer_soft_timeout_sec: int = 3
+    callback_timeout_hour: int = 24
+    phone_silence_timeout_sec: int = 20
+    recognition_retry_max: int = 3
+    recognition_stt_complete_timeout_ms: int = 100
+    recording_enabled: bool = False
+    slow_llm_for_chat: bool = True
+    speculative_answer_enabled: bool = False
+    speculative_answer_max_distance: int = 10
+    speculative_answer_min_silence_ms: int = 200
+    vad_cutoff_timeout_ms: int = 250
+    vad_silence_timeout_ms: int = 500
+    vad_threshold: float = 0.5
+
+
+# Bounds of the features, as (min, max), both inclusive
+_BOUNDS: dict[str, tuple[float | None, float | None]] = {
+    "recognition_retry_max": (1, None),
+    "speculative_answer_max_distance": (0, None),
+    "speculative_answer_min_silence_ms": (0, None),
+    "vad_threshold": (0.1, 1),
+}
+
+# Keys of the features, others are ignored
+_KEYS = frozenset(field.name for field in fields(_Snapshot))
+
+_snapshot = _Snapshot()
+_etags: frozenset[tuple[str, str]] = frozenset()
+
+
+def answer_hard_timeout_sec() -> int:
     """
     Time waiting the LLM before aborting the answer with an error message.
     """
-    return await _default(
-        default=15,
-        key="answer_hard_timeout_sec",
-        type_res=int,
-    )
+    return _snapshot.answer_hard_timeout_sec
 
 
-async def answer_soft_timeout_sec() -> int:
+def answer_soft_timeout_sec() -> int:
     """
     Time waiting the LLM before sending a waiting message.
     """
-    return await _default(
-        default=3,
-        key="answer_soft_timeout_sec",
-        type_res=int,
-    )
+    return _snapshot.answer_soft_timeout_sec
 
 
-async def callback_timeout_hour() -> int:
+def callback_timeout_hour() -> int:
     """
     The timeout for a callback in hours. Set 0 to disable.
     """
-    return await _default(
-        default=24,
-        key="callback_timeout_hour",
-        type_res=int,
-    )
+    return _snapshot.callback_timeout_hour
 
 
-async def phone_silence_timeout_sec() -> int:
+def phone_silence_timeout_sec() -> int:
     """
     Amount of silence in secs to trigger a warning message from the assistant.
     """
-    return await _default(
-        default=20,
-        key="phone_silence_timeout_sec",
-        type_res=int,
-    )
+    return _snapshot.phone_silence_timeout_sec
+
+
+def speculative_answer_enabled() -> bool:
+    """
+    Whether to start the answer on the partial recognition, before the silence is confirmed.
+    """
+    return _snapshot.speculative_answer_enabled
+
+
+def speculative_answer_max_distance() -> int:
+    """
+    Maximum edit distance in characters between the partial and the complete recognition, to keep the started answer.
+    """
+    return _snapshot.speculative_answer_max_distance
+
+
+def speculative_answer_min_silence_ms() -> int:
+    """
+    Silence in milliseconds, with the partial recognition unchanged, before starting the answer on it.
+    """
+    return _snapshot.speculative_answer_min_silence_ms
 
 
-async def vad_threshold() -> float:
+def vad_threshold() -> float:
     """
     The threshold for voice activity detection. Between 0.1 and 1.
     """
-    return await _default(
-        default=0.5,
-        key="vad_threshold",
-        max_incl=1,
-        min_incl=0.1,
-        type_res=float,
-    )
+    return _snapshot.vad_threshold
 
 
-async def vad_silence_timeout_ms() -> int:
+def vad_silence_timeout_ms() -> int:
     """
     Silence to trigger voice activity detection in milliseconds.
     """
-    return await _default(
-        default=500,
-        key="vad_silence_timeout_ms",
-        type_res=int,
-    )
+    return _snapshot.vad_silence_timeout_ms
 
 
-async def vad_cutoff_timeout_ms() -> int:
+def vad_cutoff_timeout_ms() -> int:
     """
     The cutoff timeout for voice activity detection in milliseconds.
     """
-    return await _default(
-        default=250,
-        key="vad_cutoff_timeout_ms",
-        type_res=int,
-    )
+    return _snapshot.vad_cutoff_timeout_ms
 
 
-async def recording_enabled() -> bool:
+def recording_enabled() -> bool:
     """
     Whether call recording is enabled.
     """
-    return await _default(
-        default=False,
-        key="recording_enabled",
-        type_res=bool,
-    )
+    return _snapshot.recording_enabled
 
 
-async def slow_llm_for_chat() -> bool:
+def slow_llm_for_chat() -> bool:
     """
     Whether to use the slow LLM for chat.
     """
-    return await _default(
-        default=True,
-        key="slow_llm_for_chat",
-        type_res=bool,
-    )
+    return _snapshot.slow_llm_for_chat
 
 
-async def recognition_retry_max() -> int:
+def recognition_retry_max() -> int:
     """
     The maximum number of retries for voice recognition. Minimum of 1.
     """
-    return await _default(
-        default=3,
-        key="recognition_retry_max",
-        min_incl=1,
-        type_res=int,
-    )
+    return _snapshot.recognition_retry_max
 
 
-async def recognition_stt_complete_timeout_ms() -> int:
+def recognition_stt_complete_timeout_ms() -> int:
     """
     The timeout for STT completion in milliseconds.
     """
-    return await _default(
-        default=100,
-        key="recognition_stt_complete_timeout_ms",
-        type_res=int,
-    )
+    return _snapshot.recognition_stt_complete_timeout_ms
 
 
-async def _default(
-    default: T,
-    key: str,
-    type_res: type[T],
-    max_incl: T | None = None,
-    min_incl: T | None = None,
-) -> T:
+async def load() -> None:
     """
-    Get a setting from the App Configuration service with a default value.
+    Load all the features from the App Configuration service, in a single request.
+
+    Snapshot is replaced only if a setting changed, compared by ETag. On error, the previous snapshot is kept, the defaults at startup. Errors are logged, never raised.
     """
-    # Get the setting
-    res = await _get(
-        key=key,
-        type_res=type_res,
-    )
-    if res:
-        return _validate(
-            key=key,
+    global _snapshot, _etags  # noqa: PLW0603
+
+    try:
+        client = await _use_client()
+        # Unlabeled settings only, labeled variants like "dev" must not override them
+        settings = [
+            setting
+            async for setting in client.list_configuration_settings(label_filter="\0")
+            if setting.key in _KEYS
+        ]
+    except (HttpResponseError, ServiceRequestError):
+        logger.warning(
+            "Error loading features, keeping the previous ones", exc_info=True
+        )
+        return
+    # Never fail the startup or the refresh, whatever the error
+    except Exception:
+        logger.exception("Unexpected error loading features, keeping the previous ones")
+        return
+
+    # Skip if nothing changed
+    etags = frozenset((setting.key, setting.etag) for setting in settings)
+    if etags == _etags:
+        return
+
+    # Build the new snapshot
+    values = {
+        setting.key: setting.value for setting in settings if setting.value is not None
+    }
+    _snapshot = _build(values)
+    _etags = etags
+    logger.info("Features refreshed: %s", _snapshot)
+
+
+async def refresh() -> None:
+    """
+    Keep the features up to date, polling the App Configuration service.
+
+    Runs until cancelled, for the lifespan of the application. Errors are logged, the next refresh is tried anyway.
+    """
+    while True:
+        await asyncio.sleep(CONFIG.app_configuration.ttl_sec)
+        try:
+            await load()
+        except Exception:
+            logger.exception("Error refreshing features")
+
+
+def _build(values: dict[str, str]) -> _Snapshot:
+    """
+    Build a snapshot from the raw settings.
+
+    Unknown keys are ignored. Invalid values are replaced by the defaults, and values out of bounds are clamped.
+    """
+    changes = {}
+    for field in fields(_Snapshot):
+        value = values.get(field.name)
+        if value is None:
+            continue
+        try:
+            res = _parse(
+                type_res=field.type,  # pyright: ignore[reportArgumentType]
+                value=value,
+            )
+        except ValueError:
+            res = None
+        if res is None:
+            logger.warning("Feature %s is invalid: %s", field.name, value)
+            continue
+        min_incl, max_incl = _BOUNDS.get(field.name, (None, None))
+        changes[field.name] = _validate(
+            key=field.name,
             max_incl=max_incl,
             min_incl=min_incl,
             res=res,
         )
-
-    # Return default
-    logger.info("Feature %s not found, using default: %s", key, default)
-    return _validate(
-        key=key,
-        max_incl=max_incl,
-        min_incl=min_incl,
-        res=default,
-    )
+    return _Snapshot(**changes)
 
 
 def _validate(
     key: str,
     res: T,
-    max_incl: T | None = None,
-    min_incl: T | None = None,
+    max_incl: float | None = None,
+    min_incl: float | None = None,
 ) -> T:
     """
     Validate a setting value against min and max.
@@ -184,81 +249,38 @@ def _validate(
     # Check min
     if min_incl is not None and res < min_incl:
         logger.warning("Feature %s is below min: %s", key, res)
-        return min_incl
+        return cast(T, min_incl)
     # Check max
     if max_incl is not None and res > max_incl:
         logger.warning("Feature %s is above max: %s", key, res)
-        return max_incl
+        return cast(T, max_incl)
     # Return value
     return res
 
 
-async def _get(key: str, type_res: type[T]) -> T | None:
-    """
-    Get a setting from the App Configuration service.
-    """
-    # Try cache
-    cache_key = _cache_key(key)
-    cached = await _cache.get(cache_key)
-    if cached:
-        return _parse(
-            type_res=type_res,
-            value=cached.decode(),
-        )
-
-    # Try live
-    try:
-        async with await _use_client() as client:
-            setting = await client.get_configuration_setting(key)
-        # Return default if not found
-        if not setting:
-            return
-        res = setting.value
-    except ResourceNotFoundError:
-        return
-
-    logger.debug("Setting %s refreshed: %s", key, res)
-
-    # Update cache
-    await _cache.set(
-        key=cache_key,
-        ttl_sec=CONFIG.app_configuration.ttl_sec,
-        value=res,
-    )
-
-    # Return value
-    return _parse(
-        type_res=type_res,
-        value=res,
-    )
-
-
 @lru_acache()
 async def _use_client() -> AzureAppConfigurationClient:
     """
-    Generate the App Configuration client and close it after use.
+    Generate the App Configuration client.
+
+    Client is opened once, for the lifespan of the application.
     """
     logger.debug(
         "Using App Configuration client for %s", CONFIG.app_configuration.endpoint
     )
 
-    return AzureAppConfigurationClient(
-        # Performance
-        transport=await azure_transport(),
-        # Deployment
-        base_url=CONFIG.app_configuration.endpoint,
-        # Authentication
-        credential=await credential(),
+    return await open_client(
+        AzureAppConfigurationClient(
+            # Performance
+            transport=await azure_transport(),
+            # Deployment
+            base_url=CONFIG.app_configuration.endpoint,
+            # Authentication
+            credential=await credential(),
+        )
     )
 
 
-def _cache_key(key: str) -> str:
-    """
-    Generate a cache key for a setting.
-    """
-    return f"{__name__}-{key}"
-
-
 def _parse(value: str, type_res: type[T]) -> T | None:
     """
     Parse a setting value to a type.
@@ -1,4 +1,3 @@
-import asyncio
 from html import escape
 from typing import Annotated, Literal, TypedDict
 
@@ -314,13 +313,8 @@ class DefaultPlugin(AbstractPlugin):
         - Know the procedure to declare a stolen luxury watch
         - Understand the requirements to ask for a cyber attack insurance
         """
-        # Execute in parallel
-        tasks = await asyncio.gather(
-            *[
-                _search.training_search_all(text=query, lang="en-US")
-                for query in queries
-            ]
-        )
+        # Execute in parallel, cache is read in one round trip
+        tasks = await _search.training_search_many(texts=queries, lang="en-US")
 
         # Flatten, remove duplicates, and sort by score
         trainings = sorted(set(training for task in tasks for training in task or []))
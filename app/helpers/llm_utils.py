@@ -19,7 +19,7 @@ from azure.cognitiveservices.speech import (
     SpeechSynthesizer,
 )
 from azure.communication.callautomation.aio import CallAutomationClient
-from jinja2 import Environment
+from jinja2 import Environment, Template
 from json_repair import repair_json
 from pydantic import BaseModel, TypeAdapter
 from pydantic._internal._typing_extra import eval_type_lenient
@@ -72,7 +72,13 @@ class AbstractPlugin:
         self.tts_callback = tts_callback
         self.tts_client = tts_client
 
-    @lru_acache()
+    @lru_acache(
+        key_func=lambda self, blacklist: (
+            self.__class__,
+            blacklist,
+            hash(self.call.initiate.model_dump_json()),
+        ),
+    )  # Plugin is instanciated for each chat, rendering only depends on the call initiation, so share it across chats and calls
     async def to_openai(
         self,
         blacklist: frozenset[str],
@@ -82,7 +88,7 @@ class AbstractPlugin:
         """
         functions = self._available_functions(frozenset(blacklist))
         return await asyncio.gather(
-            *[_function_schema(func, call=self.call) for func in functions]
+            *[_compile_function(func).render(call=self.call) for func in functions]
         )
 
     @start_as_current_span("plugin_execute")
@@ -161,9 +167,10 @@ class AbstractPlugin:
         # Enrich span
         SpanAttributeEnum.TOOL_RESULT.attribute(tool.content)
 
-    @lru_cache()
+    @classmethod
+    @lru_cache()  # Cache per class, as plugin is instanciated for each chat
     def _available_functions(
-        self,
+        cls,
         blacklist: frozenset[str],
     ) -> list[FunctionType]:
         """
@@ -171,9 +178,9 @@ class AbstractPlugin:
         """
         return [
             func
-            for name, func in getmembers(self.__class__, isfunction)
+            for name, func in getmembers(cls, isfunction)
             if not name.startswith("_")
-            and name not in [func.__name__ for func in [self.to_openai, self.execute]]
+            and name not in [func.__name__ for func in [cls.to_openai, cls.execute]]
             and name not in blacklist
         ]
 
@@ -253,14 +260,64 @@ def add_customer_response(
     return decorator
 
 
-async def _function_schema(
-    f: Callable[..., Any],
-    **kwargs: Any,
-) -> ChatCompletionsToolDefinition:
+class _CompiledFunction:
+    """
+    OpenAI API schema of a function, with the static parts computed once.
+
+    Only the Jinja templates of the function description and parameter descriptions are rendered for each call.
     """
-    Take a function and return a JSON schema for it as defined by the OpenAI API.
 
-    Kwargs are passed to the Jinja template for rendering the function description and parameter descriptions.
+    description: Template
+    name: str
+    parameters: dict[str, tuple[JsonSchemaValue, Template]]
+    required: list[str]
+
+    def __init__(
+        self,
+        description: Template,
+        name: str,
+        parameters: dict[str, tuple[JsonSchemaValue, Template]],
+        required: list[str],
+    ):
+        self.description = description
+        self.name = name
+        self.parameters = parameters
+        self.required = required
+
+    async def render(self, **kwargs: Any) -> ChatCompletionsToolDefinition:
+        """
+        Render the schema as defined by the OpenAI API.
+
+        Kwargs are passed to the Jinja templates for rendering the function description and parameter descriptions.
+        """
+        # Render the descriptions, then remove newlines to avoid hallucinations
+        description = _remove_newlines(await self.description.render_async(**kwargs))
+        properties = {
+            name: {
+                **schema,
+                "description": _remove_newlines(await template.render_async(**kwargs)),
+            }
+            for name, (schema, template) in self.parameters.items()
+        }
+
+        return ChatCompletionsToolDefinition(
+            function=FunctionDefinition(
+                description=description,
+                name=self.name,
+                parameters=Parameters(
+                    properties=properties,
+                    required=self.required,
+                ).model_dump(),
+            ),
+        )
+
+
+@lru_cache(
+    maxsize=1024
+)  # Functions are the members of the plugin classes, compile them once
+def _compile_function(f: Callable[..., Any]) -> _CompiledFunction:
+    """
+    Take a function and compile its schema as defined by the OpenAI API.
 
     Raise TypeError if the function is not annotated.
     """
@@ -289,25 +346,21 @@ async def _function_schema(
             + f"The annotations are missing for the following parameters: {', '.join(missing_s)}"
         )
 
-    description = _remove_newlines(
-        await _jinja.from_string(dedent(f.__doc__ or "")).render_async(**kwargs)
-    )  # Remove possible indentation, render the description, then remove newlines to avoid hallucinations
-    name = f.__name__
-    parameters: dict[str, object] = (
-        await _parameters(
-            default_values=default_values,
-            param_annotations=param_annotations,
-            required_params=required_params,
-            **kwargs,
-        )
-    ).model_dump()
-
-    return ChatCompletionsToolDefinition(
-        function=FunctionDefinition(
-            description=description,
-            name=name,
-            parameters=parameters,
-        ),
+    return _CompiledFunction(
+        description=_jinja.from_string(
+            dedent(f.__doc__ or "")
+        ),  # Remove possible indentation
+        name=f.__name__,
+        parameters={
+            name: _parameter_json_schema(
+                default_values=default_values,
+                name=name,
+                value=value,
+            )
+            for name, value in param_annotations.items()
+            if value != inspect.Signature.empty and name != "self"
+        },
+        required=list(required_params),
     )
 
 
@@ -353,16 +406,17 @@ def _param_annotations(
     }
 
 
-async def _parameter_json_schema(
+def _parameter_json_schema(
     name: str,
     value: Annotated[type[Any], str] | type[Any],
     default_values: dict[str, Any],
-    **kwargs: Any,
-) -> JsonSchemaValue:
+) -> tuple[JsonSchemaValue, Template]:
     """
-    Get a JSON schema for a parameter as defined by the OpenAI API and return the Pydantic model for the parameter.
+    Get a JSON schema for a parameter as defined by the OpenAI API.
 
-    Kwargs are passed to the Jinja template for rendering the parameter description.
+    Returns a tuple:
+    1. JSON schema, without description
+    2. Jinja template of the description
     """
 
     def _description(name: str, value: Annotated[type[Any], str] | type[Any]) -> str:
@@ -381,13 +435,9 @@ async def _parameter_json_schema(
         dv = default_values[name]
         schema["default"] = dv
 
-    schema["description"] = _remove_newlines(
-        await _jinja.from_string(dedent(_description(name, value))).render_async(
-            **kwargs
-        )
-    )  # Remove possible indentation, render the description, then remove newlines to avoid hallucinations
-
-    return schema
+    return schema, _jinja.from_string(
+        dedent(_description(name, value))
+    )  # Remove possible indentation
 
 
 def _required_params(typed_signature: inspect.Signature) -> set[str]:
@@ -412,32 +462,6 @@ def _default_values(typed_signature: inspect.Signature) -> dict[str, Any]:
     }
 
 
-async def _parameters(
-    required_params: set[str],
-    param_annotations: dict[str, Annotated[type[Any], str] | type[Any]],
-    default_values: dict[str, Any],
-    **kwargs: Any,
-) -> Parameters:
-    """
-    Get the parameters of a function as defined by the OpenAI API and return the Pydantic model for the parameters.
-
-    Kwargs are passed to the Jinja template for rendering the parameter description.
-    """
-    return Parameters(
-        properties={
-            name: await _parameter_json_schema(
-                default_values=default_values,
-                name=name,
-                value=value,
-                **kwargs,
-            )
-            for name, value in param_annotations.items()
-            if value != inspect.Signature.empty and name != "self"
-        },
-        required=list(required_params),
-    )
-
-
 def _missing_annotations(
     typed_signature: inspect.Signature, required_params: set[str]
 ) -> tuple[set[str], set[str]]:
@@ -1,22 +1,29 @@
+import asyncio
 import json
-from collections.abc import AsyncGenerator, Callable
+import math
+import time
+from collections import OrderedDict, defaultdict
+from collections.abc import AsyncGenerator, Callable, Generator
+from contextlib import contextmanager
 from os import environ
 from typing import TypeVar
 
 import tiktoken
 from azure.ai.inference._model_base import Model, SdkJSONEncoder
-from azure.ai.inference.aio import ChatCompletionsClient
 from azure.ai.inference.models import (
     AssistantMessage,
     ChatCompletionsToolDefinition,
     ChatRequestMessage,
+    CompletionsUsage,
     StreamingChatResponseMessageUpdate,
     SystemMessage,
     UserMessage,
 )
 from azure.core.exceptions import (
+    HttpResponseError,
     ServiceResponseError,
 )
+from azure.core.pipeline import PipelineResponse
 from json_repair import repair_json
 from pydantic import ValidationError
 from tenacity import (
@@ -33,7 +40,19 @@ from app.helpers.config import CONFIG
 from app.helpers.config_models.llm import DeploymentModel as LlmDeploymentModel
 from app.helpers.features import slow_llm_for_chat
 from app.helpers.logging import logger
-from app.helpers.monitoring import start_as_current_span
+from app.helpers.monitoring import (
+    SpanAttributeEnum,
+    counter_add,
+    gauge_set,
+    llm_deployment_circuit_open,
+    llm_deployment_utilization,
+    llm_hedge,
+    llm_hedge_win,
+    llm_prompt_cached_tokens,
+    llm_prompt_tokens,
+    llm_request,
+    start_as_current_span,
+)
 from app.helpers.resources import resources_dir
 from app.models.message import MessageModel
 
@@ -57,22 +76,317 @@ class MaximumTokensReachedError(Exception):
     pass
 
 
+class RateLimitError(Exception):
+    pass
+
+
 _retried_exceptions = [
+    RateLimitError,
     ServiceResponseError,
 ]
 
+# Token count of the tool lists, by list identity and model, with the list to keep its identity
+_tools_tokens: OrderedDict[
+    tuple[int, str], tuple[list[ChatCompletionsToolDefinition], int]
+] = OrderedDict()
+_TOOLS_TOKENS_MAXSIZE = 128
+
+
+class _LatencyTracker:
+    """
+    Time to first token of a deployment, in seconds.
+
+    Mean and variance are exponentially weighted moving averages, so recent requests weight more. The 95th percentile is estimated from them, assuming a normal distribution.
+
+    See: https://en.wikipedia.org/wiki/Exponential_smoothing
+    """
+
+    _ALPHA = 0.2
+    """Weight of the last sample."""
+    _MIN_SAMPLES = 5
+    """Samples required before estimating the percentiles."""
+
+    mean: float = 0.0
+    samples: int = 0
+    variance: float = 0.0
+
+    def record(self, latency: float) -> None:
+        """
+        Add a sample.
+        """
+        if not self.samples:
+            self.mean = latency
+        else:
+            diff = latency - self.mean
+            increment = self._ALPHA * diff
+            self.mean += increment
+            self.variance = (1 - self._ALPHA) * (self.variance + diff * increment)
+        self.samples += 1
+
+    def p95(self) -> float | None:
+        """
+        Estimate the 95th percentile.
+
+        Returns `None` if there are not enough samples.
+        """
+        if self.samples < self._MIN_SAMPLES:
+            return None
+        return self.mean + 1.645 * math.sqrt(self.variance)
+
+
+# Time to first token, per deployment
+_latencies: defaultdict[LlmDeploymentModel, _LatencyTracker] = defaultdict(
+    _LatencyTracker
+)
+
+
+class _Quota:
+    """
+    Rate limit of a deployment, in requests or tokens per minute.
+
+    Remaining quota is the last one returned by the service, minus the estimated usage of the requests sent since. It is refilled linearly, as the service evaluates it on a sliding minute. Limit is the one returned by the service, or the highest remaining quota seen.
+    """
+
+    _WINDOW_SEC = 60
+    """Duration of the quota."""
+
+    limit: float = 0.0
+    remaining: float | None = None
+    updated_at: float = 0.0
+
+    def observe(self, limit: str | None, remaining: str | None) -> None:
+        """
+        Update the quota from the response headers.
+        """
+        if remaining is None:
+            return
+        self.remaining = float(remaining)
+        self.limit = max(float(limit or 0), self.limit, self.remaining)
+        self.updated_at = time.monotonic()
+
+    def consume(self, amount: float) -> None:
+        """
+        Remove an estimated usage from the quota.
+        """
+        if self.remaining is None:
+            return
+        self.remaining = self.share() * self.limit - amount
+        self.updated_at = time.monotonic()
+
+    def share(self) -> float:
+        """
+        Returns the share of the quota left, from 0 to 1.
+
+        An unknown quota is considered unused.
+        """
+        if self.remaining is None:
+            return 1.0
+        if not self.limit:
+            return 0.0
+        refill = self.limit * (time.monotonic() - self.updated_at) / self._WINDOW_SEC
+        return max(0.0, min(1.0, (self.remaining + refill) / self.limit))
+
+
+class _DeploymentBudget:
+    """
+    Rate limits and health of a deployment.
+
+    Deployment is skipped for a while after consecutive failures, or for the delay returned by a rate limited response.
+
+    See: https://learn.microsoft.com/en-us/azure/architecture/patterns/circuit-breaker
+    """
+
+    failures: int = 0
+    """Consecutive failures."""
+    in_flight: int = 0
+    """Requests in progress."""
+    open_until: float = 0.0
+    """Monotonic time until which the deployment is skipped."""
+    requests: _Quota
+    tokens: _Quota
+
+    def __init__(self):
+        self.requests = _Quota()
+        self.tokens = _Quota()
+
+    def available(self) -> bool:
+        """
+        Returns `True` if the circuit is closed.
+        """
+        return self.open_until <= time.monotonic()
+
+    def headroom(self) -> float:
+        """
+        Returns the share of the most used quota left, from 0 to 1.
+        """
+        return min(self.requests.share(), self.tokens.share())
+
+    def observe(self, response: PipelineResponse) -> None:
+        """
+        Update the quotas from the response headers.
+
+        Used as the `raw_response_hook` of the requests.
+        """
+        headers = response.http_response.headers
+        self.requests.observe(
+            limit=headers.get("x-ratelimit-limit-requests"),
+            remaining=headers.get("x-ratelimit-remaining-requests"),
+        )
+        self.tokens.observe(
+            limit=headers.get("x-ratelimit-limit-tokens"),
+            remaining=headers.get("x-ratelimit-remaining-tokens"),
+        )
+
+    def failure(self, retry_after_sec: float | None = None) -> bool:
+        """
+        Report a failure, and open the circuit if needed.
+
+        Returns `True` if the circuit has been opened.
+        """
+        config = CONFIG.llm.circuit_breaker
+        self.failures += 1
+        if retry_after_sec is None and self.failures < config.failures:
+            return False
+        self.failures = 0
+        self.open_until = time.monotonic() + (
+            config.open_sec if retry_after_sec is None else retry_after_sec
+        )
+        return True
+
+
+# Rate limits and health, per deployment
+_budgets: defaultdict[LlmDeploymentModel, _DeploymentBudget] = defaultdict(
+    _DeploymentBudget
+)
+
+
+def _select_deployment(is_fast: bool) -> LlmDeploymentModel:
+    """
+    Returns the deployment of the model with the most headroom.
+
+    Headroom is the share of the rate limit left, multiplied by the deployment weight, and shared with the requests in progress. Deployments with an open circuit are skipped. If all are, the one closing first is returned.
+    """
+    pool = CONFIG.llm.pool(is_fast)
+    available = [deployment for deployment in pool if _budgets[deployment].available()]
+    if not available:
+        return min(pool, key=lambda deployment: _budgets[deployment].open_until)
+    return max(
+        available,
+        key=lambda deployment: (
+            deployment.weight
+            * _budgets[deployment].headroom()
+            / (1 + _budgets[deployment].in_flight)
+        ),
+    )
+
+
+@contextmanager
+def _use_budget(
+    deployment: LlmDeploymentModel,
+    tokens: int,
+) -> Generator[Callable[[PipelineResponse], None]]:
+    """
+    Track a request in the budget of a deployment.
+
+    Estimated usage is removed from the quotas beforehand, then corrected by the response headers, with the yielded response hook. Server errors and rate limits are reported to the circuit breaker, rate limits are raised as `RateLimitError`.
+    """
+    attributes = {SpanAttributeEnum.LLM_DEPLOYMENT.value: deployment.endpoint}
+    budget = _budgets[deployment]
+    budget.in_flight += 1
+    budget.requests.consume(1)
+    budget.tokens.consume(tokens)
+    try:
+        yield budget.observe
+        budget.failures = 0
+    except HttpResponseError as e:
+        if e.status_code == 429:  # noqa: PLR2004
+            if budget.failure(_retry_after(e)):
+                counter_add(
+                    metric=llm_deployment_circuit_open,
+                    value=1,
+                    attributes=attributes,
+                )
+            raise RateLimitError(f"Rate limited on {deployment.endpoint}") from e
+        if (e.status_code or 0) >= 500 and budget.failure():  # noqa: PLR2004
+            counter_add(
+                metric=llm_deployment_circuit_open,
+                value=1,
+                attributes=attributes,
+            )
+        raise
+    except ServiceResponseError:
+        if budget.failure():
+            counter_add(
+                metric=llm_deployment_circuit_open,
+                value=1,
+                attributes=attributes,
+            )
+        raise
+    finally:
+        budget.in_flight -= 1
+        gauge_set(
+            metric=llm_deployment_utilization,
+            value=1 - budget.headroom(),
+            attributes=attributes,
+        )
+
+
+def _report_usage(
+    deployment: LlmDeploymentModel,
+    usage: CompletionsUsage,
+) -> None:
+    """
+    Report the prompt tokens, and the ones served from the cache of the LLM provider.
+
+    Cache hit rate is the cached tokens over the prompt tokens. Cached tokens are reported by Azure OpenAI in `prompt_tokens_details`, which is not modeled by the SDK.
+
+    See: https://learn.microsoft.com/en-us/azure/ai-services/openai/how-to/prompt-caching
+    """
+    attributes = {SpanAttributeEnum.LLM_DEPLOYMENT.value: deployment.endpoint}
+    details = usage.get("prompt_tokens_details") or {}
+    counter_add(
+        metric=llm_prompt_tokens,
+        value=usage.prompt_tokens,
+        attributes=attributes,
+    )
+    counter_add(
+        metric=llm_prompt_cached_tokens,
+        value=details.get("cached_tokens") or 0,
+        attributes=attributes,
+    )
+
+
+def _retry_after(error: HttpResponseError) -> float | None:
+    """
+    Returns the delay asked by a rate limited response, in seconds.
+    """
+    if error.response is None:
+        return None
+    headers = error.response.headers
+    try:
+        if retry_after_ms := headers.get("retry-after-ms"):
+            return float(retry_after_ms) / 1000
+        if retry_after := headers.get("retry-after"):
+            return float(retry_after)
+    except ValueError:
+        pass
+    return None
+
 
 @start_as_current_span("llm_completion_stream")
 async def completion_stream(
     max_tokens: int,
     messages: list[MessageModel],
     system: list[SystemMessage],
+    context: list[SystemMessage] = [],
     tools: list[ChatCompletionsToolDefinition] = [],
 ) -> AsyncGenerator[StreamingChatResponseMessageUpdate]:
     """
     Returns a stream of completions.
 
-    Completion is first made with the fast LLM, then the slow LLM if the previous fails. Catch errors for a maximum of 3 times (internal + `RateLimitError`). If it fails again, raise the error.
+    The `system` messages are placed before the conversation, the `context` ones after it.
+
+    Completion is first made with the fast LLM, then the slow LLM if the previous fails. Each attempt is routed to the deployment of the LLM with the most headroom, see `_select_deployment`. First attempts are hedged on the other LLM if the first token is late, see `_completion_stream_hedged`. Catch errors for a maximum of 3 times (internal + `RateLimitError`). If it fails again, raise the error.
     """
     retryed = AsyncRetrying(
         reraise=True,
@@ -87,8 +401,9 @@ async def completion_stream(
     try:
         async for attempt in retryed:
             with attempt:
-                async for chunck in _completion_stream_worker(
-                    is_fast=not await slow_llm_for_chat(),  # Let configuration decide
+                async for chunck in _completion_stream_hedged(
+                    context=context,
+                    is_fast=not slow_llm_for_chat(),  # Let configuration decide
                     max_tokens=max_tokens,
                     messages=messages,
                     system=system,
@@ -108,7 +423,10 @@ async def completion_stream(
     async for attempt in retryed:
         with attempt:
             async for chunck in _completion_stream_worker(
-                is_fast=await slow_llm_for_chat(),  # Let configuration decide
+                context=context,
+                deployment=_select_deployment(
+                    slow_llm_for_chat()  # Let configuration decide
+                ),
                 max_tokens=max_tokens,
                 messages=messages,
                 system=system,
@@ -117,8 +435,9 @@ async def completion_stream(
                 yield chunck
 
 
-# TODO: Refacto, too long (and remove PLR0912 ignore)
-async def _completion_stream_worker(
+async def _completion_stream_hedged(  # noqa: PLR0913
+    *,
+    context: list[SystemMessage],
     is_fast: bool,
     max_tokens: int,
     messages: list[MessageModel],
@@ -126,48 +445,185 @@ async def _completion_stream_worker(
     tools: list[ChatCompletionsToolDefinition] = [],
 ) -> AsyncGenerator[StreamingChatResponseMessageUpdate]:
     """
-    Returns a stream of completions.
+    Returns a stream of completions, hedged across the deployments.
+
+    Completion is started on the requested deployment. If its first token is late compared to its usual latency, completion is started on the other deployment too. The first to produce a token wins, the other is cancelled. If the requested deployment is usually slower than the maximum delay, both are started at once.
     """
-    # Init client
-    client, platform = await _use_llm(is_fast)
+    counter_add(
+        metric=llm_request,
+        value=1,
+    )
 
+    # Streams in progress, by task waiting for their first token
+    streams: dict[
+        asyncio.Future,
+        tuple[
+            AsyncGenerator[StreamingChatResponseMessageUpdate],
+            LlmDeploymentModel,
+            float,
+        ],
+    ] = {}
+
+    def _start(is_fast: bool) -> LlmDeploymentModel:
+        deployment = _select_deployment(is_fast)
+        stream = _completion_stream_worker(
+            context=context,
+            deployment=deployment,
+            max_tokens=max_tokens,
+            messages=messages,
+            system=system,
+            tools=tools,
+        )
+        streams[asyncio.ensure_future(anext(stream))] = (
+            stream,
+            deployment,
+            time.monotonic(),
+        )
+        return deployment
+
+    # Start with the requested deployment
+    primary = _start(is_fast)
+
+    winner = None
+    try:
+        # Wait for the first token, then hedge
+        delay = _hedging_delay(primary)
+        done, _ = await asyncio.wait(streams, timeout=delay)
+        if not done:
+            logger.debug("First token late after %.2fs, hedging", delay)
+            counter_add(
+                metric=llm_hedge,
+                value=1,
+            )
+            _start(not is_fast)
+
+        # Wait for the first stream to produce a token, or all to fail
+        error: BaseException | None = None
+        first: StreamingChatResponseMessageUpdate | None = None
+        pending = set(streams)
+        while pending and not winner:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                exception = task.exception()
+                # Keep the first error, raise it if all fail
+                if exception and not isinstance(exception, StopAsyncIteration):
+                    error = error or exception
+                    continue
+                if not winner:
+                    winner = task
+                    first = None if exception else task.result()
+        if not winner:
+            raise error  # pyright: ignore[reportGeneralTypeIssues]
+
+        # Report the winner latency
+        stream, deployment, started_at = streams[winner]
+        _latencies[deployment].record(time.monotonic() - started_at)
+        if len(streams) > 1 and deployment != primary:
+            counter_add(
+                metric=llm_hedge_win,
+                value=1,
+            )
+
+        # Yield from the winner
+        if first:
+            yield first
+            async for chunck in stream:
+                yield chunck
+
+    finally:
+        # Cancel the losers, their latency is not recorded as it is unknown
+        for task, (stream, _, _) in streams.items():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            await stream.aclose()
+
+
+def _hedging_delay(deployment: LlmDeploymentModel) -> float | None:
+    """
+    Returns the wait for the first token of a deployment, before hedging, in seconds.
+
+    Wait is the 95th percentile of its latency, bounded by the configuration. It is zero if the deployment is usually slower than the maximum, `None` if hedging is disabled.
+    """
+    config = CONFIG.llm.hedging
+    if not config.enabled:
+        return None
+
+    latency = _latencies[deployment]
+    max_delay = config.max_delay_ms / 1000
+    # Usually too slow, start both at once
+    if latency.samples and latency.mean > max_delay:
+        return 0
+    return min(
+        max(latency.p95() or max_delay, config.min_delay_ms / 1000),
+        max_delay,
+    )
+
+
+# TODO: Refacto, too long (and remove PLR0912 ignore)
+async def _completion_stream_worker(  # noqa: PLR0913
+    *,
+    context: list[SystemMessage],
+    deployment: LlmDeploymentModel,
+    max_tokens: int,
+    messages: list[MessageModel],
+    system: list[SystemMessage],
+    tools: list[ChatCompletionsToolDefinition] = [],
+) -> AsyncGenerator[StreamingChatResponseMessageUpdate]:
+    """
+    Returns a stream of completions.
+    """
     # Build context and limit to 20 messages for quick response and avoid hallucinations
-    prompt = _limit_messages(
-        context_window=platform.context,
+    prompt, tokens = _limit_messages(
+        context=context,
+        context_window=deployment.context,
         max_messages=20,  # Quick response
         max_tokens=max_tokens,
         messages=messages,
-        model=platform.model,
+        model=deployment.model,
         system=system,
         tools=tools,
     )
 
-    # Start completion
-    stream = await client.complete(
-        max_tokens=max_tokens,
-        messages=prompt,
-        stream=True,
-        # AI Inference API doesn't support enpty tools array
-        # See: https://github.com/microsoft/call-center-ai/issues/399
-        tools=tools or None,
-    )
+    with _use_budget(deployment=deployment, tokens=tokens + max_tokens) as hook:
+        # Init client
+        client, _ = await deployment.client()
+
+        # Start completion
+        stream = await client.complete(
+            max_tokens=max_tokens,
+            messages=prompt,
+            model_extras={
+                "stream_options": {"include_usage": True}
+            },  # Report the usage in the last chunck, for the prompt cache metrics
+            raw_response_hook=hook,
+            retry_status=0,  # Rate limits are routed to another deployment
+            stream=True,
+            # AI Inference API doesn't support enpty tools array
+            # See: https://github.com/microsoft/call-center-ai/issues/399
+            tools=tools or None,
+        )
 
-    # Yield chuncks
-    async for chunck in stream:
-        choices = chunck.choices
-        # Skip empty choices, happens sometimes with GPT-4 Turbo
-        if not choices:
-            continue
-        choice = choices[0]
-        delta = choice.delta
-        # Azure OpenAI content filter
-        if choice.finish_reason == "content_filter":
-            raise SafetyCheckError(f"Issue detected in text: {delta.content}")
-        if choice.finish_reason == "length":
-            logger.warning("Maximum tokens reached %s, should be fixed", max_tokens)
-            raise MaximumTokensReachedError(f"Maximum tokens reached {max_tokens}")
-        if delta:
-            yield delta
+        # Yield chuncks
+        async for chunck in stream:
+            # Report the usage, sent with the last chunck
+            if chunck.usage:
+                _report_usage(deployment=deployment, usage=chunck.usage)
+            choices = chunck.choices
+            # Skip empty choices, happens sometimes with GPT-4 Turbo
+            if not choices:
+                continue
+            choice = choices[0]
+            delta = choice.delta
+            # Azure OpenAI content filter
+            if choice.finish_reason == "content_filter":
+                raise SafetyCheckError(f"Issue detected in text: {delta.content}")
+            if choice.finish_reason == "length":
+                logger.warning("Maximum tokens reached %s, should be fixed", max_tokens)
+                raise MaximumTokensReachedError(f"Maximum tokens reached {max_tokens}")
+            if delta:
+                yield delta
 
 
 @retry(
@@ -242,19 +698,9 @@ async def _completion_sync_worker(
 ) -> str | None:
     """
     Returns a completion.
-    """
-    # Init client
-    client, platform = await _use_llm(is_fast)
-
-    # Build context
-    prompt = _limit_messages(
-        context_window=platform.context,
-        max_tokens=max_tokens,
-        messages=[],
-        model=platform.model,
-        system=system,
-    )
 
+    Each attempt is routed to the deployment of the LLM with the most headroom, see `_select_deployment`.
+    """
     # Try more times with fast LLM, if it fails again, raise the error
     retryed = AsyncRetrying(
         reraise=True,
@@ -269,17 +715,36 @@ async def _completion_sync_worker(
     choice = None
     async for attempt in retryed:
         with attempt:
-            # Start completion
-            choice = (
-                await client.complete(
+            deployment = _select_deployment(is_fast)
+
+            # Build context
+            prompt, tokens = _limit_messages(
+                context_window=deployment.context,
+                max_tokens=max_tokens,
+                messages=[],
+                model=deployment.model,
+                system=system,
+            )
+
+            with _use_budget(
+                deployment=deployment, tokens=tokens + (max_tokens or 0)
+            ) as hook:
+                # Init client
+                client, _ = await deployment.client()
+
+                # Start completion
+                res = await client.complete(
                     max_tokens=max_tokens,
                     messages=prompt,
-                    model=platform.model,
+                    model=deployment.model,
+                    raw_response_hook=hook,
                     response_format="json_object" if json_output else None,
-                    seed=platform.seed,
-                    temperature=platform.temperature,
+                    retry_status=0,  # Rate limits are routed to another deployment
+                    seed=deployment.seed,
+                    temperature=deployment.temperature,
                 )
-            ).choices[0]
+            _report_usage(deployment=deployment, usage=res.usage)
+            choice = res.choices[0]
             # Azure OpenAI content filter
             if choice.finish_reason == "content_filter":
                 raise SafetyCheckError(
@@ -297,57 +762,103 @@ def _limit_messages(  # noqa: PLR0913
     messages: list[MessageModel],
     model: str,
     system: list[SystemMessage],
+    context: list[SystemMessage] | None = None,
     max_messages: int = 1000,
     tools: list[ChatCompletionsToolDefinition] | None = None,
-) -> list[ChatRequestMessage]:
+) -> tuple[list[ChatRequestMessage], int]:
     """
-    Returns a list of messages limited by the context size.
+    Returns a list of messages limited by the context size, and its number of tokens.
 
-    The context size is the maximum number of tokens allowed by the model. The messages are selected from the newest to the oldest, until the context or the maximum number of messages is reached.
+    The context size is the maximum number of tokens allowed by the model. The messages are selected from the newest to the oldest, until the context or the maximum number of messages is reached. The `system` messages are placed before them, the `context` ones after them, as they change at each turn and would break the cached prompt prefix.
     """
+    context = context or []  # Default
     max_tokens = max_tokens or 0  # Default
 
     counter = 0
     max_context = context_window - max_tokens
     selected_messages = []
     tokens = 0
-    total = min(len(system) + len(messages), max_messages)
+    total = min(len(system) + len(context) + len(messages), max_messages)
 
-    # Add system messages
-    for message in system:
-        tokens += _count_tokens(_dump_sdk_model(message), model)
+    # Add system and context messages
+    for message in [*system, *context]:
+        tokens += _count_system_tokens(message.content, model)
         counter += 1
 
     # Add tools
-    for tool in tools or []:
-        tokens += _count_tokens(_dump_sdk_model(tool), model)
+    if tools:
+        tokens += _count_tools_tokens(tools, model)
 
     # Add user messages until the available context is reached, from the newest to the oldest
     for message in messages[::-1]:
-        openai_message = message.to_openai()
-        new_tokens = _count_tokens(
-            "".join([_dump_sdk_model(x) for x in openai_message]),
-            model,
-        )
+        new_tokens = message.tokens(model)
         if tokens + new_tokens >= max_context:
             break
         if counter >= max_messages:
             break
         counter += 1
-        selected_messages += openai_message[::-1]
+        selected_messages += message.to_openai()[::-1]
         tokens += new_tokens
 
     logger.info("Using %s/%s messages (%s tokens) as context", counter, total, tokens)
     return [
         *system,
         *selected_messages[::-1],
-    ]
+        *context,
+    ], tokens
 
 
-@lru_cache()  # Cache results in memory as token count is done many times on the same content
+def count_sdk_tokens(messages: list[ChatRequestMessage], model: str) -> int:
+    """
+    Returns the number of tokens of AI Inference SDK messages, using the model's encoding.
+
+    Result is not cached, callers are expected to store it, see `MessageModel.tokens`.
+    """
+    return len(_encoding(model).encode("".join([_dump_sdk_model(x) for x in messages])))
+
+
+# Cache results in memory as system prompts and tools are the same across turns and calls, messages are counted in their own ledger
+@lru_cache(maxsize=1024)
 def _count_tokens(content: str, model: str) -> int:
     """
     Returns the number of tokens in the content, using the model's encoding.
+    """
+    return len(_encoding(model).encode(content))
+
+
+@lru_cache(maxsize=1024)
+def _count_system_tokens(content: str, model: str) -> int:
+    """
+    Returns the number of tokens of a system message, using the model's encoding.
+
+    Cached by content, the message is serialized only the first time.
+    """
+    return _count_tokens(_dump_sdk_model(SystemMessage(content=content)), model)
+
+
+def _count_tools_tokens(tools: list[ChatCompletionsToolDefinition], model: str) -> int:
+    """
+    Returns the number of tokens of the tool definitions, using the model's encoding.
+
+    Cached by list identity, as the plugins share the same list across turns and calls, see `AbstractPlugin.to_openai`. The cache keeps a reference to the list, so its identity is not reused.
+    """
+    key = (id(tools), model)
+    cached = _tools_tokens.get(key)
+    if cached and cached[0] is tools:
+        _tools_tokens.move_to_end(key)
+        return cached[1]
+
+    tokens = sum(_count_tokens(_dump_sdk_model(tool), model) for tool in tools)
+    _tools_tokens[key] = (tools, tokens)
+    if len(_tools_tokens) > _TOOLS_TOKENS_MAXSIZE:
+        _tools_tokens.popitem(last=False)
+    return tokens
+
+
+@lru_cache()
+def _encoding(model: str) -> tiktoken.Encoding:
+    """
+    Returns the model's encoding.
 
     If the model is unknown to tiktoken, it uses the GPT-3.5 encoding.
     """
@@ -356,7 +867,7 @@ def _count_tokens(content: str, model: str) -> int:
     except KeyError:
         encoding_name = tiktoken.encoding_name_for_model("gpt-3.5")
         logger.debug("Unknown model %s, using %s encoding", model, encoding_name)
-    return len(tiktoken.get_encoding(encoding_name).encode(content))
+    return tiktoken.get_encoding(encoding_name)
 
 
 def _dump_sdk_model(message: Model) -> str:
@@ -368,14 +879,3 @@ def _dump_sdk_model(message: Model) -> str:
         exclude_readonly=True,
         obj=message,
     )
-
-
-async def _use_llm(
-    is_fast: bool,
-) -> tuple[ChatCompletionsClient, LlmDeploymentModel]:
-    """
-    Returns an LLM client and platform model.
-
-    The client is either an Azure OpenAI or an OpenAI client, depending on the configuration.
-    """
-    return await CONFIG.llm.selected(is_fast).client()
@@ -0,0 +1,141 @@
+from binascii import Error as BinasciiError, a2b_base64, b2a_base64
+
+import orjson
+
+# Audio format of the media streaming, PCM 16-bit mono
+PACKET_DURATION_MS = 20
+SAMPLE_WIDTH = 2  # Bytes per sample
+
+# Outbound events, with keys in the order sent by the former JSON serialization
+_AUDIO_DATA_PREFIX = b'{"kind":"AudioData","audioData":{"data":"'
+_AUDIO_DATA_SUFFIX = b'"}}'
+STOP_AUDIO_MESSAGE = '{"kind":"StopAudio","stopAudio":{}}'
+
+
+def packet_size(sample_rate: int, packet_duration_ms: int = PACKET_DURATION_MS) -> int:
+    """
+    Returns the size of an audio packet in bytes, for the sample rate.
+    """
+    return int(sample_rate * packet_duration_ms / 1000) * SAMPLE_WIDTH
+
+
+def decode_audio_event(message: str | bytes) -> bytes | None:
+    """
+    Decode an inbound event from Communication Services media streaming.
+
+    Audio is decoded from base64 straight to a new buffer, owned by the caller.
+
+    Returns the PCM audio, or None if the event is not audio, is silent, or is malformed.
+    """
+    try:
+        event = orjson.loads(message)
+    except orjson.JSONDecodeError:
+        return None
+
+    # TODO: Handle configuration event (audio format, sample rate, etc.)
+    # Skip non-audio events
+    if not isinstance(event, dict) or event.get("kind") != "AudioData":
+        return None
+
+    # Filter out silent audio
+    audio_data = event.get("audioData") or {}
+    audio_base64: str | None = audio_data.get("data", None)
+    audio_silent: bool | None = audio_data.get("silent", True)
+    if audio_silent or not audio_base64:
+        return None
+
+    try:
+        return a2b_base64(audio_base64)
+    except BinasciiError:
+        return None
+
+
+class AudioFrameEncoder:
+    """
+    Encode outbound audio frames to Communication Services media streaming events.
+
+    The JSON envelope is built once. For packets of the expected size, only the base64 payload is copied in the reused template. Messages are text, as expected by Communication Services.
+    """
+
+    _buffer: bytearray
+    _data: memoryview
+    _packet_size: int
+
+    def __init__(self, packet_size: int):
+        self._packet_size = packet_size
+        data_size = len(b2a_base64(b"\x00" * packet_size, newline=False))
+        self._buffer = bytearray(
+            _AUDIO_DATA_PREFIX + b"\x00" * data_size + _AUDIO_DATA_SUFFIX
+        )
+        self._data = memoryview(self._buffer)[
+            len(_AUDIO_DATA_PREFIX) : len(_AUDIO_DATA_PREFIX) + data_size
+        ]
+
+    def encode(self, pcm: bytes) -> str:
+        """
+        Encode a PCM packet to a JSON text message.
+        """
+        data = b2a_base64(pcm, newline=False)
+
+        # Packet of unexpected size, build the message
+        if len(pcm) != self._packet_size:
+            return (_AUDIO_DATA_PREFIX + data + _AUDIO_DATA_SUFFIX).decode("ascii")
+
+        # Fill the template
+        self._data[:] = data
+        return self._buffer.decode("ascii")
+
+
+class PacketCoalescer:
+    """
+    Split a stream of audio chunks of any size into packets of an exact size.
+
+    Incomplete packets are kept until the next push, or until flushed.
+    """
+
+    _packet_size: int
+    _remainder: bytearray
+
+    def __init__(self, packet_size: int):
+        self._packet_size = packet_size
+        self._remainder = bytearray()
+
+    def push(self, audio_data: bytes) -> list[bytes]:
+        """
+        Add audio to the stream.
+
+        Returns the complete packets.
+        """
+        size = self._packet_size
+
+        # Complete the previous packet
+        if self._remainder:
+            missing = size - len(self._remainder)
+            self._remainder += audio_data[:missing]
+            if len(self._remainder) < size:
+                return []
+            packets = [bytes(self._remainder)]
+            self._remainder.clear()
+            audio_data = audio_data[missing:]
+        else:
+            packets = []
+
+        # Slice full packets, keep the rest
+        full_end = len(audio_data) - len(audio_data) % size
+        packets.extend(
+            audio_data[start : start + size] for start in range(0, full_end, size)
+        )
+        self._remainder += audio_data[full_end:]
+        return packets
+
+    def flush(self) -> bytes | None:
+        """
+        Pad the incomplete packet with silence.
+
+        Returns the padded packet, if any.
+        """
+        if not self._remainder:
+            return None
+        packet = bytes(self._remainder.ljust(self._packet_size, b"\x00"))
+        self._remainder.clear()
+        return packet
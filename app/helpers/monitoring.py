@@ -33,6 +33,8 @@ class SpanAttributeEnum(str, Enum):
     """Message content as a string."""
     CALL_PHONE_NUMBER = "call.phone_number"
     """Phone number of the caller."""
+    LLM_DEPLOYMENT = "llm.deployment"
+    """LLM deployment endpoint."""
     TOOL_ARGS = "tool.args"
     """Tool arguments being used."""
     TOOL_NAME = "tool.name"
@@ -58,20 +60,60 @@ class SpanAttributeEnum(str, Enum):
 
 
 class SpanMeterEnum(str, Enum):
+    CACHE_L1_HIT = "cache.l1.hit"
+    """Reads served from the memory tier of the cache."""
+    CACHE_L1_MISS = "cache.l1.miss"
+    """Reads not found in the memory tier of the cache."""
+    CACHE_L2_HIT = "cache.l2.hit"
+    """Reads served from the Redis tier of the cache."""
+    CACHE_L2_MISS = "cache.l2.miss"
+    """Reads not found in the Redis tier of the cache."""
     CALL_ANSWER_LATENCY = "call.answer.latency"
     """Answer latency in seconds."""
     CALL_AEC_MISSED = "call.aec.missed"
     """Echo cancellation missed frames."""
     CALL_AEC_DROPED = "call.aec.droped"
     """Echo cancellation dropped frames."""
+    CALL_AEC_LATENCY = "call.aec.latency"
+    """Echo cancellation processing latency in seconds, per batch."""
+    CALL_AEC_PENDING = "call.aec.pending"
+    """Echo cancellation frames waiting for a worker."""
+    CALL_CHAT_REACTION_LATENCY = "call.chat.reaction.latency"
+    """Latency in seconds between the end of the LLM completion and its handling."""
     CALL_CUTOFF_LATENCY = "call.cutoff.latency"
     """Cutoff latency in seconds."""
     CALL_FRAMES_IN_LATENCY = "call.frames.in.latency"
     """Audio frames in latency in seconds."""
     CALL_FRAMES_OUT_LATENCY = "call.frames.out.latency"
     """Audio frames out latency in seconds."""
+    CALL_SPECULATIVE_HIT = "call.speculative.hit"
+    """Speculative answers kept, the complete recognition matched the partial one."""
+    CALL_SPECULATIVE_MISS = "call.speculative.miss"
+    """Speculative answers cancelled, the complete recognition diverged from the partial one."""
+    CALL_SPECULATIVE_WASTE = "call.speculative.waste"
+    """Speculative answers cancelled before the end of the user voice."""
+    CALL_STORE_PATCH_FAILED = "call.store.patch.failed"
+    """Database patch operations not persisted after a failed patch, kept for the next flush."""
+    CALL_STORE_PATCH_SAVED = "call.store.patch.saved"
+    """Database patches saved by merging the transactions of a call."""
+    CALL_STORE_REQUEST_CHARGE = "call.store.request.charge"
+    """Database request units consumed by the call reads, queries, creations and patches."""
     CALL_STT_COMPLETE_LATENCY = "call.stt.complete.latency"
     """Speech-to-text missed complete latency."""
+    LLM_DEPLOYMENT_CIRCUIT_OPEN = "llm.deployment.circuit.open"
+    """Times an LLM deployment was skipped after failures or a rate limit."""
+    LLM_DEPLOYMENT_UTILIZATION = "llm.deployment.utilization"
+    """Estimated share of the rate limit used on an LLM deployment, from 0 to 1."""
+    LLM_HEDGE = "llm.hedge"
+    """Streamed completions started on the second deployment, the first token of the first one was late."""
+    LLM_HEDGE_WIN = "llm.hedge.win"
+    """Hedged completions won by the second deployment."""
+    LLM_PROMPT_CACHED_TOKENS = "llm.prompt.cached_tokens"
+    """Prompt tokens served from the cache of the LLM provider."""
+    LLM_PROMPT_TOKENS = "llm.prompt.tokens"
+    """Prompt tokens sent to the LLM."""
+    LLM_REQUEST = "llm.request"
+    """Streamed completions, hedged or not."""
 
     def counter(
         self,
@@ -130,18 +172,41 @@ meter = metrics.get_meter(
 )
 
 # Init metrics
+cache_l1_hit = SpanMeterEnum.CACHE_L1_HIT.counter("reads")
+cache_l1_miss = SpanMeterEnum.CACHE_L1_MISS.counter("reads")
+cache_l2_hit = SpanMeterEnum.CACHE_L2_HIT.counter("reads")
+cache_l2_miss = SpanMeterEnum.CACHE_L2_MISS.counter("reads")
 call_aec_droped = SpanMeterEnum.CALL_AEC_DROPED.counter("frames")
+call_aec_latency = SpanMeterEnum.CALL_AEC_LATENCY.gauge("s")
 call_aec_missed = SpanMeterEnum.CALL_AEC_MISSED.counter("frames")
+call_aec_pending = SpanMeterEnum.CALL_AEC_PENDING.gauge("frames")
 call_answer_latency = SpanMeterEnum.CALL_ANSWER_LATENCY.gauge("s")
+call_chat_reaction_latency = SpanMeterEnum.CALL_CHAT_REACTION_LATENCY.gauge("s")
 call_cutoff_latency = SpanMeterEnum.CALL_CUTOFF_LATENCY.gauge("s")
 call_frames_in_latency = SpanMeterEnum.CALL_FRAMES_IN_LATENCY.gauge("s")
 call_frames_out_latency = SpanMeterEnum.CALL_FRAMES_OUT_LATENCY.gauge("s")
+call_speculative_hit = SpanMeterEnum.CALL_SPECULATIVE_HIT.counter("answers")
+call_speculative_miss = SpanMeterEnum.CALL_SPECULATIVE_MISS.counter("answers")
+call_speculative_waste = SpanMeterEnum.CALL_SPECULATIVE_WASTE.counter("answers")
+call_store_patch_failed = SpanMeterEnum.CALL_STORE_PATCH_FAILED.counter("operations")
+call_store_patch_saved = SpanMeterEnum.CALL_STORE_PATCH_SAVED.counter("patches")
+call_store_request_charge = SpanMeterEnum.CALL_STORE_REQUEST_CHARGE.counter("RU")
 call_stt_complete_latency = SpanMeterEnum.CALL_STT_COMPLETE_LATENCY.gauge("s")
+llm_deployment_circuit_open = SpanMeterEnum.LLM_DEPLOYMENT_CIRCUIT_OPEN.counter(
+    "circuits"
+)
+llm_deployment_utilization = SpanMeterEnum.LLM_DEPLOYMENT_UTILIZATION.gauge("1")
+llm_hedge = SpanMeterEnum.LLM_HEDGE.counter("requests")
+llm_hedge_win = SpanMeterEnum.LLM_HEDGE_WIN.counter("requests")
+llm_prompt_cached_tokens = SpanMeterEnum.LLM_PROMPT_CACHED_TOKENS.counter("tokens")
+llm_prompt_tokens = SpanMeterEnum.LLM_PROMPT_TOKENS.counter("tokens")
+llm_request = SpanMeterEnum.LLM_REQUEST.counter("requests")
 
 
 def gauge_set(
     metric: Gauge,
     value: float | int,
+    attributes: Attributes = None,
 ):
     """
     Set a gauge metric value with context attributes.
@@ -153,6 +218,8 @@ def gauge_set(
             **_default_attributes,
             # Then, set context attributes, they can override default attributes
             **get_contextvars(),
+            # Finally, set metric attributes
+            **(attributes or {}),
         },
     )
 
@@ -160,6 +227,7 @@ def gauge_set(
 def counter_add(
     metric: Counter,
     value: float | int,
+    attributes: Attributes = None,
 ):
     """
     Add a counter metric value with context attributes.
@@ -171,6 +239,8 @@ def counter_add(
             **_default_attributes,
             # Then, set context attributes, they can override default attributes
             **get_contextvars(),
+            # Finally, set metric attributes
+            **(attributes or {}),
         },
     )
 
@@ -9,7 +9,8 @@ from tenacity import (
     wait_random_exponential,
 )
 
-from app.helpers.cache import lru_acache
+from app.helpers.cache import lru_acache, single_flight
+from app.helpers.clients import open_client
 from app.helpers.config import CONFIG
 from app.helpers.http import azure_transport
 from app.helpers.logging import logger
@@ -17,6 +18,24 @@ from app.helpers.logging import logger
 logger.info("Using Translation %s", CONFIG.ai_translation.endpoint)
 
 _cache = CONFIG.cache.instance
+# Maximum number of texts per request, limit of the Translator API
+# See: https://learn.microsoft.com/en-us/azure/ai-services/translator/service-limits
+_MAX_TEXTS_PER_REQUEST = 1000
+
+
+async def translate_text(text: str, source_lang: str, target_lang: str) -> str | None:
+    """
+    Translate text from source language to target language.
+
+    If the source and target languages are the same, the original text is returned. Catch errors for a maximum of 3 times.
+    """
+    return (
+        await translate_texts(
+            source_lang=source_lang,
+            target_lang=target_lang,
+            texts=[text],
+        )
+    )[0]
 
 
 @retry(
@@ -25,56 +44,114 @@ _cache = CONFIG.cache.instance
     stop=stop_after_attempt(3),
     wait=wait_random_exponential(multiplier=0.8, max=8),
 )
-async def translate_text(text: str, source_lang: str, target_lang: str) -> str | None:
+async def translate_texts(
+    texts: list[str],
+    source_lang: str,
+    target_lang: str,
+) -> list[str | None]:
     """
-    Translate text from source language to target language.
+    Translate texts from source language to target language, in batch.
 
-    If the source and target languages are the same, the original text is returned. Catch errors for a maximum of 3 times.
+    Identical texts are translated once, and cache misses are translated with a single request per 1000 texts. If the source and target languages are the same, the original texts are returned. Catch errors for a maximum of 3 times.
+
+    Returns the translations, in the same order as the texts.
     """
     # No need to translate
     if source_lang == target_lang:
-        return text
+        return list(texts)
+
+    # Deduplicate texts
+    unique_texts = list(dict.fromkeys(texts))
 
     # Try cache
-    cache_key = f"{__name__}-translate_text-{text}-{source_lang}-{target_lang}"
-    cached = await _cache.get(cache_key)
-    if cached:
-        return cached.decode()
-
-    # Try live
-    translation: str | None = None
-    async with await _use_client() as client:
+    cache_keys = {
+        text: f"{__name__}-translate_text-{text}-{source_lang}-{target_lang}"
+        for text in unique_texts
+    }
+    cached = await _cache.get_many(list(cache_keys.values()))
+    translations: dict[str, str | None] = {
+        text: value.decode()
+        for text, value in zip(unique_texts, cached, strict=True)
+        if value
+    }
+
+    # Try live, once for concurrent misses
+    misses = [text for text in unique_texts if text not in translations]
+    if misses:
+        logger.debug(
+            "Translating %s/%s texts from %s to %s",
+            len(misses),
+            len(texts),
+            source_lang,
+            target_lang,
+        )
+        translations.update(
+            await single_flight(
+                key=(__name__, source_lang, target_lang, *misses),
+                func=lambda: _translate_live(
+                    cache_keys=cache_keys,
+                    source_lang=source_lang,
+                    target_lang=target_lang,
+                    texts=misses,
+                ),
+            )
+        )
+
+    return [translations.get(text) for text in texts]
+
+
+async def _translate_live(
+    cache_keys: dict[str, str],
+    source_lang: str,
+    target_lang: str,
+    texts: list[str],
+) -> dict[str, str | None]:
+    """
+    Translate texts with the Translator API, and cache them.
+
+    Returns the translations, by text.
+    """
+    translations: dict[str, str | None] = {}
+    client = await _use_client()
+    for i in range(0, len(texts), _MAX_TEXTS_PER_REQUEST):
+        chunk = texts[i : i + _MAX_TEXTS_PER_REQUEST]
         res: list[TranslatedTextItem] = await client.translate(
-            body=[text],
+            body=chunk,
             from_language=source_lang,
             to_language=[target_lang],
         )
-    translation = res[0].translations[0].text if res and res[0].translations else None
+        for text, item in zip(chunk, res, strict=True):
+            translations[text] = (
+                item.translations[0].text if item.translations else None
+            )
 
     # Update cache
-    await _cache.set(
-        key=cache_key,
+    await _cache.set_many(
+        items={cache_keys[text]: translations[text] for text in texts},
         ttl_sec=60 * 60 * 24,  # 1 day
-        value=translation,
     )
 
-    return translation
+    return translations
 
 
 @lru_acache()
 async def _use_client() -> TextTranslationClient:
     """
-    Generate the Translation client and close it after use.
+    Generate the Translation client.
+
+    Client is opened once, for the lifespan of the application.
     """
     logger.debug("Using Translation client for %s", CONFIG.ai_translation.endpoint)
 
-    return TextTranslationClient(
-        # Performance
-        transport=await azure_transport(),
-        # Deployment
-        endpoint=CONFIG.ai_translation.endpoint,
-        # Authentication
-        credential=AzureKeyCredential(
-            CONFIG.ai_translation.access_key.get_secret_value()
-        ),
+    return await open_client(
+        TextTranslationClient(
+            # Performance
+            transport=await azure_transport(),
+            # Deployment
+            endpoint=CONFIG.ai_translation.endpoint,
+            # Authentication
+            credential=AzureKeyCredential(
+                CONFIG.ai_translation.access_key.get_secret_value()
+            ),
+        )
     )
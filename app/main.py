@@ -1,12 +1,12 @@
 import asyncio
 import json
 import time
-from base64 import b64decode, b64encode
+from collections.abc import AsyncGenerator
 from contextlib import asynccontextmanager
 from datetime import timedelta
 from http import HTTPStatus
 from os import getenv
-from typing import Annotated, Any
+from typing import Annotated
 from urllib.parse import quote_plus, urljoin
 from uuid import UUID
 
@@ -33,7 +33,7 @@ from fastapi import (
     WebSocketDisconnect,
 )
 from fastapi.exceptions import RequestValidationError, ValidationException
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
 from htmlmin.minify import html_minify
 from jinja2 import Environment, FileSystemLoader
 from pydantic import Field, TypeAdapter, ValidationError
@@ -41,6 +41,8 @@ from starlette.datastructures import Headers
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from twilio.twiml.messaging_response import MessagingResponse
 
+from app.helpers import features
+from app.helpers.aec_executor import shutdown as aec_shutdown
 from app.helpers.cache import get_scheduler, lru_acache
 from app.helpers.call_events import (
     on_audio_connected,
@@ -57,9 +59,16 @@ from app.helpers.call_events import (
     on_transfer_error,
 )
 from app.helpers.call_utils import ContextEnum as CallContextEnum
+from app.helpers.clients import close_clients
 from app.helpers.config import CONFIG
 from app.helpers.http import aiohttp_session, azure_transport
 from app.helpers.logging import logger
+from app.helpers.media_codec import (
+    STOP_AUDIO_MESSAGE,
+    AudioFrameEncoder,
+    decode_audio_event,
+    packet_size,
+)
 from app.helpers.monitoring import (
     SpanAttributeEnum,
     call_frames_in_latency,
@@ -70,7 +79,12 @@ from app.helpers.monitoring import (
 )
 from app.helpers.pydantic_types.phone_numbers import PhoneNumber
 from app.helpers.resources import resources_dir
-from app.models.call import CallGetModel, CallInitiateModel, CallStateModel
+from app.models.call import (
+    CallGetModel,
+    CallInitiateModel,
+    CallStateModel,
+    CallSummaryModel,
+)
 from app.models.error import ErrorInnerModel, ErrorModel
 from app.models.next import ActionEnum as NextActionEnum
 from app.models.readiness import ReadinessCheckModel, ReadinessEnum, ReadinessModel
@@ -132,9 +146,21 @@ logger.info("Using callback URL %s", _COMMUNICATIONSERVICES_CALLABACK_TPL)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):  # noqa: ARG001
+    features_task = None
     queue_tasks = None
+    tts_task = None
 
     try:
+        # Open database client and fetch its metadata
+        await _db.warmup()
+
+        # Load features, defaults are kept on error, then keep them up to date
+        await features.load()
+        features_task = asyncio.create_task(features.refresh())
+        # Translate the TTS prompts in background, errors are logged by the task, calls answered before are translated live
+        tts_task = asyncio.create_task(
+            CONFIG.prompts.tts.warmup(CONFIG.conversation.initiate)
+        )
         queue_tasks = asyncio.gather(
             _call_queue.trigger(
                 arg="call",
@@ -157,12 +183,20 @@ async def lifespan(app: FastAPI):  # noqa: ARG001
 
     # Cancel tasks
     finally:
+        if features_task:
+            features_task.cancel()
         if queue_tasks:
             queue_tasks.cancel()
+        if tts_task:
+            tts_task.cancel()
 
-    # Close HTTP session
+    # Close SDK clients, then the HTTP session they share
+    await close_clients()
     await (await aiohttp_session()).close()
 
+    # Stop echo cancellation workers
+    await aec_shutdown()
+
 
 # FastAPI
 api = FastAPI(
@@ -246,36 +280,47 @@ async def health_readiness_get() -> JSONResponse:
     response_class=HTMLResponse,
 )
 @start_as_current_span("report_get")
-async def report_get(phone_number: str | None = None) -> HTMLResponse:
+async def report_get(
+    continuation: str | None = None,
+    phone_number: str | None = None,
+) -> StreamingResponse:
     """
     List all calls with a web interface.
 
     Optional URL parameters:
+    - continuation: Continuation token of the page, from the previous page
     - phone_number: Filter by phone number
 
-    Returns a list of calls with a web interface.
+    Returns a page of calls with a web interface.
     """
     phone_number = PhoneNumber(phone_number) if phone_number else None
     count = 100
-    calls, total = (
-        await _db.call_search_all(count=count, phone_number=phone_number) or []
+    (calls, next_continuation), total = await asyncio.gather(
+        _db.call_search_summaries(
+            continuation=continuation,
+            count=count,
+            phone_number=phone_number,
+        ),
+        _db.call_count(phone_number),
     )
 
     template = _jinja.get_template("list.html.jinja")
-    render = await template.render_async(
+    # Stream the rendering, the minifier is skipped as it needs the whole document
+    render = template.generate_async(
         applicationinsights_connection_string=getenv(
             "APPLICATIONINSIGHTS_CONNECTION_STRING"
         ),
         bot_phone_number=CONFIG.communication_services.phone_number,
-        calls=calls or [],
+        calls=calls,
         count=count,
+        next_continuation=next_continuation,
         phone_number=phone_number,
         total=total,
         version=CONFIG.version,
     )
-    render = html_minify(render)  # Minify HTML
-    return HTMLResponse(
+    return StreamingResponse(
         content=render,
+        media_type="text/html",
         status_code=HTTPStatus.OK,
     )
 
@@ -316,30 +361,53 @@ async def report_single_get(call_id: UUID) -> HTMLResponse:
     return HTMLResponse(content=render, status_code=HTTPStatus.OK)
 
 
-@api.get("/call")
+@api.get(
+    "/call",
+    response_model=list[CallSummaryModel],
+)
 @start_as_current_span("call_list_get")
 async def call_list_get(
+    continuation: str | None = None,
     phone_number: str | None = None,
-) -> list[CallGetModel]:
+) -> StreamingResponse:
     """
-    REST API to list all calls.
+    REST API to list all calls, one page at a time.
 
     Parameters:
+    - continuation: Continuation token of the page, from the previous page
     - phone_number: Filter by phone number
 
-    Returns a list of calls objects `CallGetModel`, for a phone number, in JSON format.
+    Returns a list of call summaries `CallSummaryModel`, for a phone number, in JSON format. The continuation token of the next page is in the `X-Continuation-Token` header, if any.
     """
     phone_number = PhoneNumber(phone_number) if phone_number else None
     count = 100
-    calls, _ = await _db.call_search_all(phone_number=phone_number, count=count)
-    if not calls:
+    calls, next_continuation = await _db.call_search_summaries(
+        continuation=continuation,
+        count=count,
+        phone_number=phone_number,
+    )
+    if not calls and not continuation:
         raise HTTPException(
             detail=f"Call {phone_number} not found",
             status_code=HTTPStatus.NOT_FOUND,
         )
 
-    output = [CallGetModel.model_validate(call) for call in calls or []]
-    return TypeAdapter(list[CallGetModel]).dump_python(output)
+    async def _stream() -> AsyncGenerator[bytes]:
+        # Serialize one summary at a time, instead of the whole page at once
+        yield b"["
+        for i, call in enumerate(calls):
+            if i:
+                yield b","
+            yield call.model_dump_json().encode()
+        yield b"]"
+
+    return StreamingResponse(
+        content=_stream(),
+        headers=(
+            {"X-Continuation-Token": next_continuation} if next_continuation else None
+        ),
+        media_type="application/json",
+    )
 
 
 @api.get("/call/{call_id_or_phone_number}")
@@ -589,6 +657,9 @@ async def communicationservices_wss_post(
     # await _communicationservices_validate_jwt(websocket.headers)
     call = await _communicationservices_validate_call_id(call_id, secret)
 
+    # TODO: Dynamically set the audio format
+    audio_sample_rate = 16000
+
     # Accept connection
     await websocket.accept()
     logger.info("WebSocket connection established")
@@ -609,21 +680,14 @@ async def communicationservices_wss_post(
         # Loop until the WebSocket is disconnected
         with suppress(WebSocketDisconnect):
             start: float | None = None
-            async for event in websocket.iter_json():
-                # TODO: Handle configuration event (audio format, sample rate, etc.)
-                # Skip non-audio events
-                if "kind" not in event or event["kind"] != "AudioData":
-                    continue
-
-                # Filter out silent audio
-                audio_data: dict[str, Any] = event.get("audioData", {})
-                audio_base64: str | None = audio_data.get("data", None)
-                audio_silent: bool | None = audio_data.get("silent", True)
-                if audio_silent or not audio_base64:
+            async for message in websocket.iter_text():
+                # Skip non-audio and silent events
+                audio_data = decode_audio_event(message)
+                if not audio_data:
                     continue
 
                 # Queue audio
-                await audio_in.put(b64decode(audio_base64))
+                await audio_in.put(audio_data)
 
                 # Report the frames in latency and reset the timer
                 if start:
@@ -640,6 +704,7 @@ async def communicationservices_wss_post(
         Send audio data to the WebSocket
         """
         logger.debug("Audio data sender started")
+        encoder = AudioFrameEncoder(packet_size=packet_size(audio_sample_rate))
 
         # Loop until the WebSocket is disconnected
         with suppress(WebSocketDisconnect):
@@ -651,24 +716,12 @@ async def communicationservices_wss_post(
 
                 # Send audio
                 if isinstance(audio_data, bytes):
-                    await websocket.send_json(
-                        {
-                            "kind": "AudioData",
-                            "audioData": {
-                                "data": b64encode(audio_data).decode("utf-8"),
-                            },
-                        }
-                    )
+                    await websocket.send_text(encoder.encode(audio_data))
 
                 # Stop audio
                 elif audio_data is False:
                     logger.debug("Stop audio event received, stopping audio")
-                    await websocket.send_json(
-                        {
-                            "kind": "StopAudio",
-                            "stopAudio": {},
-                        }
-                    )
+                    await websocket.send_text(STOP_AUDIO_MESSAGE)
 
                 # Report the frames out latency and reset the timer
                 if start:
@@ -687,11 +740,10 @@ async def communicationservices_wss_post(
             # Send audio to the WebSocket
             _send_audio(),
             # Process audio
-            # TODO: Dynamically set the audio format
             on_audio_connected(
                 audio_in=audio_in,
                 audio_out=audio_out,
-                audio_sample_rate=16000,
+                audio_sample_rate=audio_sample_rate,
                 call=call,
                 client=automation_client,
                 post_callback=_trigger_post_event,
@@ -1,11 +1,19 @@
-import asyncio
 import random
 import string
+import zlib
+from collections.abc import Mapping
+from copy import deepcopy
 from datetime import UTC, datetime, tzinfo
-from typing import Any
+from typing import Any, Self
 from uuid import UUID, uuid4
 
-from pydantic import BaseModel, Field, ValidationInfo, field_validator
+from pydantic import (
+    BaseModel,
+    Field,
+    PrivateAttr,
+    ValidationInfo,
+    field_validator,
+)
 
 from app.helpers.config_models.conversation import (
     LanguageEntryModel,
@@ -18,12 +26,51 @@ from app.models.message import (
     MessageModel,
     PersonaEnum as MessagePersonaEnum,
     StyleEnum as MessageStyleEnum,
+    next_change_sequence,
 )
 from app.models.next import NextModel
 from app.models.reminder import ReminderModel
 from app.models.synthesis import SynthesisModel
 from app.models.training import TrainingModel
 
+# Fields mutated in place, not tracked on assignment
+_IN_PLACE_FIELDS = {"claim", "initiate", "reminders"}
+# Version of the cache format, first byte of the cached value, bump it on breaking changes
+_CACHE_FORMAT = b"\x01"
+# Flag of the cached value, second byte, when the messages are not aligned with the database ones
+_CACHE_UNALIGNED = b"\x01"
+# Validation context for data written by the service, already validated
+_TRUSTED = {"trusted": True}
+
+
+def _merge_messages(messages: list[MessageModel]) -> list[MessageModel]:
+    """
+    Merge consecutive messages with the same persona and action.
+
+    The first message of each group is edited in place.
+    """
+    # Skip if there are no messages
+    if not messages:
+        return messages
+
+    # Iterate over the messages
+    merged: list[MessageModel] = [messages[0]]
+    for new_message in messages[1:]:
+        # If the last message is not from the same persona or action, keep it as is
+        last = merged[-1]
+        if last.persona != new_message.persona or last.action != new_message.action:
+            merged.append(new_message)
+            continue
+
+        # Merge the content and tool calls
+        last.content = (last.content + " " + new_message.content).strip()
+        last.translations = {}  # Content changed, translate it again
+        last.tool_calls = list({*last.tool_calls, *new_message.tool_calls})
+        # Override the style
+        last.style = new_message.style
+
+    return merged
+
 
 class CallInitiateModel(WorkflowInitiateModel):
     phone_number: PhoneNumber
@@ -51,7 +98,11 @@ class CallGetModel(BaseModel):
     ) -> dict[str, Any]:
         """
         Validate the claim field against the initiate data model.
+
+        Skipped for trusted data, as building the data model is costly.
         """
+        if info.context == _TRUSTED:
+            return claim or {}
         initiate: CallInitiateModel | None = info.data.get("initiate", None)
         if not initiate:
             return {}
@@ -71,26 +122,43 @@ class CallGetModel(BaseModel):
         Merge messages with the same persona.
         """
 
-        # Skip if there are no messages
-        if not messages:
-            return messages
+        return _merge_messages(messages)
 
-        # Iterate over the messages
-        merged: list[MessageModel] = [messages[0]]
-        for new_message in messages[1:]:
-            # If the last message is not from the same persona or action, keep it as is
-            last = merged[-1]
-            if last.persona != new_message.persona or last.action != new_message.action:
-                merged.append(new_message)
-                continue
 
-            # Merge the content and tool calls
-            last.content = (last.content + " " + new_message.content).strip()
-            last.tool_calls = list({*last.tool_calls, *new_message.tool_calls})
-            # Override the style
-            last.style = new_message.style
+class CallSummaryModel(BaseModel):
+    """
+    Summary of a call, for the lists.
+
+    Fields are projected by the database, messages are not loaded.
+    """
+
+    call_id: UUID
+    created_at: datetime
+    phone_number: PhoneNumber
+    synthesis_short: str | None = None
+
+    def tz(self) -> tzinfo:
+        """
+        Get the timezone of the phone number.
+        """
+        return PhoneNumber.tz(self.phone_number)
+
+
+class CallChangesSnapshot:
+    """
+    State of a call at the start of a transaction, to find its changes.
+
+    Only the fields mutated in place are copied, others are tracked on assignment.
+    """
+
+    fields: dict[str, Any]
+    messages: int
+    sequence: int
 
-        return merged
+    def __init__(self, fields: dict[str, Any], messages: int, sequence: int):
+        self.fields = fields
+        self.messages = messages
+        self.sequence = sequence
 
 
 class CallStateModel(CallGetModel, extra="ignore"):
@@ -106,6 +174,185 @@ class CallStateModel(CallGetModel, extra="ignore"):
     last_interaction_at: datetime | None = None
     recognition_retry: int = 0
     voice_id: str | None = None
+    # Private fields
+    _assigned_at: dict[str, int] = PrivateAttr(default_factory=dict)
+    """Sequence of the last assignment, per field, see `next_change_sequence`."""
+    _messages_unaligned: bool = PrivateAttr(default=False)
+    """Messages were merged when loaded, their indexes differ from the database ones until the whole list is set."""
+
+    @classmethod
+    def model_validate(cls, obj: Any, **kwargs: Any) -> Self:
+        """
+        Validate the call, and flag it if its messages were merged.
+        """
+        call = super().model_validate(obj, **kwargs)
+        if isinstance(obj, dict) and len(obj.get("messages") or []) != len(
+            call.messages
+        ):
+            call._messages_unaligned = True
+        return call
+
+    def model_copy(
+        self, *, update: Mapping[str, Any] | None = None, deep: bool = False
+    ) -> Self:
+        """
+        Copy the call, with its own private state.
+
+        Changes made on the copy are not tracked on the original.
+        """
+        copy = super().model_copy(update=update, deep=deep)
+        copy.__pydantic_private__ = deepcopy(self.__pydantic_private__)
+        return copy
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        """
+        Set the field and record the change.
+        """
+        super().__setattr__(name, value)
+        if name in type(self).model_fields:
+            self._assigned_at[name] = next_change_sequence()
+
+    def cache_dump(self) -> bytes:
+        """
+        Serialize the call for the cache.
+
+        Value is the format version, the alignment flag, then the compressed JSON. Compression is fast, it is worth it for long calls, which are mostly text.
+        """
+        return (
+            _CACHE_FORMAT
+            + (_CACHE_UNALIGNED if self._messages_unaligned else b"\x00")
+            + zlib.compress(self.model_dump_json().encode(), level=1)
+        )
+
+    @classmethod
+    def cache_load(cls, data: bytes) -> Self | None:
+        """
+        Deserialize a call from the cache.
+
+        Data written with `cache_dump` is trusted, the claim validation is skipped. Other data, like values cached before the format was introduced, is fully validated.
+
+        Returns `None` if the data is corrupted. Raises `ValidationError` if the data is invalid.
+        """
+        if data[:1] != _CACHE_FORMAT:
+            return cls.model_validate_json(data)
+        try:
+            raw = zlib.decompress(data[2:])
+        except zlib.error:
+            return None
+        call = cls.model_validate_json(raw, context=_TRUSTED)
+        # Keep the flag, messages are already merged in the cached value
+        if data[1:2] == _CACHE_UNALIGNED:
+            call._messages_unaligned = True
+        return call
+
+    def changes_start(self) -> CallChangesSnapshot:
+        """
+        Start tracking the changes of the call, for a transaction.
+
+        Cost does not depend on the number of messages.
+        """
+        return CallChangesSnapshot(
+            fields=self.model_dump(
+                include=_IN_PLACE_FIELDS,
+                mode="json",
+            ),
+            messages=len(self.messages),
+            sequence=next_change_sequence(),
+        )
+
+    def changes_since(self, snapshot: CallChangesSnapshot) -> list[dict[str, Any]]:
+        """
+        Get the changes of the call since the snapshot, as Cosmos DB patch operations.
+
+        New messages are first merged with the previous ones, as when loaded. Then, they are added at the end of the list, changed messages and fields are set. The whole list of messages is set only if it was replaced or shortened, or if its indexes differ from the database ones.
+
+        See: https://learn.microsoft.com/en-us/azure/cosmos-db/partial-document-update#supported-operations
+        """
+        operations: list[dict[str, Any]] = []
+
+        # Fields assigned or mutated in place
+        in_place = self.model_dump(
+            include=_IN_PLACE_FIELDS,
+            mode="json",
+        )
+        for field in type(self).model_fields:
+            if field == "messages":
+                continue
+            if self._assigned_at.get(field, 0) > snapshot.sequence or (
+                field in in_place and in_place[field] != snapshot.fields.get(field)
+            ):
+                operations.append(
+                    {
+                        "op": "set",
+                        "path": f"/{field}",
+                        "value": self.model_dump(
+                            exclude_none=True,
+                            include={field},
+                            mode="json",
+                        ).get(field),
+                    }
+                )
+
+        # Merge the new messages, local indexes stay the ones of the database
+        start = max(min(snapshot.messages, len(self.messages)) - 1, 0)
+        merged = _merge_messages(self.messages[start:])
+        if len(merged) < len(self.messages) - start:
+            self.messages[start:] = merged  # Edit in place, the list is not replaced
+
+        # Messages added or changed
+        changed: list[MessageModel] = []
+        message_operations: list[dict[str, Any]] = []
+        for i, message in enumerate(self.messages):
+            persisted_at = message.persisted_at
+            # Added, if not already by a concurrent transaction
+            if i >= snapshot.messages and persisted_at is None:
+                operation = "add"
+                path = "/messages/-"
+            # Changed during the transaction
+            elif message.changed_at > max(snapshot.sequence, persisted_at or 0):
+                operation = "set"
+                path = f"/messages/{i}"
+            else:
+                continue
+            message_operations.append(
+                {
+                    "op": operation,
+                    "path": path,
+                    "value": message.model_dump(
+                        exclude_none=True,
+                        mode="json",
+                    ),
+                }
+            )
+            changed.append(message)
+
+        # Messages replaced, removed, or with indexes differing from the database ones
+        if (
+            self._assigned_at.get("messages", 0) > snapshot.sequence
+            or len(self.messages) < snapshot.messages
+            or (self._messages_unaligned and message_operations)
+        ):
+            operations.append(
+                {
+                    "op": "set",
+                    "path": "/messages",
+                    "value": self.model_dump(
+                        exclude_none=True,
+                        include={"messages"},
+                        mode="json",
+                    )["messages"],
+                }
+            )
+            for message in self.messages:
+                message.mark_persisted()
+            self._messages_unaligned = False
+            return operations
+
+        for message in changed:
+            message.mark_persisted()
+        operations += message_operations
+
+        return operations
 
     @property
     def lang(self) -> LanguageEntryModel:  # pyright: ignore
@@ -131,18 +378,16 @@ class CallStateModel(CallGetModel, extra="ignore"):
 
         with tracer.start_as_current_span("call_trainings"):
             search = CONFIG.ai_search.instance
-            tasks = await asyncio.gather(
-                *[
-                    search.training_search_all(
-                        cache_only=cache_only,
-                        lang=self.lang.short_code,
-                        text=message.content,
-                    )
+            tasks = await search.training_search_many(
+                cache_only=cache_only,
+                lang=self.lang.short_code,
+                texts=[
+                    message.content
                     for message in self.messages[
                         -CONFIG.ai_search.expansion_n_messages :
                     ]
                 ],
-            )  # Get trainings from last messages
+            )  # Get trainings from last messages, cache is read in one round trip
             trainings = sorted(
                 set(
                     training
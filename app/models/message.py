@@ -1,6 +1,9 @@
+import asyncio
 import re
 from datetime import UTC, datetime
 from enum import Enum
+from itertools import count
+from typing import Any
 
 from azure.ai.inference.models import (
     AssistantMessage,
@@ -11,11 +14,21 @@ from azure.ai.inference.models import (
     ToolMessage,
     UserMessage,
 )
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, Field, PrivateAttr, field_validator
 
 _FUNC_NAME_SANITIZER_R = r"[^a-zA-Z0-9_-]"
 _MESSAGE_ACTION_R = r"(?:action=*([a-z_]*))? *(.*)"
 _MESSAGE_STYLE_R = r"(?:style=*([a-z_]*))? *(.*)"
+_change_sequence = count(1)
+
+
+def next_change_sequence() -> int:
+    """
+    Get the next sequence number of the model changes.
+
+    Sequence is shared across all models of the process, so changes can be ordered with a single number.
+    """
+    return next(_change_sequence)
 
 
 class StyleEnum(str, Enum):
@@ -119,6 +132,79 @@ class MessageModel(BaseModel):
     persona: PersonaEnum
     style: StyleEnum = StyleEnum.NONE
     tool_calls: list[ToolModel] = []
+    translations: dict[str, str] = {}
+    """Translated content, per target language. Stored to translate each message once."""
+    # Private fields
+    _changed_at: int = PrivateAttr(default=0)
+    """Sequence of the last field assignment, see `next_change_sequence`."""
+    _persisted_at: int | None = PrivateAttr(default=None)
+    """Sequence of the last time the message was added to a database patch, None if loaded from the database."""
+    _tokens: dict[tuple[str, str | None], tuple[int, int]] = PrivateAttr(
+        default_factory=dict
+    )
+    """Token ledger, per model and language, the content fingerprint and its token count. Not persisted."""
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        """
+        Set the field and record the change.
+        """
+        super().__setattr__(name, value)
+        if name in type(self).model_fields:
+            self._changed_at = next_change_sequence()
+
+    @property
+    def changed_at(self) -> int:
+        """
+        Sequence of the last field assignment.
+        """
+        return self._changed_at
+
+    @property
+    def persisted_at(self) -> int | None:
+        """
+        Sequence of the last time the message was added to a database patch.
+        """
+        return self._persisted_at
+
+    def mark_persisted(self) -> None:
+        """
+        Record the message was added to a database patch.
+        """
+        self._persisted_at = next_change_sequence()
+
+    def tokens(self, model: str) -> int:
+        """
+        Get the number of tokens of the message as sent to the LLM, using the model's encoding.
+
+        The count is stored alongside the message and computed once per model. Any edit of the message invalidates it.
+        """
+        from app.helpers.llm_worker import count_sdk_tokens
+
+        fingerprint = hash(
+            (
+                self.action,
+                self.content,
+                self.persona,
+                self.style,
+                *(
+                    (
+                        tool_call.content,
+                        tool_call.function_arguments,
+                        tool_call.function_name,
+                        tool_call.tool_id,
+                    )
+                    for tool_call in self.tool_calls
+                ),
+            )
+        )
+        key = (model, self.lang_short_code)
+        cached = self._tokens.get(key)
+        if cached and cached[0] == fingerprint:
+            return cached[1]
+
+        tokens = count_sdk_tokens(self.to_openai(), model)
+        self._tokens[key] = (fingerprint, tokens)
+        return tokens
 
     async def translate(self, target_short_code: str) -> "MessageModel":
         """
@@ -126,21 +212,20 @@ class MessageModel(BaseModel):
 
         A copy of the model is returned with the translated content.
         """
-        from app.helpers.translation import translate_text
+        return (await translate_messages([self], target_short_code))[0]
 
+    def translated_copy(self, target_short_code: str) -> "MessageModel":
+        """
+        Get a copy of the message with the stored translation, if any.
+
+        The copy shares the token ledger of the message, as it is keyed by language.
+        """
         # Work on a copy to avoid modifying the original model in the database
         copy = self.model_copy()
-
-        # Skip if no language is set
-        if not self.lang_short_code:
-            return copy
+        copy._tokens = self._tokens
 
         # Apply translation
-        translation = await translate_text(
-            source_lang=self.lang_short_code,
-            target_lang=target_short_code,
-            text=self.content,
-        )
+        translation = self.translations.get(target_short_code)
         if translation:
             copy.content = translation
             copy.lang_short_code = target_short_code
@@ -159,6 +244,13 @@ class MessageModel(BaseModel):
             return created_at.replace(tzinfo=UTC)
         return created_at
 
+    @staticmethod
+    def excluded_fields_for_llm() -> set[str]:
+        """
+        Returns fields that should be excluded from sending to LLM because they duplicate the content.
+        """
+        return {"translations"}
+
     def to_openai(
         self,
     ) -> list[ChatRequestMessage]:
@@ -209,6 +301,55 @@ class MessageModel(BaseModel):
         return res
 
 
+async def translate_messages(
+    messages: list[MessageModel],
+    target_short_code: str,
+) -> list[MessageModel]:
+    """
+    Translate messages to a target language, in batch.
+
+    Missing translations are requested once per source language. Translations are stored in the messages, so they are not translated again on the next turns.
+
+    Copies of the models are returned with the translated content.
+    """
+    from app.helpers.translation import translate_texts
+
+    # Group missing translations by source language
+    missing: dict[str, list[MessageModel]] = {}
+    for message in messages:
+        if (
+            not message.lang_short_code  # Skip if no language is set
+            or message.lang_short_code == target_short_code  # Already translated
+            or target_short_code in message.translations  # Translation stored
+        ):
+            continue
+        missing.setdefault(message.lang_short_code, []).append(message)
+
+    # Translate each language pair in one request
+    results = await asyncio.gather(
+        *[
+            translate_texts(
+                source_lang=source_lang,
+                target_lang=target_short_code,
+                texts=[message.content for message in group],
+            )
+            for source_lang, group in missing.items()
+        ]
+    )
+
+    # Store translations
+    for group, translations in zip(missing.values(), results, strict=True):
+        for message, translation in zip(group, translations, strict=True):
+            if translation:
+                # Assign to track the change
+                message.translations = {
+                    **message.translations,
+                    target_short_code: translation,
+                }
+
+    return [message.translated_copy(target_short_code) for message in messages]
+
+
 def _filter_action(text: str) -> str:
     """
     Remove action from content.
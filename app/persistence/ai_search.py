@@ -1,3 +1,5 @@
+import asyncio
+
 from azure.core.exceptions import (
     HttpResponseError,
     ResourceExistsError,
@@ -43,7 +45,8 @@ from tenacity import (
     wait_random_exponential,
 )
 
-from app.helpers.cache import lru_acache
+from app.helpers.cache import lru_acache, single_flight
+from app.helpers.clients import open_client
 from app.helpers.config_models.ai_search import AiSearchModel
 from app.helpers.http import azure_transport
 from app.helpers.identity import credential
@@ -72,8 +75,8 @@ class AiSearchSearch(ISearch):
         Check the readiness of the AI Search service.
         """
         try:
-            async with await self._use_client() as client:
-                await client.get_document_count()
+            client = await self._use_client()
+            await client.get_document_count()
             return ReadinessEnum.OK
         except HttpResponseError:
             logger.exception("Error requesting AI Search")
@@ -103,64 +106,135 @@ class AiSearchSearch(ISearch):
             return None
 
         # Try cache
-        cache_key = f"{self.__class__.__name__}-training_asearch_all-v2-{text}"  # Cache sort method has been updated in v6, thus the v2
-        cached = await self._cache.get(cache_key)
-        if cached:
-            try:
-                return TypeAdapter(list[TrainingModel]).validate_json(cached)
-            except ValidationError as e:
-                logger.debug("Parsing error: %s", e.errors())
+        cache_key = self._cache_key_training(text)
+        cached = self._parse_trainings(await self._cache.get(cache_key))
+        if cached is not None:
+            return cached
 
         if cache_only:
             return None
 
-        # Try live
+        # Try live, once for concurrent misses
+        return await single_flight(
+            key=cache_key,
+            func=lambda: self._training_search_live(
+                cache_key=cache_key,
+                lang=lang,
+                text=text,
+            ),
+        )
+
+    async def training_search_many(
+        self,
+        lang: str,
+        texts: list[str],
+        cache_only: bool = False,
+    ) -> list[list[TrainingModel] | None]:
+        # Try cache, in one round trip
+        cached = await self._cache.get_many(
+            [self._cache_key_training(text) for text in texts if text]
+        )
+        cached_iter = iter(cached)
+        res = [
+            self._parse_trainings(next(cached_iter)) if text else None for text in texts
+        ]
+
+        if cache_only:
+            return res
+
+        # Try live for the misses
+        misses = [
+            i
+            for i, (text, trainings) in enumerate(zip(texts, res))
+            if text and trainings is None
+        ]
+        for i, trainings in zip(
+            misses,
+            await asyncio.gather(
+                *[
+                    self.training_search_all(
+                        lang=lang,
+                        text=texts[i],
+                    )
+                    for i in misses
+                ]
+            ),
+        ):
+            res[i] = trainings
+        return res
+
+    def _cache_key_training(self, text: str) -> str:
+        return f"{self.__class__.__name__}-training_asearch_all-v2-{text}"  # Cache sort method has been updated in v6, thus the v2
+
+    def _parse_trainings(self, cached: bytes | None) -> list[TrainingModel] | None:
+        """
+        Parse the cached trainings.
+
+        Returns `None` if the value is missing or invalid.
+        """
+        if not cached:
+            return None
+        try:
+            return TypeAdapter(list[TrainingModel]).validate_json(cached)
+        except ValidationError as e:
+            logger.debug("Parsing error: %s", e.errors())
+        return None
+
+    async def _training_search_live(
+        self,
+        cache_key: str,
+        lang: str,
+        text: str,
+    ) -> list[TrainingModel] | None:
+        """
+        Search the training data and cache it.
+        """
         trainings: list[TrainingModel] = []
         try:
-            async with await self._use_client() as client:
-                results = await client.search(
-                    # Full text search
-                    query_language=QueryLanguage(lang.lower()),
-                    query_type=QueryType.SEMANTIC,
-                    search_mode=SearchMode.ANY,  # Any of the terms will match
-                    search_text=text,
-                    semantic_configuration_name=self._config.semantic_configuration,
-                    # Vector search
-                    vector_queries=[
-                        VectorizableTextQuery(
-                            fields="vectors",
-                            text=text,
-                        )
-                    ],
-                    # Hybrid search (full text + vector search)
-                    hybrid_search=HybridSearch(
-                        count_and_facet_mode=HybridCountAndFacetMode.COUNT_RETRIEVABLE_RESULTS,
-                        max_text_recall_size=1000,
-                    ),
-                    # Relability
-                    semantic_max_wait_in_milliseconds=750,  # Timeout in ms
-                    # Return fields
-                    include_total_count=False,  # Total count is not used
-                    query_caption_highlight_enabled=False,  # Highlighting is not used
-                    scoring_statistics=ScoringStatistics.GLOBAL,  # Evaluate scores in the backend for more accurate values
-                    top=self._config.top_n_documents,
-                )
-                async for result in results:
-                    try:
-                        trainings.append(
-                            TrainingModel.model_validate(
-                                {
-                                    **result,
-                                    "score": (
-                                        (result["@search.reranker_score"] / 4 * 5)
-                                        if "@search.reranker_score" in result
-                                        else (result["@search.score"] * 5)
-                                    ),  # Normalize score to 0-5, failback to search score if reranker is not available
-                                }
-                            )
+            client = await self._use_client()
+            results = await client.search(
+                # Full text search
+                query_language=QueryLanguage(lang.lower()),
+                query_type=QueryType.SEMANTIC,
+                search_mode=SearchMode.ANY,  # Any of the terms will match
+                search_text=text,
+                semantic_configuration_name=self._config.semantic_configuration,
+                # Vector search
+                vector_queries=[
+                    VectorizableTextQuery(
+                        fields="vectors",
+                        text=text,
+                    )
+                ],
+                # Hybrid search (full text + vector search)
+                hybrid_search=HybridSearch(
+                    count_and_facet_mode=HybridCountAndFacetMode.COUNT_RETRIEVABLE_RESULTS,
+                    max_text_recall_size=1000,
+                ),
+                # Relability
+                semantic_max_wait_in_milliseconds=750,  # Timeout in ms
+                # Return fields
+                include_total_count=False,  # Total count is not used
+                query_caption_highlight_enabled=False,  # Highlighting is not used
+                scoring_statistics=ScoringStatistics.GLOBAL,  # Evaluate scores in the backend for more accurate values
+                top=self._config.top_n_documents,
+            )
+            async for result in results:
+                try:
+                    trainings.append(
+                        TrainingModel.model_validate(
+                            {
+                                **result,
+                                "score": (
+                                    (result["@search.reranker_score"] / 4 * 5)
+                                    if "@search.reranker_score" in result
+                                    else (result["@search.score"] * 5)
+                                ),  # Normalize score to 0-5, failback to search score if reranker is not available
+                            }
                         )
-                    except ValidationError as e:
-                        logger.debug("Parsing error: %s", e.errors())
+                    )
+                except ValidationError as e:
+                    logger.debug("Parsing error: %s", e.errors())
         except ResourceNotFoundError:
             logger.warning('AI Search index "%s" not found', self._config.index)
         except HttpResponseError as e:
@@ -299,13 +373,15 @@ class AiSearchSearch(ISearch):
                 if not e.error or not e.error.code == "ResourceNameAlreadyInUse":
                     raise e
 
-        # Return client
-        return SearchClient(
-            # Deployment
-            endpoint=self._config.endpoint,
-            index_name=self._config.index,
-            # Performance
-            transport=await azure_transport(),
-            # Authentication
-            credential=await credential(),
+        # Return client, opened once for the lifespan of the application
+        return await open_client(
+            SearchClient(
+                # Deployment
+                endpoint=self._config.endpoint,
+                index_name=self._config.index,
+                # Performance
+                transport=await azure_transport(),
+                # Authentication
+                credential=await credential(),
+            )
         )
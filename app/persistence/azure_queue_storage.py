@@ -2,10 +2,9 @@ import asyncio
 from base64 import b64decode, b64encode
 from binascii import Error as BinasciiError
 from collections.abc import AsyncGenerator, Awaitable, Callable
-from contextlib import asynccontextmanager
 
 from azure.core.exceptions import ServiceRequestError
-from azure.storage.queue.aio import QueueClient, QueueServiceClient
+from azure.storage.queue.aio import QueueClient
 from pydantic import BaseModel
 from tenacity import (
     retry,
@@ -15,6 +14,7 @@ from tenacity import (
 )
 
 from app.helpers.cache import get_scheduler, lru_acache
+from app.helpers.clients import open_client
 from app.helpers.http import azure_transport
 from app.helpers.identity import credential
 from app.helpers.logging import logger
@@ -50,8 +50,8 @@ class AzureQueueStorage:
         self,
         message: str,
     ) -> None:
-        async with self._use_client() as client:
-            await client.send_message(self._escape(message))
+        client = await self._use_client()
+        await client.send_message(self._escape(message))
 
     @retry(
         reraise=True,
@@ -64,28 +64,28 @@ class AzureQueueStorage:
         max_messages: int,
         visibility_timeout: int,
     ) -> AsyncGenerator[Message]:
-        async with self._use_client() as client:
-            messages = client.receive_messages(
-                max_messages=max_messages,
-                visibility_timeout=visibility_timeout,
+        client = await self._use_client()
+        messages = client.receive_messages(
+            max_messages=max_messages,
+            visibility_timeout=visibility_timeout,
+        )
+        async for message in messages:
+            yield Message(
+                content=self._unescape(message.content),
+                delete_token=message.pop_receipt,
+                dequeue_count=message.dequeue_count,
+                message_id=message.id,
             )
-            async for message in messages:
-                yield Message(
-                    content=self._unescape(message.content),
-                    delete_token=message.pop_receipt,
-                    dequeue_count=message.dequeue_count,
-                    message_id=message.id,
-                )
 
     async def delete_message(
         self,
         message: Message,
     ) -> None:
-        async with self._use_client() as client:
-            await client.delete_message(
-                message=message.message_id,
-                pop_receipt=message.delete_token,
-            )
+        client = await self._use_client()
+        await client.delete_message(
+            message=message.message_id,
+            pop_receipt=message.delete_token,
+        )
 
     def _escape(self, value: str) -> str:
         """
@@ -159,30 +159,22 @@ class AzureQueueStorage:
         await self.delete_message(message)
 
     @lru_acache()
-    async def _use_service_client(self) -> QueueServiceClient:
-        """
-        Generate a new service client.
-        """
-        logger.debug("Using Queue Service client for %s", self._account_url)
-
-        return QueueServiceClient(
-            # Performance
-            transport=await azure_transport(),
-            # Deployment
-            account_url=self._account_url,
-            # Authentication
-            credential=await credential(),
-        )
-
-    @asynccontextmanager
-    async def _use_client(self) -> AsyncGenerator[QueueClient]:
+    async def _use_client(self) -> QueueClient:
         """
         Generate a queue client.
+
+        Client is opened once, for the lifespan of the application.
         """
-        async with await self._use_service_client() as client:
-            yield client.get_queue_client(
+        logger.debug("Using Queue client for %s/%s", self._account_url, self._name)
+
+        return await open_client(
+            QueueClient(
                 # Performance
                 transport=await azure_transport(),
                 # Deployment
-                queue=self._name,
+                account_url=self._account_url,
+                queue_name=self._name,
+                # Authentication
+                credential=await credential(),
             )
+        )
@@ -4,6 +4,7 @@ from azure.core.credentials import AzureKeyCredential
 from azure.core.exceptions import ClientAuthenticationError, HttpResponseError
 
 from app.helpers.cache import lru_acache
+from app.helpers.clients import open_client
 from app.helpers.config_models.communication_services import CommunicationServicesModel
 from app.helpers.http import azure_transport
 from app.helpers.logging import logger
@@ -32,23 +33,23 @@ class CommunicationServicesSms(ISms):
         success = False
         logger.info("SMS content: %s", content)
         try:
-            async with await self._use_client() as client:
-                responses: list[SmsSendResult] = await client.send(
-                    from_=str(self._config.phone_number),
-                    message=content,
-                    to=phone_number,
+            client = await self._use_client()
+            responses: list[SmsSendResult] = await client.send(
+                from_=str(self._config.phone_number),
+                message=content,
+                to=phone_number,
+            )
+            response = responses[0]
+            if response.successful:
+                logger.debug("SMS sent %s to %s", response.message_id, response.to)
+                success = True
+            else:
+                logger.warning(
+                    "Failed SMS to %s, status %s, error %s",
+                    response.to,
+                    response.http_status_code,
+                    response.error_message,
                 )
-                response = responses[0]
-                if response.successful:
-                    logger.debug("SMS sent %s to %s", response.message_id, response.to)
-                    success = True
-                else:
-                    logger.warning(
-                        "Failed SMS to %s, status %s, error %s",
-                        response.to,
-                        response.http_status_code,
-                        response.error_message,
-                    )
         except ClientAuthenticationError:
             logger.exception("Authentication error for SMS, check the credentials")
         except HttpResponseError:
@@ -57,13 +58,22 @@ class CommunicationServicesSms(ISms):
 
     @lru_acache()
     async def _use_client(self) -> SmsClient:
+        """
+        Generate the SMS client.
+
+        Client is opened once, for the lifespan of the application.
+        """
         logger.debug("Using SMS client for %s", self._config.endpoint)
 
-        return SmsClient(
-            # Deployment
-            endpoint=self._config.endpoint,
-            # Performance
-            transport=await azure_transport(),
-            # Authentication
-            credential=AzureKeyCredential(self._config.access_key.get_secret_value()),
+        return await open_client(
+            SmsClient(
+                # Deployment
+                endpoint=self._config.endpoint,
+                # Performance
+                transport=await azure_transport(),
+                # Authentication
+                credential=AzureKeyCredential(
+                    self._config.access_key.get_secret_value()
+                ),
+            )
         )
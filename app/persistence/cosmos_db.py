@@ -1,6 +1,7 @@
 import asyncio
 from collections.abc import AsyncGenerator
 from contextlib import asynccontextmanager
+from datetime import UTC, datetime, timedelta
 from typing import Any
 from uuid import UUID, uuid4
 
@@ -8,28 +9,105 @@ from aiojobs import Scheduler
 from azure.cosmos import ConsistencyLevel
 from azure.cosmos.aio import ContainerProxy, CosmosClient
 from azure.cosmos.exceptions import CosmosHttpResponseError, CosmosResourceNotFoundError
-from pydantic import ValidationError
+from pydantic import BaseModel, ValidationError
 
-from app.helpers.cache import lru_acache
+from app.helpers.cache import lru_acache, single_flight
+from app.helpers.clients import open_client
 from app.helpers.config_models.database import CosmosDbModel
 from app.helpers.features import callback_timeout_hour
 from app.helpers.http import azure_transport
 from app.helpers.identity import credential
 from app.helpers.logging import logger
-from app.helpers.monitoring import suppress
-from app.models.call import CallStateModel
+from app.helpers.monitoring import (
+    call_store_patch_failed,
+    call_store_patch_saved,
+    call_store_request_charge,
+    counter_add,
+    suppress,
+)
+from app.models.call import CallStateModel, CallSummaryModel
 from app.models.readiness import ReadinessEnum
 from app.persistence.icache import ICache
 from app.persistence.istore import IStore
 
+# Maximum number of operations per patch, limit of Cosmos DB
+# See: https://learn.microsoft.com/en-us/azure/cosmos-db/partial-document-update#supported-operations
+_MAX_PATCH_OPERATIONS = 10
+# Attempts to persist the changes of a call, before leaving them for the next flush
+_FLUSH_ATTEMPTS = 3
+
+
+class _WriteBehind:
+    """
+    Changes of a call waiting to be persisted.
+
+    Patch operations of consecutive transactions are merged, to be persisted in one patch.
+    """
+
+    call: CallStateModel
+    lock: asyncio.Lock
+    operations: list[dict[str, Any]]
+    scheduled: bool = False
+    transactions: int = 0
+
+    def __init__(self, call: CallStateModel):
+        self.call = call
+        self.lock = asyncio.Lock()
+        self.operations = []
+
+    def merge(self, operations: list[dict[str, Any]]) -> None:
+        """
+        Append the operations of a transaction.
+
+        A set operation replaces the previous operations on the same path and its children, the last value wins.
+        """
+        for operation in operations:
+            if operation["op"] == "set":
+                path = operation["path"]
+                self.operations = [
+                    previous
+                    for previous in self.operations
+                    if previous["path"] != path
+                    and not previous["path"].startswith(f"{path}/")
+                ]
+            self.operations.append(operation)
+
+    def requeue(self, operations: list[dict[str, Any]]) -> None:
+        """
+        Put back operations not persisted, before the ones of the next transactions.
+        """
+        newer = self.operations
+        self.operations = []
+        self.merge(operations)
+        self.merge(newer)
+
+    def fields(self) -> set[str]:
+        """
+        Top-level fields changed by the operations.
+        """
+        return {operation["path"].split("/")[1] for operation in self.operations}
+
+
+class _PhoneNumberIndexModel(BaseModel):
+    """
+    Entry of the phone number index, pointing to the latest call of a phone number.
+    """
+
+    call_id: UUID
+    created_at: datetime
+    partition: str
+    """Partition key of the call, its initiate phone number, for point reads."""
+
 
 class CosmosDbStore(IStore):
     _config: CosmosDbModel
+    _write_behind: dict[UUID, _WriteBehind]
 
     def __init__(self, cache: ICache, config: CosmosDbModel):
         super().__init__(cache)
         logger.info("Using Cosmos DB %s/%s", config.database, config.container)
         self._config = config
+        self._write_behind = {}
 
     async def readiness(self) -> ReadinessEnum:
         """
@@ -50,18 +128,16 @@ class CosmosDbStore(IStore):
             # Test the item does not exist
             if await self._item_exists(test_id, test_partition):
                 return ReadinessEnum.FAIL
-            async with self._use_client() as db:
-                # Create a new item
-                await db.upsert_item(body=test_dict)
-                # Test the item is the same
-                read_item = await db.read_item(
-                    item=test_id, partition_key=test_partition
-                )
-                assert (
-                    {k: v for k, v in read_item.items() if k in test_dict} == test_dict
-                )  # Check only the relevant fields, Cosmos DB adds metadata
-                # Delete the item
-                await db.delete_item(item=test_id, partition_key=test_partition)
+            db = await self._use_client()
+            # Create a new item
+            await db.upsert_item(body=test_dict)
+            # Test the item is the same
+            read_item = await db.read_item(item=test_id, partition_key=test_partition)
+            assert {
+                k: v for k, v in read_item.items() if k in test_dict
+            } == test_dict  # Check only the relevant fields, Cosmos DB adds metadata
+            # Delete the item
+            await db.delete_item(item=test_id, partition_key=test_partition)
             # Test the item does not exist
             if await self._item_exists(test_id, test_partition):
                 return ReadinessEnum.FAIL
@@ -74,57 +150,146 @@ class CosmosDbStore(IStore):
             logger.exception("Unknown error while checking Cosmos DB readiness")
         return ReadinessEnum.FAIL
 
+    async def warmup(self) -> None:
+        """
+        Open the Cosmos DB client and fetch the container metadata.
+
+        Reads the container properties, then runs a cross-partition query to load the partition key ranges, so the first call does not pay for them.
+        """
+        try:
+            db = await self._use_client()
+            await db.read()
+            items = db.query_items(
+                query="SELECT VALUE c.id FROM c WHERE STRINGEQUALS(c.id, @id)",
+                parameters=[{"name": "@id", "value": str(uuid4())}],
+            )
+            async for _ in items:
+                pass
+        # Never fail the startup, the first call loads the metadata instead
+        except Exception:
+            logger.warning("Error warming up CosmosDB", exc_info=True)
+
     async def _item_exists(self, test_id: str, partition_key: str) -> bool:
         exist = False
-        async with self._use_client() as db:
-            with suppress(CosmosResourceNotFoundError):
-                await db.read_item(item=test_id, partition_key=partition_key)
-                exist = True
+        db = await self._use_client()
+        with suppress(CosmosResourceNotFoundError):
+            await db.read_item(item=test_id, partition_key=partition_key)
+            exist = True
         return exist
 
     async def call_get(
         self,
         call_id: UUID,
     ) -> CallStateModel | None:
+        return await self._call_get(call_id)
+
+    async def _call_get(
+        self,
+        call_id: UUID,
+        partition: str | None = None,
+    ) -> CallStateModel | None:
+        """
+        Load a call, from the cache or from the database.
+
+        If the partition is known, the database is queried with a point read.
+        """
         logger.debug("Loading call %s", call_id)
 
+        # Persist local changes first, to read them
+        await self._flush(call_id)
+
         # Try cache
         cache_key = self._cache_key_call_id(call_id)
         cached = await self._cache.get(cache_key)
         if cached:
             try:
-                return CallStateModel.model_validate_json(cached)
+                call = CallStateModel.cache_load(cached)
+                if call:
+                    return call
             except ValidationError as e:
                 logger.debug("Parsing error: %s", e.errors())
 
-        # Try live
-        call = None
+        # Try live, once for concurrent misses
+        raw = await single_flight(
+            key=cache_key,
+            func=lambda: self._call_get_live(
+                call_id=call_id,
+                invalid=cached,
+                partition=partition,
+            ),
+        )
+        if not raw:
+            return None
+        # Each caller gets its own object, as calls are edited in place
         try:
-            with suppress(StopAsyncIteration):
-                async with self._use_client() as db:
-                    items = db.query_items(
-                        query="SELECT * FROM c WHERE STRINGEQUALS(c.id, @id)",
-                        parameters=[{"name": "@id", "value": str(call_id)}],
-                    )
-                    raw = await anext(items)
-                    try:
-                        call = CallStateModel.model_validate(raw)
-                    except ValidationError as e:
-                        logger.debug("Parsing error: %s", e.errors())
-        except CosmosHttpResponseError as e:
-            logger.error("Error accessing CosmosDB: %s", e)
+            return CallStateModel.cache_load(raw)
+        except ValidationError as e:
+            logger.debug("Parsing error: %s", e.errors())
+            return None
 
-        # Update cache
-        if call:
+    async def _call_get_live(
+        self,
+        call_id: UUID,
+        invalid: bytes | None,
+        partition: str | None,
+    ) -> bytes | None:
+        """
+        Load a call from the database and cache it.
+
+        Misses of all workers are coalesced with a cache lock, the lock holder loads the call, the others read it from the cache. The `invalid` cached value, if any, is not reused.
+
+        Returns the serialized call, or None if not found.
+        """
+        cache_key = self._cache_key_call_id(call_id)
+        async with self._cache.lock(key=cache_key, ttl_sec=10):
+            # Try cache, another worker may have loaded it meanwhile
+            cached = await self._cache.get(cache_key)
+            if cached and cached != invalid:
+                return cached
+
+            # Try live
+            call = None
+            raw = None
+            try:
+                db = await self._use_client()
+                # Point read, if the partition is known
+                if partition:
+                    with suppress(CosmosResourceNotFoundError):
+                        raw = await db.read_item(
+                            item=str(call_id),
+                            partition_key=partition,
+                            response_hook=_report_request_charge,
+                        )
+                # Query, across partitions
+                else:
+                    with suppress(StopAsyncIteration):
+                        items = db.query_items(
+                            query="SELECT * FROM c WHERE STRINGEQUALS(c.id, @id)",
+                            parameters=[{"name": "@id", "value": str(call_id)}],
+                            response_hook=_report_request_charge,
+                        )
+                        raw = await anext(items)
+            except CosmosHttpResponseError as e:
+                logger.error("Error accessing CosmosDB: %s", e)
+            if raw:
+                try:
+                    call = CallStateModel.model_validate(raw)
+                except ValidationError as e:
+                    logger.debug("Parsing error: %s", e.errors())
+
+            if not call:
+                return None
+
+            # Update cache
+            res = call.cache_dump()
             await self._cache.set(
                 key=cache_key,
-                ttl_sec=max(await callback_timeout_hour(), 1)
+                ttl_sec=max(callback_timeout_hour(), 1)
                 * 60
                 * 60,  # Ensure at least 1 hour
-                value=call.model_dump_json(),
+                value=res,
             )
-
-        return call
+            return res
 
     @asynccontextmanager
     async def call_transac(
@@ -132,73 +297,226 @@ class CosmosDbStore(IStore):
         call: CallStateModel,
         scheduler: Scheduler,
     ) -> AsyncGenerator[None]:
-        # Copy and yield the updated object
-        init_data = call.model_dump(mode="json", exclude_none=True)
+        # Track the changes and yield the updated object
+        snapshot = call.changes_start()
         yield
 
-        async def _exec() -> None:
-            # Compute the diff
-            init_call = call.model_dump(mode="json", exclude_none=True)
-            init_update: dict[str, Any] = {}
-            for field, new_value in init_call.items():
-                init_value = init_data.get(field)
-                if init_value != new_value:
-                    init_update[field] = new_value
-
-            # Skip if no diff
-            if not init_update:
-                logger.debug("No update needed for call %s", call.call_id)
+        # Get the changes
+        operations = call.changes_since(snapshot)
+
+        # Skip if no change
+        if not operations:
+            logger.debug("No update needed for call %s", call.call_id)
+            return
+
+        # Merge with the previous transactions
+        pending = self._write_behind.get(call.call_id)
+        if not pending:
+            pending = _WriteBehind(call)
+            self._write_behind[call.call_id] = pending
+        pending.call = call
+        pending.merge(operations)
+        pending.transactions += 1
+
+        # Defer the update, once per debounce window
+        if not pending.scheduled:
+            pending.scheduled = True
+            await scheduler.spawn(self._flush_later(call.call_id))
+
+    async def call_flush(
+        self,
+        call: CallStateModel,
+    ) -> None:
+        await self._flush_retry(call.call_id)
+
+    async def _flush_later(self, call_id: UUID) -> None:
+        """
+        Persist the changes of a call after the debounce window.
+
+        If cancelled, the next transaction schedules it again.
+        """
+        try:
+            await asyncio.sleep(self._config.write_behind_ms / 1000)
+        finally:
+            # Allow the next transaction to schedule a flush, also if cancelled
+            pending = self._write_behind.get(call_id)
+            if pending:
+                pending.scheduled = False
+        await self._flush_retry(call_id)
+
+    async def _flush_retry(self, call_id: UUID) -> None:
+        """
+        Persist the changes of a call, retrying the failed patches with an exponential backoff.
+
+        If all attempts fail, the changes are kept for the next flush, and an error is logged.
+        """
+        for attempt in range(_FLUSH_ATTEMPTS):
+            if attempt:
+                await asyncio.sleep(self._config.write_behind_ms / 1000 * 2**attempt)
+            if await self._flush(call_id):
                 return
+        pending = self._write_behind.get(call_id)
+        logger.error(
+            "Changes of call %s not persisted after %s attempts, %s operations kept for the next flush",
+            call_id,
+            _FLUSH_ATTEMPTS,
+            len(pending.operations) if pending else 0,
+        )
+
+    async def _flush(self, call_id: UUID) -> bool:
+        """
+        Persist the changes of a call, in as few patches as possible.
+
+        Patches of the same call are sent one after the other, in the order of the transactions. If a patch fails, it and the next ones are put back, to be sent with the next flush.
+
+        Returns True if all the changes were persisted.
+        """
+        pending = self._write_behind.get(call_id)
+        if not pending:
+            return True
+
+        async with pending.lock:
+            # Take the changes, next transactions will be in the next patch
+            call = pending.call
+            operations = pending.operations
+            transactions = pending.transactions
+            pending.operations = []
+            pending.scheduled = False
+            pending.transactions = 0
 
-            remote_raw = None
             try:
-                async with self._use_client() as db:
-                    # See: https://learn.microsoft.com/en-us/azure/cosmos-db/partial-document-update#supported-operations
-                    remote_raw = await db.patch_item(
-                        item=str(call.call_id),
-                        partition_key=call.initiate.phone_number,
-                        patch_operations=[
-                            {
-                                "op": "set",
-                                "path": f"/{field}",
-                                "value": value,
-                            }
-                            for field, value in init_update.items()
-                        ],
+                # Skip if already flushed
+                if not operations:
+                    return True
+
+                # Persist, in as few requests as possible
+                patches = [
+                    operations[i : i + _MAX_PATCH_OPERATIONS]
+                    for i in range(0, len(operations), _MAX_PATCH_OPERATIONS)
+                ]
+                remote_raw = None
+                for i, patch in enumerate(patches):
+                    new_remote_raw = await self._patch(
+                        call=call,
+                        operations=patch,
                     )
-            except CosmosHttpResponseError as e:
-                logger.error("Error accessing CosmosDB: %s", e)
-                return
+                    # Put back the failed patch and the next ones, they are sent in order with the next flush
+                    if not new_remote_raw:
+                        unsent = [
+                            operation for failed in patches[i:] for operation in failed
+                        ]
+                        pending.requeue(unsent)
+                        pending.transactions += transactions
+                        logger.warning(
+                            "Patch of call %s failed, %s operations kept for the next flush",
+                            call_id,
+                            len(unsent),
+                        )
+                        counter_add(
+                            metric=call_store_patch_failed,
+                            value=len(unsent),
+                        )
+                        break
+                    remote_raw = new_remote_raw
+                else:
+                    unsent = []
+
+                # Report the transactions merged
+                counter_add(
+                    metric=call_store_patch_saved,
+                    value=max(transactions - len(patches), 0),
+                )
 
-            # Parse remote object
-            try:
-                remote_call = CallStateModel.model_validate(remote_raw)
-            except ValidationError:
-                logger.debug("Parsing error", exc_info=True)
-                return
+                # Refresh with the remote object
+                if remote_raw:
+                    await self._refresh(
+                        call=call,
+                        pending=pending,
+                        remote_raw=remote_raw,
+                    )
 
-            # Refresh call with remote object
-            for field in call.model_fields_set:
-                new_value = getattr(remote_call, field)
-                # Skip set to avoid Pydantic costly validation
-                if getattr(call, field) == new_value:
-                    continue
-                # Try to set the new value
-                with suppress(ValidationError):
-                    setattr(call, field, new_value)
+                # Point the policyholder phone number to the call, it may have changed with the claim
+                if not unsent and any(
+                    operation["path"] == "/claim" for operation in operations
+                ):
+                    await self._index_phone_numbers(
+                        call=call,
+                        phone_numbers={call.claim.get("policyholder_phone")},
+                    )
 
-            # Update cache
-            cache_key_id = self._cache_key_call_id(call.call_id)
-            await self._cache.set(
-                key=cache_key_id,
-                ttl_sec=max(await callback_timeout_hour(), 1)
-                * 60
-                * 60,  # Ensure at least 1 hour
-                value=call.model_dump_json(),
+                return not unsent
+
+            finally:
+                # Release the memory, if no change arrived in the meantime
+                if (
+                    not pending.operations
+                    and self._write_behind.get(call_id) is pending
+                ):
+                    del self._write_behind[call_id]
+
+    async def _patch(
+        self,
+        call: CallStateModel,
+        operations: list[dict[str, Any]],
+    ) -> dict[str, Any] | None:
+        """
+        Patch the remote call with the operations.
+
+        Returns the remote object, or None if the patch failed.
+        """
+        try:
+            db = await self._use_client()
+            # See: https://learn.microsoft.com/en-us/azure/cosmos-db/partial-document-update#supported-operations
+            return await db.patch_item(
+                item=str(call.call_id),
+                partition_key=call.initiate.phone_number,
+                patch_operations=operations,
+                response_hook=_report_request_charge,
             )
+        except CosmosHttpResponseError as e:
+            logger.error("Error accessing CosmosDB: %s", e)
+            return None
+
+    async def _refresh(
+        self,
+        call: CallStateModel,
+        pending: _WriteBehind,
+        remote_raw: dict[str, Any],
+    ) -> None:
+        """
+        Refresh the local call with the remote object, then update the cache.
+        """
+        # Parse remote object
+        try:
+            remote_call = CallStateModel.model_validate(remote_raw)
+        except ValidationError:
+            logger.debug("Parsing error", exc_info=True)
+            return
+
+        # Refresh call with remote object
+        pending_fields = pending.fields()
+        for field in call.model_fields_set:
+            # Skip messages, they are merged locally with the same indexes as the remote ones, and keep their change tracking
+            if field == "messages":
+                continue
+            # Skip fields changed since the patch, they are more recent than the remote ones
+            if field in pending_fields:
+                continue
+            new_value = getattr(remote_call, field)
+            # Skip set to avoid Pydantic costly validation
+            if getattr(call, field) == new_value:
+                continue
+            # Try to set the new value
+            with suppress(ValidationError):
+                setattr(call, field, new_value)
 
-        # Defer the update
-        await scheduler.spawn(_exec())
+        # Update cache
+        cache_key_id = self._cache_key_call_id(call.call_id)
+        await self._cache.set(
+            key=cache_key_id,
+            ttl_sec=max(callback_timeout_hour(), 1) * 60 * 60,  # Ensure at least 1 hour
+            value=call.cache_dump(),
+        )
 
     # TODO: Catch errors
     async def call_create(
@@ -213,8 +531,11 @@ class CosmosDbStore(IStore):
 
         # Persist
         try:
-            async with self._use_client() as db:
-                await db.create_item(body=data)
+            db = await self._use_client()
+            await db.create_item(
+                body=data,
+                response_hook=_report_request_charge,
+            )
         except CosmosHttpResponseError:
             logger.exception("Error accessing CosmosDB")
         except ValidationError:
@@ -224,17 +545,18 @@ class CosmosDbStore(IStore):
         cache_key = self._cache_key_call_id(call.call_id)
         await self._cache.set(
             key=cache_key,
-            ttl_sec=max(await callback_timeout_hour(), 1)
-            * 60
-            * 60,  # Ensure at least 1 hour
-            value=call.model_dump_json(),
+            ttl_sec=max(callback_timeout_hour(), 1) * 60 * 60,  # Ensure at least 1 hour
+            value=call.cache_dump(),
         )
 
-        # Invalidate phone number cache
-        cache_key_phone_number = self._cache_key_phone_number(
-            call.initiate.phone_number
+        # Point the phone numbers to the new call
+        await self._index_phone_numbers(
+            call=call,
+            phone_numbers={
+                call.initiate.phone_number,
+                call.claim.get("policyholder_phone"),
+            },
         )
-        await self._cache.delete(cache_key_phone_number)
 
         return call
 
@@ -245,19 +567,27 @@ class CosmosDbStore(IStore):
     ) -> CallStateModel | None:
         logger.debug("Loading last call for %s", phone_number)
 
-        timeout = await callback_timeout_hour()
+        timeout = callback_timeout_hour()
         if timeout < 1 and callback_timeout:
             logger.debug("Callback timeout if off, skipping search")
             return None
 
-        # Try cache
-        cache_key = self._cache_key_phone_number(phone_number)
-        cached = await self._cache.get(cache_key)
-        if cached:
-            try:
-                return CallStateModel.model_validate_json(cached)
-            except ValidationError:
-                logger.debug("Parsing error", exc_info=True)
+        # Try index, then point read
+        index = self._parse_phone_number_index(
+            await self._cache.get(self._cache_key_phone_number(phone_number))
+        )
+        if index:
+            # Latest call is too old, no need to search further
+            if callback_timeout and index.created_at < datetime.now(UTC) - timedelta(
+                hours=timeout
+            ):
+                return None
+            call = await self._call_get(
+                call_id=index.call_id,
+                partition=index.partition,
+            )
+            if call:
+                return call
 
         # Filter by timeout if needed
         extra_where = ""
@@ -268,140 +598,236 @@ class CosmosDbStore(IStore):
         call = None
         try:
             with suppress(StopAsyncIteration):
-                async with self._use_client() as db:
-                    items = db.query_items(
-                        max_item_count=1,
-                        query=f"SELECT * FROM c WHERE (STRINGEQUALS(c.initiate.phone_number, @phone_number, true) OR STRINGEQUALS(c.claim.policyholder_phone, @phone_number, true)) {extra_where} ORDER BY c.created_at DESC",
-                        parameters=[
-                            {
-                                "name": "@phone_number",
-                                "value": phone_number,
-                            }
-                        ],
-                    )
-                    raw = await anext(items)
-                    try:
-                        call = CallStateModel.model_validate(raw)
-                    except ValidationError:
-                        logger.debug("Parsing error", exc_info=True)
+                db = await self._use_client()
+                items = db.query_items(
+                    max_item_count=1,
+                    query=f"SELECT * FROM c WHERE (STRINGEQUALS(c.initiate.phone_number, @phone_number, true) OR STRINGEQUALS(c.claim.policyholder_phone, @phone_number, true)) {extra_where} ORDER BY c.created_at DESC",
+                    parameters=[
+                        {
+                            "name": "@phone_number",
+                            "value": phone_number,
+                        }
+                    ],
+                    response_hook=_report_request_charge,
+                )
+                raw = await anext(items)
+                try:
+                    call = CallStateModel.model_validate(raw)
+                except ValidationError:
+                    logger.debug("Parsing error", exc_info=True)
         except CosmosHttpResponseError:
             logger.exception("Error accessing CosmosDB")
 
-        # Update cache
+        # Update cache and index
         if call:
             await self._cache.set(
-                key=cache_key,
-                ttl_sec=timeout * 60 * 60,  # Ensure at least 1 hour
-                value=call.model_dump_json(),
+                key=self._cache_key_call_id(call.call_id),
+                ttl_sec=max(timeout, 1) * 60 * 60,  # Ensure at least 1 hour
+                value=call.cache_dump(),
+            )
+            await self._index_phone_numbers(
+                call=call,
+                phone_numbers={phone_number},
             )
 
         return call
 
-    async def call_search_all(
+    async def _index_phone_numbers(
         self,
-        count: int,
-        phone_number: str | None = None,
-    ) -> tuple[list[CallStateModel] | None, int]:
-        logger.debug("Searching calls, for %s and count %s", phone_number, count)
-        # TODO: Cache results
-        calls, total = await asyncio.gather(
-            self._call_asearch_all_calls_worker(count, phone_number),
-            self._call_asearch_all_total_worker(phone_number),
+        call: CallStateModel,
+        phone_numbers: set[str | None],
+    ) -> None:
+        """
+        Point the phone numbers to the call, in the phone number index.
+
+        Index is stored in the cache, with the same TTL as the calls. A phone number already pointing to a more recent call is left as is.
+        """
+        cache_keys = [
+            self._cache_key_phone_number(phone_number)
+            for phone_number in phone_numbers
+            if phone_number
+        ]
+        if not cache_keys:
+            return
+
+        # Skip phone numbers pointing to a more recent call
+        entry = _PhoneNumberIndexModel(
+            call_id=call.call_id,
+            created_at=call.created_at,
+            partition=call.initiate.phone_number,
+        ).model_dump_json()
+        items: dict[str, str | bytes | None] = {}
+        for cache_key, cached in zip(
+            cache_keys, await self._cache.get_many(cache_keys), strict=True
+        ):
+            index = self._parse_phone_number_index(cached)
+            if index and index.created_at > call.created_at:
+                continue
+            items[cache_key] = entry
+
+        # Update index
+        await self._cache.set_many(
+            items=items,
+            ttl_sec=max(callback_timeout_hour(), 1) * 60 * 60,  # Ensure at least 1 hour
         )
-        return calls, total
 
-    async def _call_asearch_all_calls_worker(
+    def _parse_phone_number_index(
+        self, cached: bytes | None
+    ) -> _PhoneNumberIndexModel | None:
+        """
+        Parse an entry of the phone number index.
+
+        Returns `None` if the entry is missing or invalid.
+        """
+        if not cached:
+            return None
+        try:
+            return _PhoneNumberIndexModel.model_validate_json(cached)
+        except ValidationError:
+            logger.debug("Parsing error", exc_info=True)
+        return None
+
+    async def call_search_summaries(
         self,
         count: int,
+        continuation: str | None = None,
         phone_number: str | None = None,
-    ) -> list[CallStateModel] | None:
-        calls: list[CallStateModel] = []
+    ) -> tuple[list[CallSummaryModel], str | None]:
+        logger.debug(
+            "Searching call summaries, for %s and count %s", phone_number, count
+        )
+        summaries: list[CallSummaryModel] = []
+        next_continuation = None
         try:
-            async with self._use_client() as db:
-                where_clause = (
-                    "WHERE STRINGEQUALS(c.initiate.phone_number, @phone_number, true) OR STRINGEQUALS(c.claim.policyholder_phone, @phone_number, true)"
-                    if phone_number
-                    else ""
-                )
-                items = db.query_items(
-                    query=f"SELECT * FROM c {where_clause} ORDER BY c.created_at DESC OFFSET 0 LIMIT @count",
-                    parameters=[
-                        {
-                            "name": "@phone_number",
-                            "value": phone_number,
-                        },
-                        {
-                            "name": "@count",
-                            "value": count,
-                        },
-                    ],
-                )
-                async for raw in items:
-                    if not raw:
-                        continue
+            db = await self._use_client()
+            where_clause = (
+                "WHERE STRINGEQUALS(c.initiate.phone_number, @phone_number, true) OR STRINGEQUALS(c.claim.policyholder_phone, @phone_number, true)"
+                if phone_number
+                else ""
+            )
+            # Project the summary fields only, messages are the bulk of the document
+            pages = db.query_items(
+                max_item_count=count,
+                query=f"SELECT c.call_id, c.created_at, c.initiate.phone_number, c.synthesis.short AS synthesis_short FROM c {where_clause} ORDER BY c.created_at DESC",
+                parameters=[
+                    {
+                        "name": "@phone_number",
+                        "value": phone_number,
+                    },
+                ],
+                response_hook=_report_request_charge,
+            ).by_page(continuation)
+            with suppress(StopAsyncIteration):
+                async for raw in await anext(pages):
                     try:
-                        calls.append(CallStateModel.model_validate(raw))
+                        summaries.append(CallSummaryModel.model_validate(raw))
                     except ValidationError:
                         logger.debug("Parsing error", exc_info=True)
+                next_continuation = pages.continuation_token  # pyright: ignore
         except CosmosHttpResponseError:
             logger.exception("Error accessing CosmosDB")
-        return calls
+        return summaries, next_continuation
 
-    async def _call_asearch_all_total_worker(
+    async def call_count(
         self,
         phone_number: str | None = None,
     ) -> int:
+        # Try cache
+        cache_key = self._cache_key_call_count(phone_number)
+        cached = await self._cache.get(cache_key)
+        if cached:
+            return int(cached)
+
+        # Try live, once for concurrent misses
+        return await single_flight(
+            key=cache_key,
+            func=lambda: self._call_count_live(phone_number),
+        )
+
+    async def _call_count_live(
+        self,
+        phone_number: str | None,
+    ) -> int:
+        """
+        Count the calls in the database and cache the count.
+
+        Count is a scan across all partitions, it is cached for 5 minutes.
+        """
         total = 0
         try:
-            async with self._use_client() as db:
-                where_clause = (
-                    "WHERE STRINGEQUALS(c.initiate.phone_number, @phone_number, true) OR STRINGEQUALS(c.claim.policyholder_phone, @phone_number, true)"
-                    if phone_number
-                    else ""
-                )
-                items = db.query_items(
-                    query=f"SELECT VALUE COUNT(1) FROM c {where_clause}",
-                    parameters=[
-                        {
-                            "name": "@phone_number",
-                            "value": phone_number,
-                        },
-                    ],
-                )
-                total: int = await anext(items)  # pyright: ignore
+            db = await self._use_client()
+            where_clause = (
+                "WHERE STRINGEQUALS(c.initiate.phone_number, @phone_number, true) OR STRINGEQUALS(c.claim.policyholder_phone, @phone_number, true)"
+                if phone_number
+                else ""
+            )
+            items = db.query_items(
+                query=f"SELECT VALUE COUNT(1) FROM c {where_clause}",
+                parameters=[
+                    {
+                        "name": "@phone_number",
+                        "value": phone_number,
+                    },
+                ],
+                response_hook=_report_request_charge,
+            )
+            total: int = await anext(items)  # pyright: ignore
         except CosmosHttpResponseError:
             logger.exception("Error accessing CosmosDB")
+            return total
 
+        # Update cache
+        await self._cache.set(
+            key=self._cache_key_call_count(phone_number),
+            ttl_sec=60 * 5,  # 5 mins
+            value=str(total),
+        )
         return total
 
     @lru_acache()
     async def _use_service_client(self) -> CosmosClient:
         """
         Generate the Cosmos DB client.
+
+        Client is opened once, for the lifespan of the application.
         """
         logger.debug("Using Cosmos DB service client for %s", self._config.endpoint)
 
-        return CosmosClient(
-            # Usage
-            consistency_level=ConsistencyLevel.Strong,
-            # Reliability
-            connection_timeout=10,  # 10 secs
-            retry_backoff_factor=0.8,
-            retry_backoff_max=8,
-            retry_total=3,
-            # Performance
-            transport=await azure_transport(),
-            # Deployment
-            url=self._config.endpoint,
-            # Authentication
-            credential=await credential(),
+        return await open_client(
+            CosmosClient(
+                # Usage
+                consistency_level=ConsistencyLevel.Strong,
+                # Reliability
+                connection_timeout=10,  # 10 secs
+                retry_backoff_factor=0.8,
+                retry_backoff_max=8,
+                retry_total=3,
+                # Performance
+                transport=await azure_transport(),
+                # Deployment
+                url=self._config.endpoint,
+                # Authentication
+                credential=await credential(),
+            )
         )
 
-    @asynccontextmanager
-    async def _use_client(self) -> AsyncGenerator[ContainerProxy]:
+    @lru_acache()
+    async def _use_client(self) -> ContainerProxy:
         """
         Generate the container client.
+
+        Client is cached, so the container properties and partition key ranges are fetched once.
         """
-        async with await self._use_service_client() as client:
-            database = client.get_database_client(self._config.database)
-            yield database.get_container_client(self._config.container)
+        client = await self._use_service_client()
+        database = client.get_database_client(self._config.database)
+        return database.get_container_client(self._config.container)
+
+
+def _report_request_charge(headers: dict[str, str], *_: Any) -> None:
+    """
+    Report the request units consumed by a Cosmos DB request, for the reads, queries, creations and patches of the calls.
+    """
+    counter_add(
+        metric=call_store_request_charge,
+        value=float(headers.get("x-ms-request-charge", 0)),
+    )
@@ -1,4 +1,6 @@
 from abc import ABC, abstractmethod
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
 
 from app.helpers.monitoring import start_as_current_span
 from app.models.readiness import ReadinessEnum
@@ -29,3 +31,48 @@ class ICache(ABC):
     @start_as_current_span("cache_delete")
     async def delete(self, key: str) -> bool:
         pass
+
+    @abstractmethod
+    @start_as_current_span("cache_get_many")
+    async def get_many(self, keys: list[str]) -> list[bytes | None]:
+        """
+        Get many values from the cache, in one round trip.
+
+        Returns the values, in the same order as the keys.
+        """
+        pass
+
+    @abstractmethod
+    @start_as_current_span("cache_set_many")
+    async def set_many(
+        self,
+        items: dict[str, str | bytes | None],
+        ttl_sec: int,
+    ) -> bool:
+        """
+        Set many values in the cache, in one round trip.
+        """
+        pass
+
+    @abstractmethod
+    @start_as_current_span("cache_delete_many")
+    async def delete_many(self, keys: list[str]) -> bool:
+        """
+        Delete many values from the cache, in one round trip.
+        """
+        pass
+
+    @asynccontextmanager
+    async def lock(
+        self,
+        key: str,  # noqa: ARG002
+        ttl_sec: int,  # noqa: ARG002
+    ) -> AsyncGenerator[None]:
+        """
+        Hold a lock on a key, for all the workers sharing the cache.
+
+        Use it to coalesce the cache misses of all the workers: the lock holder computes the value, the others wait then read it from the cache. Lock is an optimization, not a guarantee, the block runs anyway if it cannot be acquired in `ttl_sec`.
+
+        By default, the cache is local to the process and no lock is held, see `single_flight` for the process-level coalescing.
+        """
+        yield
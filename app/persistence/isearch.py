@@ -26,3 +26,18 @@ class ISearch(ABC):
         cache_only: bool = False,
     ) -> list[TrainingModel] | None:
         pass
+
+    @abstractmethod
+    @start_as_current_span("search_training_search_many")
+    async def training_search_many(
+        self,
+        lang: str,
+        texts: list[str],
+        cache_only: bool = False,
+    ) -> list[list[TrainingModel] | None]:
+        """
+        Search the training data for many texts, reading the cache in one round trip.
+
+        Returns the results, in the same order as the texts.
+        """
+        pass
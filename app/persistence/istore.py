@@ -5,7 +5,7 @@ from uuid import UUID
 from aiojobs import Scheduler
 
 from app.helpers.monitoring import start_as_current_span
-from app.models.call import CallStateModel
+from app.models.call import CallStateModel, CallSummaryModel
 from app.models.readiness import ReadinessEnum
 from app.persistence.icache import ICache
 
@@ -21,6 +21,16 @@ class IStore(ABC):
     async def readiness(self) -> ReadinessEnum:
         pass
 
+    @abstractmethod
+    @start_as_current_span("store_warmup")
+    async def warmup(self) -> None:
+        """
+        Open the clients and load the service metadata, before the first request.
+
+        Errors are logged, never raised, the application starts anyway.
+        """
+        pass
+
     @abstractmethod
     @start_as_current_span("store_call_get")
     async def call_get(
@@ -38,6 +48,17 @@ class IStore(ABC):
     ) -> AbstractAsyncContextManager[None]:
         pass
 
+    @abstractmethod
+    @start_as_current_span("store_call_flush")
+    async def call_flush(
+        self,
+        call: CallStateModel,
+    ) -> None:
+        """
+        Persist the changes of the call waiting in the write-behind buffer, now.
+        """
+        pass
+
     @abstractmethod
     @start_as_current_span("store_call_create")
     async def call_create(
@@ -56,12 +77,31 @@ class IStore(ABC):
         pass
 
     @abstractmethod
-    @start_as_current_span("store_call_search_all")
-    async def call_search_all(
+    @start_as_current_span("store_call_search_summaries")
+    async def call_search_summaries(
         self,
         count: int,
+        continuation: str | None = None,
         phone_number: str | None = None,
-    ) -> tuple[list[CallStateModel] | None, int]:
+    ) -> tuple[list[CallSummaryModel], str | None]:
+        """
+        Search the summaries of the calls, from the most recent, one page at a time.
+
+        Returns the summaries, and the continuation token of the next page, `None` if it is the last page.
+        """
+        pass
+
+    @abstractmethod
+    @start_as_current_span("store_call_count")
+    async def call_count(
+        self,
+        phone_number: str | None = None,
+    ) -> int:
+        """
+        Count the calls.
+
+        Count is approximate, it is cached for a few minutes.
+        """
         pass
 
     def _cache_key_call_id(self, call_id: UUID) -> str:
@@ -69,3 +109,6 @@ class IStore(ABC):
 
     def _cache_key_phone_number(self, phone_number: str) -> str:
         return f"{self.__class__.__name__}-phone_number-{phone_number}"
+
+    def _cache_key_call_count(self, phone_number: str | None) -> str:
+        return f"{self.__class__.__name__}-call_count-{phone_number or 'all'}"
@@ -1,28 +1,42 @@
-import hashlib
+import heapq
+import time
 from collections import OrderedDict
-from datetime import UTC, datetime, timedelta
+from typing import NamedTuple
 
 from app.helpers.config_models.cache import MemoryModel
-from app.helpers.monitoring import suppress
 from app.models.readiness import ReadinessEnum
 from app.persistence.icache import ICache
 
 
+class _Entry(NamedTuple):
+    expires_at: float
+    """Monotonic time after which the entry is expired."""
+    size: int
+    """Size of the key and the value, in bytes."""
+    value: bytes | None
+
+
 class MemoryCache(ICache):
     """
     A simple in-memory cache.
 
-    Use the least recently used (LRU) policy to remove the oldest used items when the cache is full.
+    Use the least recently used (LRU) policy to remove the oldest used items when the cache is full, either by number of items or by size. Expired items are removed lazily, when read, or when the expiry heap is swept on write.
 
     See: https://en.wikipedia.org/wiki/Cache_replacement_policies#Least_recently_used_(LRU)
     """
 
-    _cache: OrderedDict[str, bytes | None] = OrderedDict()
     _config: MemoryModel
-    _ttl: OrderedDict[str, datetime] = OrderedDict()
+    _entries: OrderedDict[str, _Entry]
+    """Entries, from the least to the most recently used."""
+    _expiries: list[tuple[float, str]]
+    """Heap of the expiry times. Can contain outdated items, they are skipped when swept."""
+    _size: int
 
     def __init__(self, config: MemoryModel):
         self._config = config
+        self._entries = OrderedDict()
+        self._expiries = []
+        self._size = 0
 
     async def readiness(self) -> ReadinessEnum:
         """
@@ -36,24 +50,19 @@ class MemoryCache(ICache):
 
         If the key does not exist, return `None`.
         """
-        sha_key = self._key_to_hash(key)
-
-        # Check TTL, delete if expired
-        ttl = self._ttl.get(sha_key, None)
-        if ttl and ttl < datetime.now(UTC):
-            await self.delete(key)
+        entry = self._entries.get(key)
+        if not entry:
             return None
 
-        # Get from cache
-        res = self._cache.get(sha_key, None)
-        if not res:
+        # Check TTL, delete if expired
+        if entry.expires_at <= time.monotonic():
+            self._remove(key)
             return None
 
-        # Move to first
-        self._cache.move_to_end(sha_key, last=False)
-        self._ttl.move_to_end(sha_key, last=False)
+        # Move to most recently used
+        self._entries.move_to_end(key)
 
-        return res
+        return entry.value or None
 
     async def set(
         self,
@@ -63,21 +72,35 @@ class MemoryCache(ICache):
     ) -> bool:
         """
         Set a value in the cache.
-        """
-        sha_key = self._key_to_hash(key)
 
-        # Delete the last if full
-        if len(self._cache) >= self._config.max_size:
-            self._ttl.popitem()
-            self._cache.popitem()
-
-        # Set TTL as first element
-        self._ttl[sha_key] = datetime.now(UTC) + timedelta(seconds=ttl_sec)
-        self._ttl.move_to_end(sha_key, last=False)
-
-        # Add cache as first element
-        self._cache[sha_key] = value.encode() if isinstance(value, str) else value
-        self._cache.move_to_end(sha_key, last=False)
+        If the value is larger than the cache, it is not stored and `False` is returned.
+        """
+        data = value.encode() if isinstance(value, str) else value
+        now = time.monotonic()
+        entry = _Entry(
+            expires_at=now + ttl_sec,
+            size=len(key) + (len(data) if data else 0),
+            value=data,
+        )
+
+        # Replace the previous value, if any
+        self._remove(key)
+        if entry.size > self._config.max_bytes:
+            return False
+
+        # Add as most recently used
+        self._entries[key] = entry
+        self._size += entry.size
+        heapq.heappush(self._expiries, (entry.expires_at, key))
+
+        # Free space, first the expired items, then the least recently used
+        self._sweep(now)
+        while (
+            len(self._entries) > self._config.max_size
+            or self._size > self._config.max_bytes
+        ):
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= evicted.size
 
         return True
 
@@ -85,21 +108,65 @@ class MemoryCache(ICache):
         """
         Delete a value from the cache.
         """
-        sha_key = self._key_to_hash(key)
+        self._remove(key)
+        return True
+
+    async def get_many(self, keys: list[str]) -> list[bytes | None]:
+        """
+        Get many values from the cache.
+
+        If a key does not exist, its value is `None`.
+        """
+        return [await self.get(key) for key in keys]
 
-        # Delete keys
-        with suppress(KeyError):
-            self._ttl.pop(sha_key)
-        with suppress(KeyError):
-            self._cache.pop(sha_key)
+    async def set_many(
+        self,
+        items: dict[str, str | bytes | None],
+        ttl_sec: int,
+    ) -> bool:
+        """
+        Set many values in the cache.
+
+        Returns `False` if any value is larger than the cache.
+        """
+        res = True
+        for key, value in items.items():
+            res &= await self.set(key=key, ttl_sec=ttl_sec, value=value)
+        return res
 
+    async def delete_many(self, keys: list[str]) -> bool:
+        """
+        Delete many values from the cache.
+        """
+        for key in keys:
+            self._remove(key)
         return True
 
-    @staticmethod
-    def _key_to_hash(key: str) -> str:
+    def _remove(self, key: str) -> None:
+        """
+        Remove an entry, if it exists.
+
+        Its expiry is left in the heap, it will be skipped when swept.
+        """
+        entry = self._entries.pop(key, None)
+        if entry:
+            self._size -= entry.size
+
+    def _sweep(self, now: float) -> None:
         """
-        Transform the key into a hash.
+        Remove the expired entries, from the expiry heap.
 
-        SHA-256 lower the collision probability. Plus, it reduce the key size, which is useful for memory usage.
+        Heap is rebuilt when it holds mostly outdated items, to bound its memory usage.
         """
-        return hashlib.sha256(key.encode(), usedforsecurity=False).hexdigest()
+        while self._expiries and self._expiries[0][0] <= now:
+            expires_at, key = heapq.heappop(self._expiries)
+            entry = self._entries.get(key)
+            # Skip if the entry has been replaced or removed since
+            if entry and entry.expires_at == expires_at:
+                self._remove(key)
+
+        if len(self._expiries) > 2 * len(self._entries) + 64:
+            self._expiries = [
+                (entry.expires_at, key) for key, entry in self._entries.items()
+            ]
+            heapq.heapify(self._expiries)
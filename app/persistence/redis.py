@@ -16,6 +16,7 @@ from redis.exceptions import (
 from app.helpers.cache import lru_acache
 from app.helpers.config_models.cache import RedisModel
 from app.helpers.logging import logger
+from app.helpers.monitoring import suppress
 from app.models.readiness import ReadinessEnum
 from app.persistence.icache import ICache
 
@@ -38,17 +39,17 @@ class RedisCache(ICache):
         test_name = str(uuid4())
         test_value = "test"
         try:
-            async with self._use_client() as client:
-                # Test the item does not exist
-                assert await client.get(test_name) is None
-                # Create a new item
-                await client.set(test_name, test_value)
-                # Test the item is the same
-                assert (await client.get(test_name)).decode() == test_value
-                # Delete the item
-                await client.delete(test_name)
-                # Test the item does not exist
-                assert await client.get(test_name) is None
+            client = await self._use_client()
+            # Test the item does not exist
+            assert await client.get(test_name) is None
+            # Create a new item
+            await client.set(test_name, test_value)
+            # Test the item is the same
+            assert (await client.get(test_name)).decode() == test_value
+            # Delete the item
+            await client.delete(test_name)
+            # Test the item does not exist
+            assert await client.get(test_name) is None
             return ReadinessEnum.OK
         except AssertionError:
             logger.exception("Readiness test failed")
@@ -69,8 +70,8 @@ class RedisCache(ICache):
         sha_key = self._key_to_hash(key)
         res = None
         try:
-            async with self._use_client() as client:
-                res = await client.get(sha_key)
+            client = await self._use_client()
+            res = await client.get(sha_key)
         except RedisError:
             logger.exception("Error getting value")
         return res
@@ -90,12 +91,12 @@ class RedisCache(ICache):
         """
         sha_key = self._key_to_hash(key)
         try:
-            async with self._use_client() as client:
-                await client.set(
-                    ex=ttl_sec,
-                    name=sha_key,
-                    value=value if value else "",
-                )
+            client = await self._use_client()
+            await client.set(
+                ex=ttl_sec,
+                name=sha_key,
+                value=value if value else "",
+            )
         except RedisError:
             logger.exception("Error setting value")
             return False
@@ -109,13 +110,131 @@ class RedisCache(ICache):
         """
         sha_key = self._key_to_hash(key)
         try:
-            async with self._use_client() as client:
-                await client.delete(sha_key)
+            client = await self._use_client()
+            await client.delete(sha_key)
         except RedisError:
             logger.exception("Error deleting value")
             return False
         return True
 
+    async def get_many(self, keys: list[str]) -> list[bytes | None]:
+        """
+        Get many values from the cache, with a single MGET.
+
+        If a key does not exist or if the value is empty, its value is `None`.
+        """
+        if not keys:
+            return []
+        res = [None] * len(keys)
+        try:
+            client = await self._use_client()
+            res = await client.mget([self._key_to_hash(key) for key in keys])
+        except RedisError:
+            logger.exception("Error getting values")
+        return [value or None for value in res]
+
+    async def set_many(
+        self,
+        items: dict[str, str | bytes | None],
+        ttl_sec: int,
+    ) -> bool:
+        """
+        Set many values in the cache, with a single pipeline.
+
+        If a value is `None`, set an empty string.
+        """
+        if not items:
+            return True
+        try:
+            client = await self._use_client()
+            async with client.pipeline(transaction=False) as pipe:
+                for key, value in items.items():
+                    pipe.set(
+                        ex=ttl_sec,
+                        name=self._key_to_hash(key),
+                        value=value if value else "",
+                    )
+                await pipe.execute()
+        except RedisError:
+            logger.exception("Error setting values")
+            return False
+        return True
+
+    async def delete_many(self, keys: list[str]) -> bool:
+        """
+        Delete many values from the cache, with a single DEL.
+        """
+        if not keys:
+            return True
+        try:
+            client = await self._use_client()
+            await client.delete(*[self._key_to_hash(key) for key in keys])
+        except RedisError:
+            logger.exception("Error deleting values")
+            return False
+        return True
+
+    async def publish(self, channel: str, message: str) -> bool:
+        """
+        Publish a message to all the subscribers of a channel.
+        """
+        try:
+            client = await self._use_client()
+            await client.publish(channel, message)
+        except RedisError:
+            logger.exception("Error publishing message")
+            return False
+        return True
+
+    async def subscribe(self, channel: str) -> AsyncGenerator[bytes]:
+        """
+        Listen to the messages published to a channel.
+
+        The subscription holds a connection of the pool until the generator is closed. Errors are raised, messages published while disconnected are lost.
+        """
+        client = await self._use_client()
+        async with client.pubsub(ignore_subscribe_messages=True) as pubsub:
+            await pubsub.subscribe(channel)
+            while True:
+                # Poll with a timeout, as the socket timeout is too short to block on it
+                message = await pubsub.get_message(
+                    ignore_subscribe_messages=True,
+                    timeout=0.5,
+                )
+                if message:
+                    yield message["data"]
+
+    @asynccontextmanager
+    async def lock(self, key: str, ttl_sec: int) -> AsyncGenerator[None]:
+        """
+        Hold a lock on a key, for all the workers.
+
+        The lock expires after `ttl_sec`, and is awaited for the same duration. If it cannot be acquired, the block runs anyway. Disabled if `coalesce_misses` is false.
+        """
+        if not self._config.coalesce_misses:
+            yield
+            return
+
+        client = await self._use_client()
+        lock = client.lock(
+            blocking_timeout=ttl_sec,
+            name=self._key_to_hash(f"lock-{key}"),
+            sleep=0.05,  # 50 ms
+            timeout=ttl_sec,
+        )
+        acquired = False
+        try:
+            acquired = await lock.acquire()
+        except RedisError:
+            logger.exception("Error acquiring lock")
+        try:
+            yield
+        finally:
+            if acquired:
+                # Lock may have expired meanwhile
+                with suppress(RedisError):
+                    await lock.release()
+
     @lru_acache()
     async def _use_connection_pool(self) -> ConnectionPool:
         """
@@ -143,16 +262,17 @@ class RedisCache(ICache):
             else None,
         )
 
-    @asynccontextmanager
-    async def _use_client(self) -> AsyncGenerator[Redis]:
+    @lru_acache()
+    async def _use_client(self) -> Redis:
         """
-        Return a Redis connection.
+        Return the Redis client.
+
+        Client is shared, connections are borrowed from the pool for each command.
         """
-        async with Redis(
+        return Redis(
             auto_close_connection_pool=False,
             connection_pool=await self._use_connection_pool(),
-        ) as client:
-            yield client
+        )
 
     @staticmethod
     def _key_to_hash(key: str) -> bytes:
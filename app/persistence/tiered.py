@@ -0,0 +1,275 @@
+import asyncio
+import json
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
+from uuid import uuid4
+
+from redis.exceptions import RedisError
+
+from app.helpers.config_models.cache import TieredModel
+from app.helpers.logging import logger
+from app.helpers.monitoring import (
+    cache_l1_hit,
+    cache_l1_miss,
+    cache_l2_hit,
+    cache_l2_miss,
+    counter_add,
+)
+from app.models.readiness import ReadinessEnum
+from app.persistence.icache import ICache
+from app.persistence.redis import RedisCache
+
+# Redis channel notifying the writes, to drop stale values from the memory of other instances
+_INVALIDATION_CHANNEL = "cache-invalidation"
+
+
+class TieredCache(ICache):
+    """
+    A two-tier cache, in-process memory (L1) in front of Redis (L2).
+
+    Reads are served from memory when possible, then from Redis. Writes go to both, then are published on a Redis channel, so other workers and pods drop the key from their memory.
+
+    Memory values expire after `l1_ttl_sec` at most, which bounds the staleness if an invalidation is missed, for example during a reconnection.
+    """
+
+    _config: TieredModel
+    _id: str
+    _l1: ICache
+    _l2: RedisCache
+    _listener: asyncio.Task | None = None
+
+    def __init__(self, config: TieredModel, l1: ICache, l2: RedisCache):
+        logger.info("Using tiered cache, memory in front of Redis")
+        self._config = config
+        self._id = uuid4().hex
+        self._l1 = l1
+        self._l2 = l2
+
+    async def readiness(self) -> ReadinessEnum:
+        """
+        Check the readiness of both tiers.
+        """
+        for readiness in await asyncio.gather(
+            self._l1.readiness(),
+            self._l2.readiness(),
+        ):
+            if readiness != ReadinessEnum.OK:
+                return readiness
+        return ReadinessEnum.OK
+
+    async def get(self, key: str) -> bytes | None:
+        """
+        Get a value from the cache.
+
+        Memory is tried first, then Redis. A value found in Redis is kept in memory. If the key does not exist, return `None`.
+        """
+        self._listen()
+
+        # Try memory
+        res = await self._l1.get(key)
+        if res:
+            counter_add(
+                metric=cache_l1_hit,
+                value=1,
+            )
+            return res
+        counter_add(
+            metric=cache_l1_miss,
+            value=1,
+        )
+
+        # Try Redis
+        res = await self._l2.get(key)
+        if not res:
+            counter_add(
+                metric=cache_l2_miss,
+                value=1,
+            )
+            return None
+        counter_add(
+            metric=cache_l2_hit,
+            value=1,
+        )
+
+        # Keep in memory
+        await self._l1.set(
+            key=key,
+            ttl_sec=self._config.l1_ttl_sec,
+            value=res,
+        )
+        return res
+
+    async def set(
+        self,
+        key: str,
+        ttl_sec: int,
+        value: str | bytes | None,
+    ) -> bool:
+        """
+        Set a value in the cache.
+
+        Value is written to both tiers, then other instances are notified to drop it from their memory.
+        """
+        self._listen()
+
+        await self._l1.set(
+            key=key,
+            ttl_sec=min(ttl_sec, self._config.l1_ttl_sec),
+            value=value,
+        )
+        res = await self._l2.set(
+            key=key,
+            ttl_sec=ttl_sec,
+            value=value,
+        )
+        await self._invalidate(key)
+        return res
+
+    async def delete(self, key: str) -> bool:
+        """
+        Delete a value from the cache.
+
+        Value is deleted from both tiers, then other instances are notified to drop it from their memory.
+        """
+        self._listen()
+
+        await self._l1.delete(key)
+        res = await self._l2.delete(key)
+        await self._invalidate(key)
+        return res
+
+    async def get_many(self, keys: list[str]) -> list[bytes | None]:
+        """
+        Get many values from the cache.
+
+        Memory is tried first, then Redis for the misses, in a single round trip. Values found in Redis are kept in memory.
+        """
+        self._listen()
+
+        # Try memory
+        res = await self._l1.get_many(keys)
+        misses = [key for key, value in zip(keys, res) if not value]
+        counter_add(
+            metric=cache_l1_hit,
+            value=len(keys) - len(misses),
+        )
+        counter_add(
+            metric=cache_l1_miss,
+            value=len(misses),
+        )
+        if not misses:
+            return res
+
+        # Try Redis
+        found = {
+            key: value
+            for key, value in zip(misses, await self._l2.get_many(misses))
+            if value
+        }
+        counter_add(
+            metric=cache_l2_hit,
+            value=len(found),
+        )
+        counter_add(
+            metric=cache_l2_miss,
+            value=len(misses) - len(found),
+        )
+
+        # Keep in memory
+        if found:
+            await self._l1.set_many(
+                items=found,  # pyright: ignore[reportArgumentType]
+                ttl_sec=self._config.l1_ttl_sec,
+            )
+        return [value or found.get(key) for key, value in zip(keys, res)]
+
+    async def set_many(
+        self,
+        items: dict[str, str | bytes | None],
+        ttl_sec: int,
+    ) -> bool:
+        """
+        Set many values in the cache.
+
+        Values are written to both tiers, then other instances are notified once for the whole batch.
+        """
+        self._listen()
+
+        await self._l1.set_many(
+            items=items,
+            ttl_sec=min(ttl_sec, self._config.l1_ttl_sec),
+        )
+        res = await self._l2.set_many(
+            items=items,
+            ttl_sec=ttl_sec,
+        )
+        await self._invalidate(*items.keys())
+        return res
+
+    async def delete_many(self, keys: list[str]) -> bool:
+        """
+        Delete many values from the cache.
+
+        Values are deleted from both tiers, then other instances are notified once for the whole batch.
+        """
+        self._listen()
+
+        await self._l1.delete_many(keys)
+        res = await self._l2.delete_many(keys)
+        await self._invalidate(*keys)
+        return res
+
+    @asynccontextmanager
+    async def lock(self, key: str, ttl_sec: int) -> AsyncGenerator[None]:
+        """
+        Hold a lock on a key, for all the workers, in Redis.
+        """
+        async with self._l2.lock(key=key, ttl_sec=ttl_sec):
+            yield
+
+    async def _invalidate(self, *keys: str) -> None:
+        """
+        Notify the other instances keys have been written.
+
+        Message is a JSON array, with the instance ID and the keys.
+        """
+        if not keys:
+            return
+        await self._l2.publish(
+            channel=_INVALIDATION_CHANNEL,
+            message=json.dumps([self._id, keys]),
+        )
+
+    def _listen(self) -> None:
+        """
+        Start listening to the invalidations, if not already.
+
+        The listener is started lazily, as it requires a running event loop, and once per event loop.
+        """
+        if (
+            self._listener
+            and not self._listener.done()
+            and self._listener.get_loop() is asyncio.get_running_loop()
+        ):
+            return
+        self._listener = asyncio.create_task(self._on_invalidations())
+
+    async def _on_invalidations(self) -> None:
+        """
+        Drop the keys written by other instances from memory.
+
+        Subscription is restored after a Redis error. Invalidations published in between are lost, the memory TTL bounds the staleness.
+        """
+        while True:
+            try:
+                async for message in self._l2.subscribe(_INVALIDATION_CHANNEL):
+                    origin, keys = json.loads(message)
+                    # Skip own writes, memory is already up to date
+                    if origin == self._id:
+                        continue
+                    await self._l1.delete_many(keys)
+            except RedisError:
+                logger.warning(
+                    "Cache invalidations lost, subscribing again", exc_info=True
+                )
+            await asyncio.sleep(1)
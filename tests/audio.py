@@ -0,0 +1,750 @@
+import asyncio
+import json
+import time
+from base64 import b64decode, b64encode
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from aiojobs import Scheduler
+from pytest_assume.plugin import assume
+
+from app.helpers import call_llm, call_utils, media_codec, translation
+from app.helpers.aec import BatchRingAecEngine, new_engine
+from app.helpers.aec_executor import (
+    HubAecSession,
+    new_session,
+    shutdown as aec_shutdown,
+)
+from app.helpers.config import CONFIG
+from app.helpers.config_models.aec import EngineEnum, ExecutorEnum
+from app.helpers.logging import logger
+from app.helpers.media_codec import (
+    STOP_AUDIO_MESSAGE,
+    AudioFrameEncoder,
+    PacketCoalescer,
+    decode_audio_event,
+)
+from app.models.call import CallInitiateModel, CallStateModel
+from tests.conftest import (
+    CallAutomationClientMock,
+    SpeechSynthesizerMock,
+    SttClientMock,
+    pin_feature,
+)
+
+_CHUNK_SIZE = 320  # 20 ms at 16 kHz
+_SAMPLE_RATE = 16000
+_USER_AMPLITUDE = 0.2
+
+
+def _tone(frequency: int, amplitude: float, duration_sec: float) -> np.ndarray:
+    """
+    Generate a PCM 16-bit sine wave.
+    """
+    t = np.arange(int(_SAMPLE_RATE * duration_sec)) / _SAMPLE_RATE
+    return (amplitude * np.sin(2 * np.pi * frequency * t) * 32767).astype(np.int16)
+
+
+def _amplitude(signal: np.ndarray, frequency: int) -> float:
+    """
+    Get the amplitude of a frequency in a signal.
+    """
+    t = np.arange(len(signal)) / _SAMPLE_RATE
+    return float(
+        abs(np.dot(signal.astype(np.float64), np.exp(-2j * np.pi * frequency * t)))
+        / len(signal)
+    )
+
+
+@pytest.mark.parametrize(
+    "engine",
+    [
+        pytest.param(
+            EngineEnum.NOISEREDUCE,
+            id="noisereduce",
+        ),
+        pytest.param(
+            EngineEnum.RING,
+            id="ring",
+        ),
+    ],
+)
+def test_aec_passthrough(engine: EngineEnum) -> None:
+    """
+    Test the input is not modified when the bot is not speaking.
+
+    Steps:
+    1. Create an engine
+    2. Process a user voice without reference
+    3. Check output is the input, and speech is detected
+    """
+    aec = new_engine(
+        chunk_size=_CHUNK_SIZE,
+        engine=engine,
+        max_delay_samples=_SAMPLE_RATE // 5,
+        sample_rate=_SAMPLE_RATE,
+    )
+    user = _tone(frequency=1500, amplitude=_USER_AMPLITUDE, duration_sec=0.2)
+
+    for i in range(len(user) // _CHUNK_SIZE):
+        packet = user[i * _CHUNK_SIZE : (i + 1) * _CHUNK_SIZE].tobytes()
+        out, rms = aec.process(
+            input_pcm=packet,
+            reference_pcm=None,
+        )
+        assume(out == packet)
+        assume(rms > _USER_AMPLITUDE / 2)  # RMS of a sine is amplitude / sqrt(2)
+
+
+@pytest.mark.parametrize(
+    "engine",
+    [
+        pytest.param(
+            EngineEnum.NOISEREDUCE,
+            id="noisereduce",
+        ),
+        pytest.param(
+            EngineEnum.RING,
+            id="ring",
+        ),
+    ],
+)
+def test_aec_benchmark(engine: EngineEnum) -> None:
+    """
+    Benchmark echo cancellation, in frames per second on one core.
+
+    Steps:
+    1. Create an engine
+    2. Process a mix of user voice and bot echo, with the bot voice as reference
+    3. Report frames per second
+    4. Check output size, and echo is more attenuated than the user voice
+    """
+    aec = new_engine(
+        chunk_size=_CHUNK_SIZE,
+        engine=engine,
+        max_delay_samples=_SAMPLE_RATE // 5,
+        sample_rate=_SAMPLE_RATE,
+    )
+    bot = _tone(frequency=440, amplitude=0.3, duration_sec=4)
+    user = _tone(frequency=1500, amplitude=_USER_AMPLITUDE, duration_sec=4)
+    mix = (bot // 2 + user).astype(np.int16)
+
+    outs: list[np.ndarray] = []
+    frames = len(mix) // _CHUNK_SIZE
+    start = time.perf_counter()
+    for i in range(frames):
+        processed, _ = aec.process(
+            input_pcm=mix[i * _CHUNK_SIZE : (i + 1) * _CHUNK_SIZE].tobytes(),
+            reference_pcm=bot[i * _CHUNK_SIZE : (i + 1) * _CHUNK_SIZE].tobytes(),
+        )
+        outs.append(np.frombuffer(processed, dtype=np.int16))
+    duration = time.perf_counter() - start
+
+    # Check output size
+    assume(all(len(processed) == _CHUNK_SIZE for processed in outs))
+
+    # Skip the first second, the noise profile is not yet built
+    out = np.concatenate(outs)[_SAMPLE_RATE:]
+    mix = mix[_SAMPLE_RATE:]
+    echo_ratio = _amplitude(out, 440) / _amplitude(mix, 440)
+    user_ratio = _amplitude(out, 1500) / _amplitude(mix, 1500)
+    assume(echo_ratio < user_ratio)
+
+    logger.info(
+        "AEC %s: %.0f frames/sec, echo kept %.0f%%, user kept %.0f%%",
+        engine.value,
+        frames / duration,
+        echo_ratio * 100,
+        user_ratio * 100,
+    )
+
+
+@pytest.mark.parametrize(
+    "executor",
+    [
+        pytest.param(
+            ExecutorEnum.HUB,
+            id="hub",
+        ),
+        pytest.param(
+            ExecutorEnum.INLINE,
+            id="inline",
+        ),
+        pytest.param(
+            ExecutorEnum.PROCESS,
+            id="process",
+        ),
+    ],
+)
+@pytest.mark.asyncio(loop_scope="session")
+async def test_aec_executor(executor: ExecutorEnum) -> None:
+    """
+    Test executors return the same output as the engine, in order.
+
+    Steps:
+    1. Create a session with the executor, and an engine
+    2. Process the same batches, with and without reference
+    3. Check outputs are the same
+    """
+    CONFIG.aec.engine = EngineEnum.RING
+    CONFIG.aec.executor = executor
+    engine_kwargs = {
+        "chunk_size": _CHUNK_SIZE,
+        "max_delay_samples": _SAMPLE_RATE // 5,
+        "sample_rate": _SAMPLE_RATE,
+    }
+    session = await new_session(**engine_kwargs)
+    aec = new_engine(
+        engine=EngineEnum.RING,
+        **engine_kwargs,
+    )
+    bot = _tone(frequency=440, amplitude=0.3, duration_sec=1)
+    user = _tone(frequency=1500, amplitude=_USER_AMPLITUDE, duration_sec=1)
+    mix = (bot // 2 + user).astype(np.int16)
+
+    try:
+        batch_size = CONFIG.aec.batch_size
+        packet_count = len(mix) // _CHUNK_SIZE
+        for batch_start in range(0, packet_count, batch_size):
+            indexes = range(batch_start, min(batch_start + batch_size, packet_count))
+            frames = [
+                mix[i * _CHUNK_SIZE : (i + 1) * _CHUNK_SIZE].tobytes() for i in indexes
+            ]
+            # Skip reference every other batch, with a silent one every fourth batch
+            references = [
+                bot[i * _CHUNK_SIZE : (i + 1) * _CHUNK_SIZE].tobytes()
+                if batch_start % (2 * batch_size)
+                else None
+                if batch_start % (4 * batch_size)
+                else b"\x00" * _CHUNK_SIZE * 2
+                for i in indexes
+            ]
+            results = await session.process(
+                frames=frames,
+                references=references,
+            )
+            expected = [
+                aec.process(
+                    input_pcm=input_pcm,
+                    reference_pcm=reference_pcm,
+                )
+                for input_pcm, reference_pcm in zip(frames, references, strict=True)
+            ]
+            # Compare PCM exactly, RMS can be computed with a different precision
+            assume([pcm for pcm, _ in results] == [pcm for pcm, _ in expected])
+            assume(
+                [rms for _, rms in results]
+                == pytest.approx([rms for _, rms in expected], abs=1e-6)
+            )
+
+    finally:
+        await session.close()
+        await aec_shutdown()
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_aec_hub_shutdown() -> None:
+    """
+    Test the shutdown stops the hubs, even with calls in progress.
+
+    Steps:
+    1. Open a session in a hub, and submit a frame
+    2. Shut down the executors
+    3. Check the hub task is stopped and the frame is cancelled
+    """
+    CONFIG.aec.engine = EngineEnum.RING
+    CONFIG.aec.executor = ExecutorEnum.HUB
+    session = await new_session(
+        chunk_size=_CHUNK_SIZE,
+        max_delay_samples=_SAMPLE_RATE // 5,
+        sample_rate=_SAMPLE_RATE,
+    )
+    assert isinstance(session, HubAecSession)
+    hub = session._hub
+    frame = hub.submit(
+        input_pcm=b"\x00" * _CHUNK_SIZE * 2,
+        reference_pcm=None,
+        slot=session._slot,
+    )
+
+    await aec_shutdown()
+    assume(hub._task is not None and hub._task.done())
+    assume(frame.cancelled())
+    await session.close()  # No-op, already closed by the shutdown
+
+
+@pytest.mark.parametrize(
+    "calls",
+    [
+        pytest.param(
+            10,
+            id="10",
+        ),
+        pytest.param(
+            200,
+            id="200",
+        ),
+    ],
+)
+def test_aec_hub_benchmark(calls: int) -> None:
+    """
+    Benchmark the hub against per-stream processing, in calls per core.
+
+    Steps:
+    1. Create one engine per call, and a batch engine with one slot per call
+    2. Process the same packets of all calls, per stream and batched
+    3. Report calls per core, for both
+    4. Check outputs are the same
+    """
+    ticks = 50  # 1 sec
+    max_delay_samples = _SAMPLE_RATE // 5
+    streams = [
+        new_engine(
+            chunk_size=_CHUNK_SIZE,
+            engine=EngineEnum.RING,
+            max_delay_samples=max_delay_samples,
+            sample_rate=_SAMPLE_RATE,
+        )
+        for _ in range(calls)
+    ]
+    hub = BatchRingAecEngine(
+        chunk_size=_CHUNK_SIZE,
+        max_delay_samples=max_delay_samples,
+    )
+    slots = np.array([hub.open_slot() for _ in range(calls)])
+
+    # Random voices, a third of calls without bot voice
+    rng = np.random.default_rng(seed=0)
+    inputs = (rng.normal(0, 0.1, (ticks, calls, _CHUNK_SIZE)) * 32767).astype(np.int16)
+    references = (rng.normal(0, 0.1, (ticks, calls, _CHUNK_SIZE)) * 32767).astype(
+        np.int16
+    )
+    has_reference = rng.random((ticks, calls)) > 1 / 3
+
+    # Per-stream
+    stream_outputs = []
+    start = time.perf_counter()
+    for tick in range(ticks):
+        for call in range(calls):
+            output, _ = streams[call].process(
+                input_pcm=inputs[tick, call].tobytes(),
+                reference_pcm=references[tick, call].tobytes()
+                if has_reference[tick, call]
+                else None,
+            )
+            stream_outputs.append(output)
+    stream_duration = time.perf_counter() - start
+
+    # Hub
+    hub_outputs = []
+    start = time.perf_counter()
+    for tick in range(ticks):
+        outputs, _ = hub.process(
+            has_reference=has_reference[tick],
+            inputs=inputs[tick],
+            references=references[tick],
+            slots=slots,
+        )
+        hub_outputs.extend(output.tobytes() for output in outputs)
+    hub_duration = time.perf_counter() - start
+
+    # Audio duration is one second, so calls per core is the number of calls divided by the CPU time
+    logger.info(
+        "AEC with %i calls: %.0f calls/core per stream, %.0f calls/core with hub",
+        calls,
+        calls / stream_duration,
+        calls / hub_duration,
+    )
+    assume(stream_outputs == hub_outputs)
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_stt_client_isolation() -> None:
+    """
+    Test speech-to-text clients don't share their recognition buffer.
+
+    Steps:
+    1. Create two clients
+    2. Send a partial recognition to the first, a complete recognition to the second
+    3. Check each buffer only contains its own text, and only the second is completed
+    """
+    async with Scheduler() as scheduler:
+        call = CallStateModel(
+            initiate=CallInitiateModel(
+                **CONFIG.conversation.initiate.model_dump(),
+                phone_number="+33612345678",  # pyright: ignore
+            ),
+        )
+        first = call_utils.SttClient(
+            call=call,
+            sample_rate=_SAMPLE_RATE,
+            scheduler=scheduler,
+        )
+        second = call_utils.SttClient(
+            call=call,
+            sample_rate=_SAMPLE_RATE,
+            scheduler=scheduler,
+        )
+
+        first._partial_callback(SimpleNamespace(result=SimpleNamespace(text="first")))
+        second._complete_callback(
+            SimpleNamespace(result=SimpleNamespace(text="second"))
+        )
+
+        assume(first._stt_buffer == ["first"])
+        assume(second._stt_buffer == ["second", ""])
+        assume(not first._stt_complete_gate.is_set())
+        assume(second._stt_complete_gate.is_set())
+
+
+def _mock_speech_services(
+    monkeypatch: pytest.MonkeyPatch,
+) -> dict[int, SttClientMock]:
+    """
+    Mock the speech and translation services of the chat loop.
+
+    Returns the STT clients, by the call index set in the bot name.
+    """
+    stt_clients: dict[int, SttClientMock] = {}
+
+    def _stt_client(call: CallStateModel, **kwargs) -> SttClientMock:
+        client = SttClientMock(**kwargs)
+        stt_clients[int(call.initiate.bot_name)] = client
+        return client
+
+    @asynccontextmanager
+    async def _tts_client(**kwargs):  # noqa: ARG001
+        yield SpeechSynthesizerMock(play_media_callback=lambda _: None)
+
+    async def _realtime_tts(
+        text: str,
+        tts_client: SpeechSynthesizerMock,
+        **kwargs,  # noqa: ARG001
+    ) -> None:
+        tts_client.speak_ssml_async(text)
+
+    async def _translate_text(text: str, *args, **kwargs) -> str:  # noqa: ARG001
+        return text
+
+    async def _translate_texts(texts: list[str], *args, **kwargs) -> list[str]:  # noqa: ARG001
+        return texts
+
+    monkeypatch.setattr(call_llm, "SttClient", _stt_client)
+    monkeypatch.setattr(call_llm, "handle_realtime_tts", _realtime_tts)
+    monkeypatch.setattr(call_llm, "use_tts_client", _tts_client)
+    monkeypatch.setattr(translation, "translate_text", _translate_text)
+    monkeypatch.setattr(translation, "translate_texts", _translate_texts)
+
+    # Pin VAD features to their defaults, to not depend on App Configuration
+    monkeypatch.setattr(call_utils, "vad_threshold", pin_feature(0.5))
+    monkeypatch.setattr(call_llm, "phone_silence_timeout_sec", pin_feature(20))
+    monkeypatch.setattr(call_llm, "vad_cutoff_timeout_ms", pin_feature(250))
+    monkeypatch.setattr(call_llm, "vad_silence_timeout_ms", pin_feature(500))
+
+    return stt_clients
+
+
+@pytest.mark.parametrize(
+    "calls",
+    [
+        pytest.param(
+            10,
+            id="10",
+        ),
+        pytest.param(
+            100,
+            id="100",
+        ),
+        pytest.param(
+            500,
+            id="500",
+        ),
+    ],
+)
+@pytest.mark.asyncio(loop_scope="session")
+async def test_call_isolation_load(
+    calls: int,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """
+    Test concurrent calls don't share audio, and report the frame latency.
+
+    Speech services are mocked. Input frames are tagged with the call and frame index. Without bot voice, echo cancellation returns input frames as-is.
+
+    Steps:
+    1. Start calls with the chat loop
+    2. Send tagged frames to each call, in real-time
+    3. Check each call received its own frames, in order
+    4. Report frame latency
+    """
+    frames_count = 25  # 500 ms
+    CONFIG.aec.engine = EngineEnum.RING
+    CONFIG.aec.executor = ExecutorEnum.INLINE
+
+    # Mock speech services
+    stt_clients = _mock_speech_services(monkeypatch)
+
+    async def _callback(_: CallStateModel) -> None:
+        pass
+
+    async with Scheduler() as scheduler:
+        # Start calls, bot name is used to identify the call
+        audio_ins: list[asyncio.Queue[bytes]] = []
+        tasks: list[asyncio.Task] = []
+        for i in range(calls):
+            audio_in: asyncio.Queue[bytes] = asyncio.Queue()
+            audio_ins.append(audio_in)
+            initiate = CONFIG.conversation.initiate.model_dump()
+            initiate["bot_name"] = str(i)
+            tasks.append(
+                asyncio.create_task(
+                    call_llm.load_llm_chat(
+                        audio_in=audio_in,
+                        audio_out=asyncio.Queue(),
+                        audio_sample_rate=_SAMPLE_RATE,
+                        automation_client=CallAutomationClientMock(
+                            hang_up_callback=lambda: None,
+                            play_media_callback=lambda _: None,
+                            transfer_callback=lambda: None,
+                        ),
+                        call=CallStateModel(
+                            initiate=CallInitiateModel(
+                                **initiate,
+                                phone_number="+33612345678",  # pyright: ignore
+                            ),
+                        ),
+                        post_callback=_callback,
+                        scheduler=scheduler,
+                        training_callback=_callback,
+                    )
+                )
+            )
+
+        # Send frames in real-time, first samples are the call and frame index, starting at 1 to not be confused with empty packets
+        sent_at = np.zeros((calls, frames_count))
+        for frame in range(frames_count):
+            for i, audio_in in enumerate(audio_ins):
+                packet = np.zeros(_CHUNK_SIZE, dtype=np.int16)
+                packet[:2] = (i + 1, frame + 1)
+                sent_at[i, frame] = time.monotonic()
+                audio_in.put_nowait(packet.tobytes())
+            await asyncio.sleep(_CHUNK_SIZE / _SAMPLE_RATE)
+
+        # Wait for all frames
+        def _tagged(client: SttClientMock) -> list[tuple[float, np.ndarray]]:
+            return [
+                (received_at, np.frombuffer(packet, dtype=np.int16)[:2])
+                for received_at, packet in client.frames
+                if any(packet)  # Skip empty packets, dropped by echo cancellation
+            ]
+
+        for _ in range(100):  # Up to 10 secs
+            if len(stt_clients) == calls and all(
+                len(_tagged(client)) >= frames_count for client in stt_clients.values()
+            ):
+                break
+            await asyncio.sleep(0.1)
+
+        # Stop calls
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    # Check isolation and order
+    latencies: list[float] = []
+    for i in range(calls):
+        tagged = _tagged(stt_clients[i])
+        assume([int(tag[0]) for _, tag in tagged] == [i + 1] * frames_count)
+        assume([int(tag[1]) for _, tag in tagged] == list(range(1, frames_count + 1)))
+        latencies.extend(
+            received_at - sent_at[i, int(tag[1]) - 1]
+            for received_at, tag in tagged
+            if tag[0] == i + 1
+        )
+
+    # Report latency, empty frames are sent to STT when no input is available
+    empty = sum(len(client.frames) for client in stt_clients.values()) - len(latencies)
+    logger.info(
+        "%i calls: frame latency p50 %.1f ms, p99 %.1f ms, max %.1f ms, %i empty frames",
+        calls,
+        np.percentile(latencies, 50) * 1000,
+        np.percentile(latencies, 99) * 1000,
+        max(latencies) * 1000,
+        empty,
+    )
+
+
+def _inbound_event(pcm: bytes, silent: bool = False) -> str:
+    """
+    Build an inbound audio event, as sent by Communication Services.
+    """
+    return json.dumps(
+        {
+            "kind": "AudioData",
+            "audioData": {
+                "data": b64encode(pcm).decode("utf-8"),
+                "participantRawID": "8:acs:00000000-0000-0000-0000-000000000000",
+                "silent": silent,
+                "timestamp": "2024-01-01T00:00:00.000Z",
+            },
+        }
+    )
+
+
+def test_media_codec() -> None:
+    """
+    Test media streaming events are decoded and encoded like the JSON serialization.
+
+    Steps:
+    1. Decode audio, silent and other events
+    2. Encode packets of the expected size and others
+    3. Coalesce chunks of any size in packets
+    """
+    packet_size = _CHUNK_SIZE * 2
+    pcm = _tone(frequency=440, amplitude=0.3, duration_sec=0.2).tobytes()
+
+    # Decode
+    assume(decode_audio_event(_inbound_event(pcm)) == pcm)
+    assume(decode_audio_event(_inbound_event(pcm, silent=True)) is None)
+    assume(decode_audio_event('{"kind":"AudioMetadata"}') is None)
+    assume(decode_audio_event("not json") is None)
+
+    # Encode, compare with Starlette JSON serialization
+    encoder = AudioFrameEncoder(packet_size)
+    for packet in (pcm[:packet_size], pcm[packet_size : 2 * packet_size], pcm[:10]):
+        expected = json.dumps(
+            {
+                "kind": "AudioData",
+                "audioData": {
+                    "data": b64encode(packet).decode("utf-8"),
+                },
+            },
+            separators=(",", ":"),
+        )
+        assume(encoder.encode(packet) == expected)
+    assume(
+        STOP_AUDIO_MESSAGE
+        == json.dumps({"kind": "StopAudio", "stopAudio": {}}, separators=(",", ":"))
+    )
+
+    # Packet size, from the audio format
+    assume(media_codec.packet_size(_SAMPLE_RATE) == packet_size)
+
+    # Coalesce
+    coalescer = PacketCoalescer(packet_size)
+    packets: list[bytes] = []
+    cursor = 0
+    for size in (100, 1000, 540, 2000, 7):
+        packets.extend(coalescer.push(pcm[cursor : cursor + size]))
+        cursor += size
+    last_packet = coalescer.flush()
+    assume(all(len(packet) == packet_size for packet in packets))
+    assume(last_packet is not None and len(last_packet) == packet_size)
+    assume(
+        b"".join(packets) + (last_packet or b"")
+        == pcm[:cursor].ljust((len(packets) + 1) * packet_size, b"\x00")
+    )
+    assume(coalescer.flush() is None)
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_aec_stream_padding() -> None:
+    """
+    Test the bot speech is padded only at its end, not when its chunks are late.
+
+    Steps:
+    1. Push a chunk of the speech, not a multiple of the packet size
+    2. Check only the complete packets are sent, while waiting for the next chunk
+    3. Mark the end of the speech
+    4. Check the last packet is padded with silence
+    """
+    CONFIG.aec.executor = ExecutorEnum.INLINE
+    packet_size = _CHUNK_SIZE * 2
+    speech = _tone(frequency=440, amplitude=0.3, duration_sec=0.05).tobytes()
+    reference: asyncio.Queue[bytes] = asyncio.Queue()
+    out: asyncio.Queue[bytes] = asyncio.Queue()
+
+    async with (
+        Scheduler() as scheduler,
+        call_utils.AECStream(
+            in_raw_queue=asyncio.Queue(),
+            in_reference_queue=reference,
+            out_queue=out,
+            sample_rate=_SAMPLE_RATE,
+            scheduler=scheduler,
+        ),
+    ):
+        # Chunk of the speech, late next one
+        await reference.put(speech)
+        await asyncio.sleep(0.1)
+        packets = [out.get_nowait() for _ in range(out.qsize())]
+        assume(packets == [speech[:packet_size], speech[packet_size : 2 * packet_size]])
+
+        # End of the speech
+        await reference.put(b"")
+        await asyncio.sleep(0.1)
+        packets = [out.get_nowait() for _ in range(out.qsize())]
+        assume(packets == [speech[2 * packet_size :].ljust(packet_size, b"\x00")])
+
+    await aec_shutdown()
+
+
+def test_media_codec_benchmark() -> None:
+    """
+    Benchmark the media codec against the JSON serialization, in frames per second on one core.
+
+    Steps:
+    1. Decode inbound events and encode outbound packets, with the JSON serialization
+    2. Same, with the media codec
+    3. Report frames per second, for both
+    4. Check outputs are the same
+    """
+    frames = 5000
+    packet_size = _CHUNK_SIZE * 2
+    rng = np.random.default_rng(seed=0)
+    packets = [
+        (rng.normal(0, 0.1, _CHUNK_SIZE) * 32767).astype(np.int16).tobytes()
+        for _ in range(frames)
+    ]
+    events = [_inbound_event(packet) for packet in packets]
+
+    # JSON serialization, as in the former WebSocket handler
+    json_in: list[bytes] = []
+    json_out: list[str] = []
+    start = time.perf_counter()
+    for event, packet in zip(events, packets, strict=True):
+        audio_data = json.loads(event)["audioData"]
+        json_in.append(b64decode(audio_data["data"]))
+        json_out.append(
+            json.dumps(
+                {
+                    "kind": "AudioData",
+                    "audioData": {
+                        "data": b64encode(packet).decode("utf-8"),
+                    },
+                },
+                separators=(",", ":"),
+                ensure_ascii=False,
+            )
+        )
+    json_duration = time.perf_counter() - start
+
+    # Media codec
+    encoder = AudioFrameEncoder(packet_size)
+    codec_in: list[bytes | None] = []
+    codec_out: list[str] = []
+    start = time.perf_counter()
+    for event, packet in zip(events, packets, strict=True):
+        codec_in.append(decode_audio_event(event))
+        codec_out.append(encoder.encode(packet))
+    codec_duration = time.perf_counter() - start
+
+    logger.info(
+        "Media codec: %.0f frames/sec with JSON, %.0f frames/sec with codec",
+        frames / json_duration,
+        frames / codec_duration,
+    )
+    assume(json_in == codec_in)
+    assume(json_out == codec_out)
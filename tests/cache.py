@@ -1,8 +1,20 @@
+import asyncio
+import time
+import tracemalloc
+
 import pytest
 from pytest_assume.plugin import assume
 
+from app.helpers.cache import lru_acache, single_flight
 from app.helpers.config import CONFIG
-from app.helpers.config_models.cache import ModeEnum as CacheModeEnum
+from app.helpers.config_models.cache import (
+    MemoryModel,
+    ModeEnum as CacheModeEnum,
+    TieredModel,
+)
+from app.helpers.logging import logger
+from app.persistence.memory import MemoryCache
+from app.persistence.tiered import TieredCache
 
 
 @pytest.mark.parametrize(
@@ -55,3 +67,247 @@ async def test_acid(
 
     # Check point read
     assume(await cache.get(test_key) == test_value.encode())
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_tiered_invalidation(random_text: str) -> None:
+    """
+    Test a write on one instance drops the value from the memory of the others.
+
+    Redis is mocked, with an in-process channel.
+
+    Steps:
+    1. Read a value from two instances, to keep it in memory
+    2. Update it from the first instance
+    3. Check the second instance reads the new value, from Redis
+    4. Check the second instance then reads it from memory
+    5. Update many values from the first instance, in a batch
+    6. Check the second instance reads the misses from Redis, in a single round trip
+    """
+    store: dict[str, bytes] = {}
+    subscribers: list[asyncio.Queue[bytes]] = []
+    reads: list[str] = []
+
+    class _RedisMock:
+        async def get(self, key: str) -> bytes | None:
+            reads.append(key)
+            return store.get(key)
+
+        async def set(self, key: str, ttl_sec: int, value: str) -> bool:  # noqa: ARG002
+            store[key] = value.encode()
+            return True
+
+        async def delete(self, key: str) -> bool:
+            store.pop(key, None)
+            return True
+
+        async def get_many(self, keys: list[str]) -> list[bytes | None]:
+            reads.append(",".join(keys))
+            return [store.get(key) for key in keys]
+
+        async def set_many(
+            self,
+            items: dict[str, str],
+            ttl_sec: int,  # noqa: ARG002
+        ) -> bool:
+            store.update({key: value.encode() for key, value in items.items()})
+            return True
+
+        async def delete_many(self, keys: list[str]) -> bool:
+            for key in keys:
+                store.pop(key, None)
+            return True
+
+        async def publish(self, channel: str, message: str) -> bool:  # noqa: ARG002
+            for queue in subscribers:
+                queue.put_nowait(message.encode())
+            return True
+
+        async def subscribe(self, channel: str):  # noqa: ARG002
+            queue = asyncio.Queue()
+            subscribers.append(queue)
+            while True:
+                yield await queue.get()
+
+    l2 = _RedisMock()
+    workers_count = 2
+    workers = [
+        TieredCache(
+            config=TieredModel(),
+            l1=MemoryCache(MemoryModel()),
+            l2=l2,  # pyright: ignore
+        )
+        for _ in range(workers_count)
+    ]
+    first, second = workers
+
+    # Keep the value in memory of both instances
+    await l2.set(key=random_text, ttl_sec=60, value="v1")
+    for worker in workers:
+        assume(await worker.get(random_text) == b"v1")
+    await asyncio.sleep(0)  # Let the listeners subscribe
+    assume(len(subscribers) == workers_count)
+
+    # Update from the first instance
+    await first.set(key=random_text, ttl_sec=60, value="v2")
+    await asyncio.sleep(0.1)  # Let the listeners drop the value
+
+    # Read from Redis, then from memory
+    reads.clear()
+    assume(await second.get(random_text) == b"v2")
+    assume(await second.get(random_text) == b"v2")
+    assume(await first.get(random_text) == b"v2")
+    assume(reads == [random_text])
+
+    # Update many values from the first instance
+    keys = [f"{random_text}-{i}" for i in range(3)]
+    await first.set_many(
+        items={key: f"batch {key}" for key in keys},
+        ttl_sec=60,
+    )
+    await asyncio.sleep(0.1)  # Let the listeners drop the values
+
+    # Read the batch, misses from Redis in one round trip, then from memory
+    reads.clear()
+    expected = [b"v2", *[f"batch {key}".encode() for key in keys]]
+    assume(await second.get_many([random_text, *keys]) == expected)
+    assume(await second.get_many([random_text, *keys]) == expected)
+    assume(reads == [",".join(keys)])
+
+    # Stop the listeners
+    for worker in workers:
+        assert worker._listener
+        worker._listener.cancel()
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_memory_eviction() -> None:
+    """
+    Test the memory cache evicts the least recently used and the expired items.
+
+    Steps:
+    1. Fill the cache by number of items, read the first item
+    2. Check the second item is evicted, not the first one
+    3. Fill the cache by size, check the least recently used items are evicted
+    4. Check an expired item is not returned, and a too large item is refused
+    """
+    # Evict by number of items
+    cache = MemoryCache(MemoryModel(max_size=10))
+    for i in range(10):
+        await cache.set(key=str(i), ttl_sec=60, value=f"value {i}")
+    assume(await cache.get("0") == b"value 0")
+    await cache.set(key="10", ttl_sec=60, value="value 10")
+    assume(await cache.get("0") == b"value 0")
+    assume(await cache.get("1") is None)
+    assume(await cache.get("10") == b"value 10")
+
+    # Evict by size, 1 byte key and 511 bytes value
+    cache = MemoryCache(MemoryModel(max_bytes=1024))
+    for key in "abc":
+        await cache.set(key=key, ttl_sec=60, value="x" * 511)
+    assume(await cache.get("a") is None)
+    assume(await cache.get("b") is not None)
+    assume(await cache.get("c") is not None)
+
+    # Expired and too large items
+    await cache.set(key="d", ttl_sec=0, value="expired")
+    assume(await cache.get("d") is None)
+    assume(not await cache.set(key="e", ttl_sec=60, value="x" * 1024))
+    assume(await cache.get("e") is None)
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_memory_benchmark() -> None:
+    """
+    Benchmark the memory cache throughput and memory usage.
+
+    Steps:
+    1. Fill the cache, measure the memory per entry
+    2. Read all items, measure the throughput
+    3. Overflow the cache, measure the throughput with evictions
+    """
+    count = 10000
+    cache = MemoryCache(MemoryModel(max_size=count))
+    keys = [f"translate_text-Some text {i}-fr-FR-en-US" for i in range(count)]
+
+    # Fill
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    for key in keys:
+        await cache.set(key=key, ttl_sec=60, value="lorem ipsum dolor sit amet")
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    memory_per_entry = (after - before) / count
+
+    # Read
+    start = time.perf_counter()
+    hits = [await cache.get(key) for key in keys]
+    get_rate = count / (time.perf_counter() - start)
+    assume(all(hits))
+
+    # Overflow
+    start = time.perf_counter()
+    for i in range(count):
+        await cache.set(key=f"overflow {i}", ttl_sec=60, value="lorem ipsum")
+    set_rate = count / (time.perf_counter() - start)
+    assume(not await cache.get(keys[-1]))
+
+    logger.info(
+        "Memory cache: %.0f gets/s, %.0f sets/s with evictions, %.0f bytes per entry",
+        get_rate,
+        set_rate,
+        memory_per_entry,
+    )
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_single_flight(random_text: str) -> None:
+    """
+    Test concurrent calls with the same key run once.
+
+    Steps:
+    1. Run many concurrent calls, cancel one of them
+    2. Check the function ran once, and the others got its result
+    3. Run many concurrent calls failing, check all got the error
+    4. Run many concurrent first calls of a cached function, check it ran once
+    """
+    runs: list[str] = []
+
+    async def _load() -> str:
+        runs.append(random_text)
+        await asyncio.sleep(0.1)
+        return random_text
+
+    # Concurrent calls, one cancelled
+    calls = [
+        asyncio.create_task(single_flight(key=random_text, func=_load))
+        for _ in range(10)
+    ]
+    await asyncio.sleep(0)
+    calls[0].cancel()
+    results = await asyncio.gather(*calls[1:])
+    assume(runs == [random_text])
+    assume(results == [random_text] * 9)
+
+    # Concurrent failures
+    async def _fail() -> None:
+        await asyncio.sleep(0.1)
+        raise ValueError(random_text)
+
+    errors = await asyncio.gather(
+        *[single_flight(key=random_text, func=_fail) for _ in range(10)],
+        return_exceptions=True,
+    )
+    assume(all(isinstance(error, ValueError) for error in errors))
+
+    # Cached function
+    @lru_acache()
+    async def _client() -> object:
+        runs.append(random_text)
+        await asyncio.sleep(0.1)
+        return object()
+
+    runs.clear()
+    clients = await asyncio.gather(*[_client() for _ in range(10)])
+    assume(runs == [random_text])
+    assume(all(client is clients[0] for client in clients))
@@ -1,6 +1,7 @@
 import hashlib
 import random
 import string
+import time
 import xml.etree.ElementTree as ET
 from collections.abc import Callable
 from textwrap import dedent
@@ -182,6 +183,36 @@ class SpeechSynthesizerMock(SpeechSynthesizer):
         )
 
 
+class SttClientMock:
+    """
+    Speech-to-text client, storing the pushed audio with its arrival time.
+    """
+
+    frames: list[tuple[float, bytes]]
+    recognition: str
+
+    def __init__(
+        self,
+        *args,  # noqa: ARG002
+        recognition: str = "",
+        **kwargs,  # noqa: ARG002
+    ) -> None:
+        self.frames = []
+        self.recognition = recognition
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args, **kwargs):
+        pass
+
+    def push_audio(self, audio_data: bytes) -> None:
+        self.frames.append((time.monotonic(), audio_data))
+
+    async def pull_recognition(self) -> str:
+        return self.recognition
+
+
 class DeepEvalAzureOpenAI(GPTModel):
     _cache: pytest.Cache
     _langchain_kwargs: dict[str, Any]
@@ -265,6 +296,17 @@ class DeepEvalAzureOpenAI(GPTModel):
         return f"call-center-ai/{llm_hash}"
 
 
+def pin_feature(value: float | int):
+    """
+    Build a feature getter returning a fixed value, to not depend on App Configuration.
+    """
+
+    def _get() -> float | int:
+        return value
+
+    return _get
+
+
 class Conversation(BaseModel):
     claim_tests_excl: list[str] = []
     expected_output: str
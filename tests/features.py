@@ -0,0 +1,118 @@
+import time
+
+import pytest
+from pytest_assume.plugin import assume
+
+from app.helpers import features
+from app.helpers.logging import logger
+
+
+class _SettingMock:
+    def __init__(self, key: str, value: str, etag: str, label: str | None = None):
+        self.etag = etag
+        self.key = key
+        self.label = label
+        self.value = value
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_snapshot(monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Test the features are loaded in a single request, and read from memory.
+
+    App Configuration client is mocked.
+
+    Steps:
+    1. Load the features, with invalid, out of bounds, unknown and labeled settings
+    2. Check the values are parsed, clamped, or defaulted, and labeled ones are ignored
+    3. Load again without change, check the snapshot is kept
+    4. Benchmark the read of a feature
+    """
+    answer_hard_timeout_sec = 30
+    defaults = features._Snapshot()
+    max_read_sec = 1e-6
+    requests = 0
+    settings = [
+        _SettingMock(
+            key="answer_hard_timeout_sec",
+            value=str(answer_hard_timeout_sec),
+            etag="1",
+        ),
+        _SettingMock(key="recording_enabled", value="true", etag="1"),
+        _SettingMock(key="recognition_retry_max", value="0", etag="1"),
+        _SettingMock(key="vad_threshold", value="abc", etag="1"),
+        _SettingMock(key="unknown", value="1", etag="1"),
+        _SettingMock(
+            key="answer_hard_timeout_sec",
+            value=str(answer_hard_timeout_sec * 2),
+            etag="1",
+            label="dev",
+        ),
+    ]
+
+    class _ClientMock:
+        async def list_configuration_settings(self, label_filter: str):
+            nonlocal requests
+            requests += 1
+            for setting in settings:
+                # No label is filtered with the null character
+                if (setting.label or "\0") == label_filter:
+                    yield setting
+
+    async def _use_client():
+        return _ClientMock()
+
+    monkeypatch.setattr(features, "_use_client", _use_client)
+    monkeypatch.setattr(features, "_snapshot", features._Snapshot())
+    monkeypatch.setattr(features, "_etags", frozenset())
+
+    # Load
+    await features.load()
+    assume(requests == 1)
+    assume(features.answer_hard_timeout_sec() == answer_hard_timeout_sec)  # Parsed
+    assume(features.recording_enabled() is True)  # Parsed
+    assume(features.recognition_retry_max() == 1)  # Clamped
+    assume(features.vad_threshold() == defaults.vad_threshold)  # Defaulted
+    assume(
+        features.callback_timeout_hour() == defaults.callback_timeout_hour
+    )  # Defaulted
+
+    # Load without change
+    snapshot = features._snapshot
+    requests = 0
+    await features.load()
+    assume(requests == 1)
+    assume(features._snapshot is snapshot)
+
+    # Benchmark the read
+    reads = 100_000
+    start = time.perf_counter()
+    for _ in range(reads):
+        features.vad_threshold()
+    duration = (time.perf_counter() - start) / reads
+    assume(duration < max_read_sec)
+
+    logger.info("Feature read: %.0f ns", duration * 1e9)
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_load_error(monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Test an unexpected error while loading the features keeps the previous ones.
+
+    App Configuration client is mocked.
+
+    Steps:
+    1. Load the features, the client raises an unexpected error
+    2. Check the error is not raised and the snapshot is kept
+    """
+    snapshot = features._Snapshot()
+
+    async def _use_client():
+        raise ValueError("Unexpected")
+
+    monkeypatch.setattr(features, "_use_client", _use_client)
+    monkeypatch.setattr(features, "_snapshot", snapshot)
+
+    await features.load()
+    assume(features._snapshot is snapshot)
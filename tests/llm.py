@@ -1,10 +1,20 @@
 import asyncio
 import json
 import re
-from datetime import datetime
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager, suppress
+from datetime import UTC, datetime, timedelta
+from uuid import uuid4
 
 import pytest
 from aiojobs import Scheduler
+from azure.ai.inference.models import (
+    ChatCompletionsToolDefinition,
+    FunctionDefinition,
+    SystemMessage,
+)
+from azure.core.exceptions import HttpResponseError, ServiceResponseError
 from deepeval import assert_test
 from deepeval.metrics import (
     AnswerRelevancyMetric,
@@ -18,6 +28,7 @@ from deepeval.test_case import LLMTestCase
 from pydantic import TypeAdapter
 from pytest_assume.plugin import assume
 
+from app.helpers import call_llm, llm_worker, translation
 from app.helpers.call_events import (
     on_automation_play_completed,
     on_call_connected,
@@ -26,16 +37,40 @@ from app.helpers.call_events import (
     on_ivr_recognized,
     on_play_started,
 )
-from app.helpers.call_llm import _continue_chat
+from app.helpers.call_llm import _continue_chat, _SpeculativeAnswer
+from app.helpers.call_utils import recognition_distance
 from app.helpers.config import CONFIG
+from app.helpers.config_models import prompts
+from app.helpers.config_models.llm import (
+    CircuitBreakerModel,
+    DeploymentModel as LlmDeploymentModel,
+    HedgingModel,
+)
+from app.helpers.llm_tools import DefaultPlugin
+from app.helpers.llm_worker import (
+    RateLimitError,
+    _completion_stream_hedged,
+    _DeploymentBudget,
+    _dump_sdk_model,
+    _hedging_delay,
+    _LatencyTracker,
+    _limit_messages,
+    _select_deployment,
+    _use_budget,
+)
 from app.helpers.logging import logger
-from app.models.call import CallStateModel
-from app.models.message import MessageModel, PersonaEnum as MessagePersonaEnum
+from app.models.call import CallInitiateModel, CallStateModel
+from app.models.message import (
+    MessageModel,
+    PersonaEnum as MessagePersonaEnum,
+    translate_messages,
+)
 from app.models.reminder import ReminderModel
 from app.models.training import TrainingModel
 from tests.conftest import (
     CallAutomationClientMock,
     SpeechSynthesizerMock,
+    pin_feature,
     with_conversations,
 )
 
@@ -401,6 +436,849 @@ async def test_llm(  # noqa: PLR0913
     assert_test(test_case, llm_metrics)
 
 
+@pytest.mark.parametrize(
+    "completion_sec",
+    [
+        pytest.param(
+            0.05,
+            id="fast",
+        ),
+        pytest.param(
+            1.5,
+            id="slow",
+        ),
+    ],
+)
+@pytest.mark.asyncio(loop_scope="session")
+async def test_chat_supervisor(
+    completion_sec: float,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """
+    Test the chat supervisor reacts as soon as the LLM completion ends.
+
+    LLM completion and database are mocked.
+
+    Steps:
+    1. Run the chat with a completion of a fixed duration
+    2. Check the chat ends right after the completion
+    """
+    tolerance_sec = 0.1
+    call = CallStateModel(
+        initiate=CallInitiateModel(
+            **CONFIG.conversation.initiate.model_dump(),
+            phone_number="+33612345678",  # pyright: ignore
+        ),
+        messages=[
+            MessageModel(
+                content="Hello",
+                persona=MessagePersonaEnum.HUMAN,
+            )
+        ],
+        voice_id="dummy",
+    )
+
+    async def _completion(**kwargs) -> tuple[bool, bool, CallStateModel]:  # noqa: ARG001
+        await asyncio.sleep(completion_sec)
+        return False, False, call
+
+    class _StoreMock:
+        @asynccontextmanager
+        async def call_transac(self, **kwargs):  # noqa: ARG002
+            yield
+
+    async def _callback(_: CallStateModel) -> None:
+        pass
+
+    monkeypatch.setattr(call_llm, "_db", _StoreMock())
+    monkeypatch.setattr(call_llm, "_generate_chat_completion", _completion)
+    monkeypatch.setattr(call_llm, "answer_hard_timeout_sec", pin_feature(15))
+    monkeypatch.setattr(call_llm, "answer_soft_timeout_sec", pin_feature(4))
+
+    async with Scheduler() as scheduler:
+        start = time.monotonic()
+        await _continue_chat(
+            call=call,
+            client=CallAutomationClientMock(
+                hang_up_callback=lambda: None,
+                play_media_callback=lambda _: None,
+                transfer_callback=lambda: None,
+            ),
+            post_callback=_callback,
+            scheduler=scheduler,
+            training_callback=_callback,
+            tts_client=SpeechSynthesizerMock(play_media_callback=lambda _: None),
+        )
+        duration = time.monotonic() - start
+
+    assume(duration < completion_sec + tolerance_sec)
+
+
+@pytest.mark.parametrize(
+    "partial, complete, expected",
+    [
+        pytest.param(
+            "i want to declare a claim",
+            "I want to declare a claim.",
+            True,
+            id="same",
+        ),
+        pytest.param(
+            "i want to declare a",
+            "I want to declare a claim.",
+            True,
+            id="end_missing",
+        ),
+        pytest.param(
+            "i want to declare a claim",
+            "I want to cancel my contract, not to declare a claim.",
+            False,
+            id="diverged",
+        ),
+    ],
+)
+@pytest.mark.asyncio(loop_scope="session")
+async def test_speculative_answer(
+    partial: str,
+    complete: str,
+    expected: bool,
+) -> None:
+    """
+    Test the speculative answer is kept only when the complete recognition matches the partial one, and is replayed entirely.
+
+    LLM completion is mocked.
+
+    Steps:
+    1. Start a completion on the partial recognition
+    2. Compare the partial and complete recognitions
+    3. Replay the completion while it is still streaming
+    4. Check all the deltas are replayed in order
+    """
+    max_distance = 10
+    deltas = [f"delta-{i}" for i in range(10)]
+
+    async def _stream():
+        for delta in deltas:
+            await asyncio.sleep(0.01)
+            yield delta
+
+    speculation = _SpeculativeAnswer(
+        history_size=1,
+        stream=_stream(),  # pyright: ignore
+        text=partial,
+    )
+
+    # Check the distance decision
+    distance = recognition_distance(
+        complete=complete,
+        partial=partial,
+    )
+    assume((distance <= max_distance) == expected)
+
+    # Replay before the completion ended
+    await asyncio.sleep(0.05)
+    replayed = [delta async for delta in speculation.replay()]
+    assume(replayed == deltas)
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_speculative_answer_resume(monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Test the speculative answer is discarded when the user speaks again before the silence is confirmed.
+
+    Steps:
+    1. Send silence, check the speculation starts
+    2. Send speech before the silence timeout
+    3. Check the speculation is discarded and no response is triggered
+    """
+    monkeypatch.setattr(call_llm, "phone_silence_timeout_sec", pin_feature(20))
+    monkeypatch.setattr(call_llm, "vad_cutoff_timeout_ms", pin_feature(250))
+    monkeypatch.setattr(call_llm, "vad_silence_timeout_ms", pin_feature(500))
+    packets: asyncio.Queue[tuple[bytes, bool]] = asyncio.Queue()
+    events: list[str] = []
+
+    async def _in_callback() -> tuple[bytes, bool]:
+        return await packets.get()
+
+    async def _async_event(name: str) -> None:
+        events.append(name)
+
+    vad = asyncio.create_task(
+        call_llm._process_audio_for_vad(
+            call=CallStateModel(
+                initiate=CallInitiateModel(
+                    **CONFIG.conversation.initiate.model_dump(),
+                    phone_number="+33612345678",  # pyright: ignore
+                ),
+            ),
+            in_callback=_in_callback,
+            out_callback=lambda _: None,
+            response_callback=lambda: _async_event("response"),
+            resume_callback=lambda: events.append("resume"),
+            speculate_callback=lambda: _async_event("speculate"),
+            stop_callback=lambda: _async_event("stop"),
+            timeout_callback=lambda: _async_event("timeout"),
+        )
+    )
+    try:
+        # Silence, then speech before the timeout
+        await packets.put((b"", False))
+        await asyncio.sleep(0.05)
+        await packets.put((b"", True))
+        await asyncio.sleep(0.05)
+        assume(events == ["speculate", "resume"])
+
+    finally:
+        vad.cancel()
+        with suppress(asyncio.CancelledError):
+            await vad
+
+
+@pytest.mark.parametrize(
+    "primary_delay, secondary_delay, hedged, primary_wins",
+    [
+        pytest.param(0.01, 0.01, False, True, id="on_time"),
+        pytest.param(1, 0.01, True, False, id="late_secondary_wins"),
+        pytest.param(0.15, 1, True, True, id="late_primary_wins"),
+    ],
+)
+@pytest.mark.asyncio(loop_scope="session")
+async def test_hedged_completion(
+    hedged: bool,
+    monkeypatch: pytest.MonkeyPatch,
+    primary_delay: float,
+    primary_wins: bool,
+    secondary_delay: float,
+) -> None:
+    """
+    Test the completion is hedged on the other deployment when the first token is late, and the loser is cancelled.
+
+    Only the latency of the winner is recorded.
+
+    LLM completion is mocked.
+
+    Steps:
+    1. Stream a completion, the deployments answer after a delay
+    2. Check the other deployment is started only if the first token is late
+    3. Check all the tokens come from the winner
+    4. Check the loser is closed
+    5. Check only the winner latency is recorded
+    """
+    started: list[bool] = []
+    closed: list[bool] = []
+
+    async def _completion_stream_worker(deployment: LlmDeploymentModel, **kwargs):  # noqa: ARG001
+        is_fast = deployment == CONFIG.llm.fast
+        started.append(is_fast)
+        try:
+            await asyncio.sleep(primary_delay if is_fast else secondary_delay)
+            for i in range(3):
+                yield f"{is_fast}-{i}"
+        finally:
+            closed.append(is_fast)
+
+    monkeypatch.setattr(
+        llm_worker, "_completion_stream_worker", _completion_stream_worker
+    )
+    monkeypatch.setattr(
+        CONFIG.llm,
+        "hedging",
+        HedgingModel(enabled=True, max_delay_ms=100, min_delay_ms=50),
+    )
+    monkeypatch.setattr(llm_worker, "_latencies", defaultdict(_LatencyTracker))
+
+    chunks = [
+        chunk
+        async for chunk in _completion_stream_hedged(
+            context=[],
+            is_fast=True,
+            max_tokens=100,
+            messages=[],
+            system=[],
+        )
+    ]
+
+    assume(started == ([True, False] if hedged else [True]))
+    assume(chunks == [f"{primary_wins}-{i}" for i in range(3)])
+    assume(sorted(closed) == sorted(started))
+    assume(
+        [
+            deployment
+            for deployment, latency in llm_worker._latencies.items()
+            if latency.samples
+        ]
+        == [CONFIG.llm.selected(primary_wins)]
+    )
+
+
+def test_hedging_delay(monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Test the hedging delay follows the latency of the deployment.
+
+    Steps:
+    1. Check the maximum delay is used while the latency is unknown
+    2. Record a stable latency, check the delay is close to it
+    3. Record a latency above the maximum, check both deployments start at once
+    """
+    deployment = CONFIG.llm.selected(True)
+    hedging = HedgingModel(enabled=True, max_delay_ms=2000, min_delay_ms=100)
+    latency_sec = 0.5
+    monkeypatch.setattr(CONFIG.llm, "hedging", hedging)
+    monkeypatch.setattr(llm_worker, "_latencies", defaultdict(_LatencyTracker))
+
+    # Unknown latency
+    assume(_hedging_delay(deployment) == hedging.max_delay_ms / 1000)
+
+    # Stable latency
+    for _ in range(20):
+        llm_worker._latencies[deployment].record(latency_sec)
+    assume(
+        latency_sec
+        <= (_hedging_delay(deployment) or 0)
+        < latency_sec + hedging.min_delay_ms / 1000
+    )
+
+    # Too slow
+    for _ in range(20):
+        llm_worker._latencies[deployment].record(5)
+    assume(_hedging_delay(deployment) == 0)
+
+
+class _HttpResponseMock:
+    def __init__(self, status_code: int, headers: dict[str, str]):
+        self.headers = headers
+        self.http_response = self
+        self.reason = "Mock"
+        self.status_code = status_code
+
+    def text(self) -> str:
+        return ""
+
+
+def test_deployment_pool(monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Test the completions are routed to the deployment with the most headroom, and away from the failing ones.
+
+    Steps:
+    1. Check the requests in progress are spread across the pool
+    2. Report the quotas, check the deployment with the most headroom is selected
+    3. Rate limit it, check it is skipped
+    4. Fail another one, check it is skipped after the configured failures
+    5. Check the one closing first is selected when all are skipped
+    """
+    first = CONFIG.llm.fast
+    second = first.model_copy(update={"endpoint": "https://second.example.com"})
+    third = first.model_copy(update={"endpoint": "https://third.example.com"})
+    pool = [first, second, third]
+    limit_tokens = 10000
+    monkeypatch.setattr(CONFIG.llm, "fast_pool", [second, third])
+    monkeypatch.setattr(
+        CONFIG.llm, "circuit_breaker", CircuitBreakerModel(failures=2, open_sec=30)
+    )
+    monkeypatch.setattr(llm_worker, "_budgets", defaultdict(_DeploymentBudget))
+
+    # Requests in progress
+    with (
+        _use_budget(deployment=_select_deployment(True), tokens=100),
+        _use_budget(deployment=_select_deployment(True), tokens=100),
+        _use_budget(deployment=_select_deployment(True), tokens=100),
+    ):
+        selected = [
+            deployment
+            for deployment, budget in llm_worker._budgets.items()
+            if budget.in_flight
+        ]
+    assume(len(selected) == len(pool))
+
+    # Quotas
+    remainings = {first: 1000, second: 9000, third: 5000}
+    for deployment, remaining in remainings.items():
+        with _use_budget(deployment=deployment, tokens=100) as hook:
+            hook(
+                _HttpResponseMock(  # pyright: ignore[reportArgumentType]
+                    status_code=200,
+                    headers={
+                        "x-ratelimit-limit-tokens": str(limit_tokens),
+                        "x-ratelimit-remaining-requests": "100",
+                        "x-ratelimit-remaining-tokens": str(remaining),
+                    },
+                )
+            )
+    assume(_select_deployment(True) == second)
+    assume(
+        llm_worker._budgets[second].headroom()
+        == pytest.approx(remainings[second] / limit_tokens, abs=0.05)
+    )
+
+    # Rate limit
+    with pytest.raises(RateLimitError), _use_budget(deployment=second, tokens=100):
+        raise HttpResponseError(
+            response=_HttpResponseMock(  # pyright: ignore[reportArgumentType]
+                status_code=429,
+                headers={"retry-after-ms": "10000"},
+            )
+        )
+    assume(_select_deployment(True) == third)
+
+    # Failures
+    for _ in range(2):
+        with (
+            pytest.raises(ServiceResponseError),
+            _use_budget(deployment=third, tokens=100),
+        ):
+            raise ServiceResponseError("Connection reset")
+    assume(_select_deployment(True) == first)
+
+    # All skipped
+    for _ in range(2):
+        with (
+            pytest.raises(ServiceResponseError),
+            _use_budget(deployment=first, tokens=100),
+        ):
+            raise ServiceResponseError("Connection reset")
+    assume(_select_deployment(True) == second)
+
+
+def test_prompt_prefix(monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Test the chat prompt prefix is byte-identical across the turns of a call, for the LLM provider to cache it.
+
+    Steps:
+    1. Build the prompt of a first turn
+    2. Update the claim, the reminders, the trainings, the language, the time, and add a message
+    3. Build the prompt of a second turn
+    4. Check the instructions, the call initiation and the first messages are identical, and only the context after the messages differs
+    5. Check the instructions are identical for another call
+    """
+    now = datetime.now(UTC)
+
+    class _DatetimeMock(datetime):
+        @classmethod
+        def now(cls, tz=None):  # pyright: ignore[reportIncompatibleMethodOverride]
+            return now.astimezone(tz)
+
+    monkeypatch.setattr(prompts, "datetime", _DatetimeMock)
+
+    def _initiate(phone_number: str) -> CallInitiateModel:
+        return CallInitiateModel(
+            **CONFIG.conversation.initiate.model_dump(),
+            phone_number=phone_number,  # pyright: ignore
+        )
+
+    def _prompt(call: CallStateModel, trainings: list[TrainingModel]) -> list[str]:
+        prompt, _ = _limit_messages(
+            context=CONFIG.prompts.llm.chat_context(
+                call=call,
+                trainings=trainings,
+            ),
+            context_window=128000,
+            max_tokens=160,
+            messages=call.messages,
+            model="gpt-4o",
+            system=CONFIG.prompts.llm.chat_system(call),
+        )
+        return [_dump_sdk_model(message) for message in prompt]
+
+    # First turn
+    call = CallStateModel(
+        initiate=_initiate("+33612345678"),
+        messages=[
+            MessageModel(
+                content="My car was damaged",
+                persona=MessagePersonaEnum.HUMAN,
+            )
+        ],
+    )
+    first = _prompt(call, [])
+
+    # Second turn, a few minutes later
+    now += timedelta(minutes=5)
+    call.claim["incident_description"] = "Car damaged in a parking lot"
+    call.lang_short_code = "en-US"
+    call.reminders.append(
+        ReminderModel(
+            description="Call the garage",
+            due_date_time=now,
+            title="Garage",
+        )
+    )
+    trainings = [
+        TrainingModel(
+            content="Parking lot damages are covered",
+            id=uuid4(),
+            score=1,
+            title="Coverage",
+        )
+    ]
+    call.messages.append(
+        MessageModel(
+            content="I will check your contract",
+            persona=MessagePersonaEnum.ASSISTANT,
+        )
+    )
+    second = _prompt(call, trainings)
+
+    # Instructions, initiation and messages are identical, context is last and differs
+    assume(first[:-1] == second[: len(first) - 1])
+    assume(first[-1] != second[-1])
+    prefix = "".join(first[:-1])
+    assume("".join(second).startswith(prefix))
+    assume(call.initiate.task in first[-1])
+    assume("Parking lot damages are covered" in second[-1])
+
+    # Another call shares the instructions
+    other = _prompt(CallStateModel(initiate=_initiate("+33687654321")), [])
+    assume(other[0] == first[0])
+    assume(other[1] != first[1])
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_tts_prompt_bank(monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Test the TTS prompts are translated at warmup, then served from memory.
+
+    Translator is mocked.
+
+    Steps:
+    1. Warm up the prompts, check there is one batch per language
+    2. Check the prompts of a call are served without the Translator
+    3. Check the prompts of a call with another bot are translated live
+    4. Check the IVR choices are translated live in a single batch, without warmup
+    5. Benchmark the prompt from memory
+    """
+    requests: list[tuple[str, int]] = []
+
+    async def _translate_texts(
+        texts: list[str], source_lang: str, target_lang: str
+    ) -> list[str | None]:
+        requests.append((target_lang, len(texts)))
+        if source_lang == target_lang:
+            return list(texts)
+        return [f"[{target_lang}] {text}" for text in texts]
+
+    monkeypatch.setattr(translation, "translate_texts", _translate_texts)
+    tts = prompts.TtsModel()
+    initiate = CONFIG.conversation.initiate
+    langs = initiate.lang.availables
+
+    # Warmup
+    await tts.warmup(initiate)
+    assume(len(requests) == len(langs))
+    assume(all(count == requests[0][1] for _, count in requests))
+
+    # Served from memory
+    requests.clear()
+    call = CallStateModel(
+        initiate=CallInitiateModel(
+            **initiate.model_dump(),
+            phone_number="+33612345678",  # pyright: ignore
+        ),
+        lang_short_code=langs[-1].short_code,
+    )
+    hello = await tts.hello(call)
+    ivr = await tts.ivr_language(call)
+    assume(hello.startswith(f"[{langs[-1].short_code}]"))
+    assume(initiate.bot_name in hello)
+    assume(ivr.count(f"[{langs[-1].short_code}]") == len(langs))
+    assume(not requests)
+
+    # Translated live
+    other_call = CallStateModel(
+        initiate=CallInitiateModel(
+            **initiate.model_dump(exclude={"bot_name"}),
+            bot_name="Zoe",
+            phone_number="+33612345678",  # pyright: ignore
+        ),
+        lang_short_code=langs[-1].short_code,
+    )
+    hello = await tts.hello(other_call)
+    assume("Zoe" in hello)
+    assume(len(requests) == 1)
+
+    # IVR translated live, in one batch
+    requests.clear()
+    ivr = await prompts.TtsModel().ivr_language(call)
+    assume(ivr.count(f"[{langs[-1].short_code}]") == len(langs))
+    assume(requests == [(langs[-1].short_code, len(langs))])
+
+    # Benchmark
+    reads = 1000
+    start = time.perf_counter()
+    for _ in range(reads):
+        await tts.error(call)
+    duration = (time.perf_counter() - start) / reads
+    assume(len(requests) == 1)  # Only the IVR batch
+
+    logger.info("TTS prompt from memory: %.2f us", duration * 1e6)
+
+
+def test_limit_messages_benchmark() -> None:
+    """
+    Benchmark the prompt building of a long call, with and without the token ledger filled.
+
+    Steps:
+    1. Build a 200 messages call
+    2. Build the prompt a first time, counting all the messages
+    3. Build the prompt again, as the next turns do
+    4. Check the prompt is the same and the next turns are faster
+    """
+    turns = 10
+    model = "gpt-4o"
+    messages = [
+        MessageModel(
+            content=f"Message {i}, my car was damaged in a parking lot by a truck, the driver left a note with its phone number.",
+            persona=(
+                MessagePersonaEnum.HUMAN if i % 2 else MessagePersonaEnum.ASSISTANT
+            ),
+        )
+        for i in range(200)
+    ]
+    system = [
+        SystemMessage(
+            content="You are a helpful insurance assistant. " * 100,
+        )
+    ]
+
+    def _build() -> list:
+        prompt, _ = _limit_messages(
+            context_window=128000,
+            max_tokens=160,
+            messages=messages,
+            model=model,
+            system=system,
+        )
+        return prompt
+
+    # First turn, ledger is empty
+    start = time.perf_counter()
+    first_prompt = _build()
+    first_duration = time.perf_counter() - start
+
+    # Next turns, ledger is filled
+    start = time.perf_counter()
+    for _ in range(turns):
+        next_prompt = _build()
+    next_duration = (time.perf_counter() - start) / turns
+
+    assume(len(first_prompt) == len(next_prompt) == len(messages) + len(system))
+    assume(next_duration < first_duration)
+
+    logger.info(
+        "Prompt of %s messages: %.2f ms first turn, %.2f ms next turns",
+        len(messages),
+        first_duration * 1000,
+        next_duration * 1000,
+    )
+
+
+def test_limit_messages_static_tokens(monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Test the system prompt and the tools are serialized once, not at each turn.
+
+    Steps:
+    1. Build the prompt with a system prompt and tools
+    2. Build it again with the same ones, as the next turns do
+    3. Check nothing is serialized again and the token count is the same
+    """
+    model = "gpt-4o"
+    system = [
+        SystemMessage(
+            content="You are a helpful insurance assistant.",
+        )
+    ]
+    tools = [
+        ChatCompletionsToolDefinition(
+            function=FunctionDefinition(
+                description=f"Tool {i}, updates the claim.",
+                name=f"tool_{i}",
+                parameters={"properties": {}, "required": [], "type": "object"},
+            ),
+        )
+        for i in range(10)
+    ]
+    dumps = 0
+
+    def _dump_sdk_model_mock(message):
+        nonlocal dumps
+        dumps += 1
+        return _dump_sdk_model(message)
+
+    monkeypatch.setattr(llm_worker, "_dump_sdk_model", _dump_sdk_model_mock)
+
+    def _build() -> int:
+        _, tokens = _limit_messages(
+            context_window=128000,
+            max_tokens=160,
+            messages=[],
+            model=model,
+            system=[SystemMessage(content=message.content) for message in system],
+            tools=tools,
+        )
+        return tokens
+
+    # First turn
+    first_tokens = _build()
+
+    # Next turn, system messages are built again, tools are shared
+    dumps = 0
+    next_tokens = _build()
+    assume(dumps == 0)
+    assume(next_tokens == first_tokens)
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_plugin_schema_cache() -> None:
+    """
+    Test the tool schemas are rendered once for all the chats of calls sharing the same initiation.
+
+    Steps:
+    1. Render the tools of a first call
+    2. Render the tools of another call with the same initiation
+    3. Check the schemas are the same, rendered with the claim fields
+    4. Check the second rendering is faster
+    """
+    blacklist = frozenset(
+        {"end_call", "test_plugin_schema_cache"}
+    )  # Unknown name makes the cache key unique to this test
+    initiate = CallInitiateModel(
+        **CONFIG.conversation.initiate.model_dump(),
+        phone_number="+33612345678",  # pyright: ignore
+    )
+
+    async def _callback(_: CallStateModel) -> None:
+        pass
+
+    async def _tts_callback(_: str) -> None:
+        pass
+
+    async def _render() -> tuple[list, float]:
+        call = CallStateModel(
+            initiate=initiate,
+            voice_id="dummy",
+        )
+        plugin = DefaultPlugin(
+            call=call,
+            client=CallAutomationClientMock(
+                hang_up_callback=lambda: None,
+                play_media_callback=lambda _: None,
+                transfer_callback=lambda: None,
+            ),
+            post_callback=_callback,
+            scheduler=Scheduler(),
+            tts_callback=_tts_callback,
+            tts_client=SpeechSynthesizerMock(play_media_callback=lambda _: None),
+        )
+        start = time.perf_counter()
+        tools = await plugin.to_openai(blacklist)
+        return tools, time.perf_counter() - start
+
+    first_tools, first_duration = await _render()
+    next_tools, next_duration = await _render()
+
+    # Check the schemas
+    names = [tool.function.name for tool in first_tools]
+    assume("end_call" not in names)
+    assume(names == [tool.function.name for tool in next_tools])
+    updated_claim = next(
+        tool for tool in first_tools if tool.function.name == "updated_claim"
+    )
+    assume(
+        all(
+            field.name in str(updated_claim.function.parameters)
+            for field in initiate.claim
+        )
+    )
+
+    # Check the cache
+    assume(next_duration < first_duration)
+
+    logger.info(
+        "Tools schema: %.2f ms first chat, %.2f ms next chats",
+        first_duration * 1000,
+        next_duration * 1000,
+    )
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_translate_messages(monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Test the history is translated with one request per language pair, and only once.
+
+    Translation API and cache are mocked.
+
+    Steps:
+    1. Translate a history with two source languages and duplicated texts
+    2. Check one request is made per source language, without duplicates
+    3. Translate the history again, with a new message
+    4. Check only the new message is translated
+    """
+    requests: list[tuple[str, list[str]]] = []
+
+    class _TranslationMock:
+        class _Item:
+            def __init__(self, text: str):
+                self.translations = [type("Translation", (), {"text": text})]
+
+        async def translate(
+            self,
+            body: list[str],
+            from_language: str,
+            to_language: list[str],
+        ) -> list:
+            requests.append((from_language, body))
+            return [self._Item(f"{to_language[0]}:{text}") for text in body]
+
+    class _CacheMock:
+        async def get_many(self, keys: list[str]) -> list[None]:
+            return [None] * len(keys)
+
+        async def set_many(self, **kwargs) -> None:
+            pass
+
+    async def _use_client() -> _TranslationMock:
+        return _TranslationMock()
+
+    monkeypatch.setattr(translation, "_cache", _CacheMock())
+    monkeypatch.setattr(translation, "_use_client", _use_client)
+
+    messages = [
+        MessageModel(
+            content=content,
+            lang_short_code=lang,
+            persona=MessagePersonaEnum.HUMAN,
+        )
+        for content, lang in [
+            ("Bonjour", "fr-FR"),
+            ("Hallo", "de-DE"),
+            ("Bonjour", "fr-FR"),
+            ("Hello", "en-US"),
+            ("Merci", "fr-FR"),
+        ]
+    ]
+
+    # First turn
+    translated = await translate_messages(messages, "en-US")
+    assume(
+        [message.content for message in translated]
+        == ["en-US:Bonjour", "en-US:Hallo", "en-US:Bonjour", "Hello", "en-US:Merci"]
+    )
+    assume(sorted(requests) == [("de-DE", ["Hallo"]), ("fr-FR", ["Bonjour", "Merci"])])
+    assume(all(message.content != "en-US:Bonjour" for message in messages))
+
+    # Next turn
+    requests.clear()
+    messages.append(
+        MessageModel(
+            content="Au revoir",
+            lang_short_code="fr-FR",
+            persona=MessagePersonaEnum.HUMAN,
+        )
+    )
+    translated = await translate_messages(messages, "en-US")
+    assume(translated[-1].content == "en-US:Au revoir")
+    assume(requests == [("fr-FR", ["Au revoir"])])
+
+
 def _remove_newlines(text: str) -> str:
     """
     Remove newlines from a string and return it as a single line.
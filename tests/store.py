@@ -1,9 +1,44 @@
+import asyncio
+import gc
+import statistics
+import time
+from typing import Any
+
 import pytest
 from aiojobs import Scheduler
 from pytest_assume.plugin import assume
 
 from app.helpers.config import CONFIG
-from app.models.call import CallStateModel
+from app.helpers.config_models.cache import MemoryModel
+from app.helpers.config_models.database import CosmosDbModel
+from app.helpers.logging import logger
+from app.models.call import CallInitiateModel, CallStateModel
+from app.models.message import (
+    ActionEnum as MessageActionEnum,
+    MessageModel,
+    PersonaEnum as MessagePersonaEnum,
+)
+from app.persistence import cosmos_db
+from app.persistence.cosmos_db import CosmosDbStore
+from app.persistence.memory import MemoryCache
+
+
+class _ItemsMock:
+    """
+    Items of a Cosmos DB query, iterated asynchronously.
+    """
+
+    def __init__(self, items: list[Any]):
+        self._items = iter(items)
+
+    def __aiter__(self) -> "_ItemsMock":
+        return self
+
+    async def __anext__(self) -> Any:
+        try:
+            return next(self._items)
+        except StopIteration:
+            raise StopAsyncIteration
 
 
 @pytest.mark.asyncio(loop_scope="session")
@@ -25,17 +60,6 @@ async def test_acid(call: CallStateModel) -> None:
     # Check not exists
     assume(not await db.call_get(call.call_id))
     assume(await db.call_search_one(call.initiate.phone_number) != call)
-    assume(
-        call
-        not in (
-            (
-                await db.call_search_all(
-                    phone_number=call.initiate.phone_number, count=1
-                )
-            )[0]
-            or []
-        )
-    )
 
     # Insert test call
     await db.call_create(call)
@@ -44,18 +68,6 @@ async def test_acid(call: CallStateModel) -> None:
     assume(await db.call_get(call.call_id) == call)
     # Check search one
     assume(await db.call_search_one(call.initiate.phone_number) == call)
-    # Check search all
-    assume(
-        call
-        in (
-            (
-                await db.call_search_all(
-                    phone_number=call.initiate.phone_number, count=1
-                )
-            )[0]
-            or []
-        )
-    )
 
 
 @pytest.mark.asyncio(loop_scope="session")
@@ -68,6 +80,7 @@ async def test_transaction(
     Test transactional properties of the database backend.
     """
     db = CONFIG.database.instance
+    prosody_rate = 1.25
 
     async with Scheduler() as scheduler:
         # Check not exists
@@ -101,6 +114,876 @@ async def test_transaction(
         # Check first string change
         assume(call.voice_id == random_text)
 
+        # Check nested change, mutated in place
+        async with db.call_transac(
+            call=call,
+            scheduler=scheduler,
+        ):
+            # Apply change
+            call.initiate.prosody_rate = prosody_rate
+        # Check change
+        assume(call.initiate.prosody_rate == prosody_rate)
+
         # Check point read
         new_call = await db.call_get(call.call_id)
         assume(new_call and new_call.voice_id == random_text and new_call.in_progress)
+        assume(new_call and new_call.initiate.prosody_rate == prosody_rate)
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_call_get_benchmark(
+    call: CallStateModel,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """
+    Benchmark the point read latency, with a client opened per read and with the lifespan client.
+
+    Cache is bypassed, to measure the database round trip.
+
+    Steps:
+    1. Insert test call
+    2. Read it with a new client each time, closed after use
+    3. Read it with the lifespan client
+    4. Check the lifespan client is built once
+    5. Report p50 and p99 of both
+    """
+    reads = 50
+    config = CONFIG.database.cosmos_db
+    clients = 0
+
+    class _CosmosClientMock(cosmos_db.CosmosClient):
+        def __init__(self, *args, **kwargs):
+            nonlocal clients
+            clients += 1
+            super().__init__(*args, **kwargs)
+
+    monkeypatch.setattr(cosmos_db, "CosmosClient", _CosmosClientMock)
+
+    class _CacheMock:
+        async def get(self, key: str) -> None:  # noqa: ARG002
+            return None
+
+        async def set(self, **kwargs) -> None:
+            pass
+
+    # Insert test call
+    await CONFIG.database.instance.call_create(call)
+
+    # Client opened per read
+    per_read: list[float] = []
+    for _ in range(reads):
+        db = CosmosDbStore(cache=_CacheMock(), config=config)  # pyright: ignore
+        start = time.perf_counter()
+        assume(await db.call_get(call.call_id))
+        per_read.append(time.perf_counter() - start)
+        await (await db._use_service_client()).close()
+
+    assume(clients == reads)
+
+    # Lifespan client
+    clients = 0
+    db = CosmosDbStore(cache=_CacheMock(), config=config)  # pyright: ignore
+    await db.warmup()
+    lifespan: list[float] = []
+    for _ in range(reads):
+        start = time.perf_counter()
+        assume(await db.call_get(call.call_id))
+        lifespan.append(time.perf_counter() - start)
+    assume(clients == 1)
+
+    per_read_quantiles = statistics.quantiles(per_read, n=100)
+    lifespan_quantiles = statistics.quantiles(lifespan, n=100)
+
+    logger.info(
+        "Point read: p50 %.1f ms, p99 %.1f ms per read client; p50 %.1f ms, p99 %.1f ms lifespan client",
+        per_read_quantiles[49] * 1000,
+        per_read_quantiles[98] * 1000,
+        lifespan_quantiles[49] * 1000,
+        lifespan_quantiles[98] * 1000,
+    )
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_call_search_one_benchmark(
+    call: CallStateModel,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """
+    Benchmark the search of the last call of a phone number, with the query and with the index.
+
+    Cache of the calls is bypassed, to measure the database round trip.
+
+    Steps:
+    1. Insert test call
+    2. Search it with an empty index, so with the query
+    3. Search it with the index, so with a point read
+    4. Report p50, p99 and request units of both
+    """
+    searches = 50
+    charges: list[float] = []
+
+    class _CacheMock(MemoryCache):
+        async def get(self, key: str) -> bytes | None:
+            # Bypass the cache of the calls, keep the index
+            if "-call_id-" in key:
+                return None
+            return await super().get(key)
+
+    def _report_request_charge(headers: dict[str, str], *_: Any) -> None:
+        charges.append(float(headers.get("x-ms-request-charge", 0)))
+
+    monkeypatch.setattr(cosmos_db, "_report_request_charge", _report_request_charge)
+
+    # Insert test call
+    await CONFIG.database.instance.call_create(call)
+    db = CosmosDbStore(
+        cache=_CacheMock(MemoryModel()),
+        config=CONFIG.database.cosmos_db,
+    )
+    await db.warmup()
+
+    # Query
+    query: list[float] = []
+    query_charges: list[float] = []
+    for _ in range(searches):
+        await db._cache.delete(db._cache_key_phone_number(call.initiate.phone_number))
+        charges.clear()
+        start = time.perf_counter()
+        assume(await db.call_search_one(call.initiate.phone_number))
+        query.append(time.perf_counter() - start)
+        query_charges.append(sum(charges))
+
+    # Index
+    index: list[float] = []
+    index_charges: list[float] = []
+    for _ in range(searches):
+        charges.clear()
+        start = time.perf_counter()
+        assume(await db.call_search_one(call.initiate.phone_number))
+        index.append(time.perf_counter() - start)
+        index_charges.append(sum(charges))
+
+    query_quantiles = statistics.quantiles(query, n=100)
+    index_quantiles = statistics.quantiles(index, n=100)
+    assume(index_quantiles[49] < query_quantiles[49])
+    assume(statistics.mean(index_charges) < statistics.mean(query_charges))
+
+    logger.info(
+        "Search by phone number: p50 %.1f ms, p99 %.1f ms, %.2f RU with query; p50 %.1f ms, p99 %.1f ms, %.2f RU with index",
+        query_quantiles[49] * 1000,
+        query_quantiles[98] * 1000,
+        statistics.mean(query_charges),
+        index_quantiles[49] * 1000,
+        index_quantiles[98] * 1000,
+        statistics.mean(index_charges),
+    )
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_write_behind(random_text: str) -> None:
+    """
+    Test transactions of a call are merged in one patch, in order.
+
+    Cosmos DB container is mocked.
+
+    Steps:
+    1. Apply many transactions on a call
+    2. Check one patch is sent after the debounce window, with the last values
+    3. Apply a transaction and flush it
+    4. Check the patch is sent without waiting for the debounce window
+    """
+    write_behind_ms = 100
+    patches: list[list[dict[str, Any]]] = []
+    call = CallStateModel(
+        initiate=CallInitiateModel(
+            **CONFIG.conversation.initiate.model_dump(),
+            phone_number="+33612345678",  # pyright: ignore
+        ),
+        voice_id="dummy",
+    )
+    remote = call.model_dump(mode="json", exclude_none=True)
+
+    class _ContainerMock:
+        async def patch_item(
+            self,
+            patch_operations: list[dict[str, Any]],
+            **kwargs,  # noqa: ARG002
+        ) -> dict[str, Any]:
+            patches.append(patch_operations)
+            for operation in patch_operations:
+                *parents, key = operation["path"][1:].split("/")
+                target = remote
+                for parent in parents:
+                    target = target[parent]
+                if operation["op"] == "add" and key == "-":
+                    target.append(operation["value"])
+                else:
+                    target[key] = operation["value"]
+            return remote
+
+    async def _use_client():
+        return _ContainerMock()
+
+    db = CosmosDbStore(
+        cache=CONFIG.cache.instance,
+        config=CosmosDbModel(
+            container="dummy",
+            database="dummy",
+            endpoint="https://dummy",
+            write_behind_ms=write_behind_ms,
+        ),
+    )
+    db._use_client = _use_client  # pyright: ignore
+
+    async with Scheduler() as scheduler:
+        # Apply many transactions
+        for i in range(5):
+            async with db.call_transac(
+                call=call,
+                scheduler=scheduler,
+            ):
+                call.voice_id = f"{random_text}-{i}"
+                call.in_progress = True
+        assume(not patches)
+
+        # Wait for the debounce window
+        await asyncio.sleep(write_behind_ms / 1000 * 2)
+        assume(len(patches) == 1)
+        assume(
+            sorted(operation["path"] for operation in patches[0])
+            == ["/in_progress", "/voice_id"]
+        )
+        assume(remote["voice_id"] == f"{random_text}-4")
+        assume(call.voice_id == f"{random_text}-4")
+
+        # Flush now
+        patches.clear()
+        async with db.call_transac(
+            call=call,
+            scheduler=scheduler,
+        ):
+            call.in_progress = False
+        await db.call_flush(call)
+        assume(len(patches) == 1)
+        assume(remote["in_progress"] is False)
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_write_behind_failure(random_text: str) -> None:
+    """
+    Test the operations of a failed patch are kept and sent again, in order.
+
+    Cosmos DB container is mocked.
+
+    Steps:
+    1. Add more messages than the operations of a patch, in a transaction
+    2. Fail the second patch once, then flush
+    3. Check the failed operations are sent again, and all the messages are persisted in order
+    """
+    failed_patch = 2
+    failures = 1
+    messages_count = cosmos_db._MAX_PATCH_OPERATIONS + 2
+    patches: list[list[dict[str, Any]]] = []
+    call = CallStateModel(
+        initiate=CallInitiateModel(
+            **CONFIG.conversation.initiate.model_dump(),
+            phone_number="+33612345678",  # pyright: ignore
+        ),
+        voice_id="dummy",
+    )
+    remote = call.model_dump(mode="json", exclude_none=True)
+
+    class _ContainerMock:
+        async def patch_item(
+            self,
+            patch_operations: list[dict[str, Any]],
+            **kwargs,  # noqa: ARG002
+        ) -> dict[str, Any]:
+            nonlocal failures
+            patches.append(patch_operations)
+            if len(patches) == failed_patch and failures:
+                failures -= 1
+                raise cosmos_db.CosmosHttpResponseError(
+                    message="Service unavailable", status_code=503
+                )
+            for operation in patch_operations:
+                remote["messages"].append(operation["value"])
+            return remote
+
+    async def _use_client():
+        return _ContainerMock()
+
+    db = CosmosDbStore(
+        cache=CONFIG.cache.instance,
+        config=CosmosDbModel(
+            container="dummy",
+            database="dummy",
+            endpoint="https://dummy",
+            write_behind_ms=10,
+        ),
+    )
+    db._use_client = _use_client  # pyright: ignore
+
+    async with Scheduler() as scheduler:
+        async with db.call_transac(
+            call=call,
+            scheduler=scheduler,
+        ):
+            for i in range(messages_count):
+                call.messages.append(
+                    MessageModel(
+                        content=f"{random_text} {i}",
+                        persona=MessagePersonaEnum.HUMAN,
+                        action=MessageActionEnum.CALL
+                        if i % 2
+                        else MessageActionEnum.TALK,  # Avoid merging messages
+                    )
+                )
+        await db.call_flush(call)
+
+    assume(
+        [message["content"] for message in remote["messages"]]
+        == [f"{random_text} {i}" for i in range(messages_count)]
+    )
+    assume(not db._write_behind)
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_phone_number_index(random_text: str) -> None:
+    """
+    Test the last call of a phone number is found with a point read, once indexed.
+
+    Cosmos DB container is mocked.
+
+    Steps:
+    1. Create a call, search it by phone number
+    2. Check it is read with a point read, without a query
+    3. Change the policyholder phone, search the call by it
+    4. Check the new phone number is indexed, without a query
+    5. Search with an empty index, check the query is used once, then the index
+    """
+    requests: list[str] = []
+    remote: dict[str, dict[str, Any]] = {}
+    phone_number = "+33612345678"
+    policyholder_phone = "+33687654321"
+    call = CallStateModel(
+        initiate=CallInitiateModel(
+            **CONFIG.conversation.initiate.model_dump(),
+            phone_number=phone_number,  # pyright: ignore
+        ),
+        voice_id=random_text,
+    )
+
+    class _ContainerMock:
+        async def create_item(
+            self,
+            body: dict[str, Any],
+            **kwargs,  # noqa: ARG002
+        ) -> dict[str, Any]:
+            requests.append("create")
+            remote[body["id"]] = body
+            return body
+
+        async def read_item(self, item: str, **kwargs) -> dict[str, Any]:  # noqa: ARG002
+            requests.append("read")
+            return remote[item]
+
+        async def patch_item(
+            self,
+            item: str,
+            patch_operations: list[dict[str, Any]],
+            **kwargs,  # noqa: ARG002
+        ) -> dict[str, Any]:
+            requests.append("patch")
+            for operation in patch_operations:
+                remote[item][operation["path"][1:]] = operation["value"]
+            return remote[item]
+
+        def query_items(self, **kwargs) -> "_ItemsMock":  # noqa: ARG002
+            requests.append("query")
+            return _ItemsMock(list(remote.values()))
+
+    async def _use_client():
+        return _ContainerMock()
+
+    def _store(cache: MemoryCache) -> CosmosDbStore:
+        db = CosmosDbStore(
+            cache=cache,
+            config=CosmosDbModel(
+                container="dummy",
+                database="dummy",
+                endpoint="https://dummy",
+            ),
+        )
+        db._use_client = _use_client  # pyright: ignore
+        return db
+
+    cache = MemoryCache(MemoryModel())
+    db = _store(cache)
+
+    # Create and search, without the call in cache
+    await db.call_create(call)
+    await cache.delete(db._cache_key_call_id(call.call_id))
+    found = await db.call_search_one(phone_number)
+    assume(found and found.call_id == call.call_id)
+    assume(requests == ["create", "read"])
+
+    # Change the policyholder phone
+    async with Scheduler() as scheduler:
+        async with db.call_transac(
+            call=call,
+            scheduler=scheduler,
+        ):
+            call.claim["policyholder_phone"] = policyholder_phone
+        await db.call_flush(call)
+    requests.clear()
+    found = await db.call_search_one(policyholder_phone)
+    assume(found and found.call_id == call.call_id)
+    assume("query" not in requests)
+
+    # Search with an empty index
+    db = _store(MemoryCache(MemoryModel()))
+    requests.clear()
+    for _ in range(3):
+        found = await db.call_search_one(phone_number)
+        assume(found and found.call_id == call.call_id)
+    assume(requests == ["query"])
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_call_search_summaries(random_text: str) -> None:
+    """
+    Test the call summaries are listed page by page, and the count is cached.
+
+    Cosmos DB container is mocked.
+
+    Steps:
+    1. List the summaries, following the continuation tokens
+    2. Check all the calls are listed once, from the most recent
+    3. Check only the summary fields are queried
+    4. Count the calls twice, check the database is queried once
+    """
+    page_size = 2
+    queries: list[str] = []
+    remote = [
+        CallStateModel(
+            initiate=CallInitiateModel(
+                **CONFIG.conversation.initiate.model_dump(),
+                phone_number="+33612345678",  # pyright: ignore
+            ),
+            voice_id=f"{random_text}-{i}",
+        ).model_dump(mode="json", exclude_none=True)
+        for i in range(5)
+    ]
+
+    class _PagerMock:
+        continuation_token: str | None = None
+
+        def __init__(self, items: list[dict[str, Any]], start: int):
+            self._items = items
+            self._start = start
+
+        def __aiter__(self) -> "_PagerMock":
+            return self
+
+        async def __anext__(self) -> _ItemsMock:
+            end = self._start + page_size
+            self.continuation_token = str(end) if end < len(self._items) else None
+            return _ItemsMock(self._items[self._start : end])
+
+    class _QueryMock:
+        def __init__(self, items: list[dict[str, Any]]):
+            self._items = items
+
+        def by_page(self, continuation_token: str | None = None) -> _PagerMock:
+            return _PagerMock(self._items, int(continuation_token or 0))
+
+    class _ContainerMock:
+        def query_items(self, query: str, **kwargs) -> Any:  # noqa: ARG002
+            queries.append(query)
+            if "COUNT(1)" in query:
+                return _ItemsMock([len(remote)])
+            # Project the fields, from the most recent
+            items = sorted(remote, key=lambda item: item["created_at"], reverse=True)
+            return _QueryMock(
+                [
+                    {
+                        "call_id": item["call_id"],
+                        "created_at": item["created_at"],
+                        "phone_number": item["initiate"]["phone_number"],
+                    }
+                    for item in items
+                ]
+            )
+
+    async def _use_client():
+        return _ContainerMock()
+
+    db = CosmosDbStore(
+        cache=MemoryCache(MemoryModel()),
+        config=CosmosDbModel(
+            container="dummy",
+            database="dummy",
+            endpoint="https://dummy",
+        ),
+    )
+    db._use_client = _use_client  # pyright: ignore
+
+    # List all the pages
+    summaries = []
+    continuation = None
+    for _ in range(len(remote)):
+        page, continuation = await db.call_search_summaries(
+            continuation=continuation,
+            count=page_size,
+        )
+        assume(len(page) <= page_size)
+        summaries += page
+        if not continuation:
+            break
+    assume(
+        [str(summary.call_id) for summary in summaries]
+        == [
+            item["call_id"]
+            for item in sorted(
+                remote, key=lambda item: item["created_at"], reverse=True
+            )
+        ]
+    )
+    assume(all("SELECT c.call_id," in query for query in queries))
+
+    # Count, from the cache the second time
+    queries.clear()
+    assume(await db.call_count() == len(remote))
+    assume(await db.call_count() == len(remote))
+    assume(len(queries) == 1)
+
+
+@pytest.mark.parametrize(
+    "messages_count",
+    [
+        pytest.param(10, id="10"),
+        pytest.param(100, id="100"),
+        pytest.param(1000, id="1000"),
+    ],
+)
+def test_transaction_benchmark(messages_count: int) -> None:
+    """
+    Benchmark the transaction cost, depending on the number of messages.
+
+    Steps:
+    1. Build a call with many messages
+    2. Add a message in a transaction, with the tracked changes and with a dump-and-diff
+    3. Check only the new message is sent
+    4. Report the cost of both
+    """
+    transactions = 20
+    call = CallStateModel(
+        initiate=CallInitiateModel(
+            **CONFIG.conversation.initiate.model_dump(),
+            phone_number="+33612345678",  # pyright: ignore
+        ),
+        messages=[
+            MessageModel(
+                content=f"Message {i}, my car was damaged in a parking lot.",
+                persona=MessagePersonaEnum.HUMAN,
+                action=MessageActionEnum.CALL
+                if i % 2
+                else MessageActionEnum.TALK,  # Avoid merging messages
+            )
+            for i in range(messages_count)
+        ],
+        voice_id="dummy",
+    )
+
+    # Tracked changes
+    start = time.perf_counter()
+    for i in range(transactions):
+        snapshot = call.changes_start()
+        call.messages.append(
+            MessageModel(
+                content=f"New message {i}",
+                persona=MessagePersonaEnum.ASSISTANT,
+                action=MessageActionEnum.CALL
+                if i % 2
+                else MessageActionEnum.TALK,  # Avoid merging messages
+            )
+        )
+        call.voice_id = f"voice {i}"
+        operations = call.changes_since(snapshot)
+    tracked_duration = (time.perf_counter() - start) / transactions
+    assume(
+        sorted((operation["op"], operation["path"]) for operation in operations)
+        == [("add", "/messages/-"), ("set", "/voice_id")]
+    )
+
+    # Dump-and-diff
+    start = time.perf_counter()
+    for i in range(transactions):
+        init_data = call.model_dump(mode="json", exclude_none=True)
+        call.messages.append(
+            MessageModel(
+                content=f"New message {i}",
+                persona=MessagePersonaEnum.ASSISTANT,
+                action=MessageActionEnum.CALL
+                if i % 2
+                else MessageActionEnum.TALK,  # Avoid merging messages
+            )
+        )
+        call.voice_id = f"voice {i}"
+        diff = {
+            field: value
+            for field, value in call.model_dump(mode="json", exclude_none=True).items()
+            if init_data.get(field) != value
+        }
+    diff_duration = (time.perf_counter() - start) / transactions
+    assume(sorted(diff) == ["messages", "voice_id"])
+
+    assume(tracked_duration < diff_duration)
+
+    logger.info(
+        "Transaction with %s messages: %.3f ms tracked, %.3f ms dump-and-diff",
+        messages_count,
+        tracked_duration * 1000,
+        diff_duration * 1000,
+    )
+
+
+@pytest.mark.parametrize(
+    "messages_count",
+    [
+        pytest.param(10, id="10"),
+        pytest.param(100, id="100"),
+        pytest.param(500, id="500"),
+    ],
+)
+def test_cache_format_benchmark(messages_count: int) -> None:
+    """
+    Benchmark the cache format of the call, depending on the number of messages.
+
+    Steps:
+    1. Build a call with many messages and a claim
+    2. Serialize and deserialize it, with the cache format and with plain JSON
+    3. Check both give the same call
+    4. Check the cache format is smaller and faster to read
+    5. Report the cost of both
+    """
+    rounds = 20
+    call = CallStateModel(
+        claim={
+            "policyholder_name": "John Doe",
+            "policyholder_phone": "+33612345678",
+        },
+        initiate=CallInitiateModel(
+            **CONFIG.conversation.initiate.model_dump(),
+            phone_number="+33612345678",  # pyright: ignore
+        ),
+        messages=[
+            MessageModel(
+                content=f"Message {i}, my car was damaged in a parking lot.",
+                persona=MessagePersonaEnum.HUMAN,
+                action=MessageActionEnum.CALL
+                if i % 2
+                else MessageActionEnum.TALK,  # Avoid merging messages
+            )
+            for i in range(messages_count)
+        ],
+        voice_id="dummy",
+    )
+
+    # Cache format, without the garbage of the previous tests
+    gc.collect()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        cached = call.cache_dump()
+    cache_dump_duration = (time.perf_counter() - start) / rounds
+    start = time.perf_counter()
+    for _ in range(rounds):
+        cache_call = CallStateModel.cache_load(cached)
+    cache_load_duration = (time.perf_counter() - start) / rounds
+
+    # Plain JSON, with full validation
+    start = time.perf_counter()
+    for _ in range(rounds):
+        raw = call.model_dump_json()
+    json_dump_duration = (time.perf_counter() - start) / rounds
+    start = time.perf_counter()
+    for _ in range(rounds):
+        json_call = CallStateModel.cache_load(raw.encode())
+    json_load_duration = (time.perf_counter() - start) / rounds
+
+    assert cache_call and json_call
+    assume(cache_call.model_dump() == call.model_dump())
+    assume(json_call.model_dump() == call.model_dump())
+    assume(len(cached) < len(raw))
+    assume(cache_load_duration < json_load_duration)
+
+    logger.info(
+        "Cache of a call with %s messages: %s bytes, %.3f ms dump, %.3f ms load; JSON: %s bytes, %.3f ms dump, %.3f ms load",
+        messages_count,
+        len(cached),
+        cache_dump_duration * 1000,
+        cache_load_duration * 1000,
+        len(raw),
+        json_dump_duration * 1000,
+        json_load_duration * 1000,
+    )
+
+
+def test_cache_merge() -> None:
+    """
+    Test messages appended since the last merge are merged when loaded from the cache.
+
+    Steps:
+    1. Build a call, then append messages of the same persona
+    2. Serialize and deserialize it with the cache format
+    3. Check the messages are merged, as when loaded from the database
+    """
+    call = CallStateModel(
+        initiate=CallInitiateModel(
+            **CONFIG.conversation.initiate.model_dump(),
+            phone_number="+33612345678",  # pyright: ignore
+        ),
+        voice_id="dummy",
+    )
+    call.messages += [
+        MessageModel(
+            content=text,
+            persona=MessagePersonaEnum.ASSISTANT,
+        )
+        for text in ["Hello,", "how can I help you?"]
+    ]
+
+    cache_call = CallStateModel.cache_load(call.cache_dump())
+    assert cache_call
+    assert [message.content for message in cache_call.messages] == [
+        "Hello, how can I help you?"
+    ]
+
+
+def test_nested_change() -> None:
+    """
+    Test a nested field mutated in place is patched.
+
+    Steps:
+    1. Build a call
+    2. Change a nested field of the initiate data, without assigning it
+    3. Check the initiate data is set
+    """
+    call = CallStateModel(
+        initiate=CallInitiateModel(
+            **CONFIG.conversation.initiate.model_dump(),
+            phone_number="+33612345678",  # pyright: ignore
+        ),
+        voice_id="dummy",
+    )
+
+    prosody_rate = 1.25
+    snapshot = call.changes_start()
+    call.initiate.prosody_rate = prosody_rate
+    operations = call.changes_since(snapshot)
+    assume([operation["path"] for operation in operations] == ["/initiate"])
+    assume(operations[0]["value"]["prosody_rate"] == prosody_rate)
+
+
+def test_copy_changes() -> None:
+    """
+    Test the changes of a copy are not tracked on the original call.
+
+    Steps:
+    1. Build a call, and copy it
+    2. Change a field of the copy
+    3. Check the original has no change
+    """
+    call = CallStateModel(
+        initiate=CallInitiateModel(
+            **CONFIG.conversation.initiate.model_dump(),
+            phone_number="+33612345678",  # pyright: ignore
+        ),
+        voice_id="dummy",
+    )
+
+    snapshot = call.changes_start()
+    copy = call.model_copy(update={"messages": []})
+    copy.voice_id = "other"
+    assume(call.changes_since(snapshot) == [])
+
+
+def test_messages_alignment() -> None:
+    """
+    Test the messages stay aligned with the database ones, when merged.
+
+    Steps:
+    1. Load a call with messages not merged in the database
+    2. Check the alignment flag survives the cache
+    3. Add a message, check the whole list is set once
+    4. Add messages of the same persona in many transactions
+    5. Check they are merged locally, and the patched list is the same
+    """
+    call = CallStateModel(
+        initiate=CallInitiateModel(
+            **CONFIG.conversation.initiate.model_dump(),
+            phone_number="+33612345678",  # pyright: ignore
+        ),
+        voice_id="dummy",
+    )
+    remote = call.model_dump(mode="json", exclude_none=True)
+    remote["messages"] = [
+        MessageModel(
+            content=text,
+            persona=MessagePersonaEnum.ASSISTANT,
+        ).model_dump(mode="json", exclude_none=True)
+        for text in ["Hello,", "how can I help you?"]
+    ]
+
+    def _apply(operations: list[dict[str, Any]]) -> None:
+        for operation in operations:
+            path = operation["path"]
+            if path == "/messages/-":
+                remote["messages"].append(operation["value"])
+            elif path.startswith("/messages/"):
+                remote["messages"][int(path.split("/")[-1])] = operation["value"]
+            else:
+                remote[path[1:]] = operation["value"]
+
+    # Load the call, messages are merged
+    call = CallStateModel.model_validate(remote)
+    cache_call = CallStateModel.cache_load(call.cache_dump())
+    assert cache_call
+    call = cache_call
+    assume(len(call.messages) == 1)
+
+    # First change sets the whole list
+    snapshot = call.changes_start()
+    call.messages.append(
+        MessageModel(
+            content="My car was damaged.",
+            persona=MessagePersonaEnum.HUMAN,
+        )
+    )
+    operations = call.changes_since(snapshot)
+    assume([operation["path"] for operation in operations] == ["/messages"])
+    _apply(operations)
+
+    # Next changes are merged locally, with the remote indexes
+    for text in ["I am sorry.", "Where are you?"]:
+        snapshot = call.changes_start()
+        call.messages.append(
+            MessageModel(
+                content=text,
+                persona=MessagePersonaEnum.ASSISTANT,
+            )
+        )
+        _apply(call.changes_since(snapshot))
+    assume(
+        [message.content for message in call.messages]
+        == [
+            "Hello, how can I help you?",
+            "My car was damaged.",
+            "I am sorry. Where are you?",
+        ]
+    )
+    assume(
+        remote["messages"]
+        == call.model_dump(mode="json", exclude_none=True)["messages"]
+    )